@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -16,6 +17,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'rest_framework.authtoken',
@@ -25,6 +27,8 @@ INSTALLED_APPS = [
 CORS_ALLOW_ALL_ORIGINS = True   
 
 MIDDLEWARE = [
+    # First, so latency and query counts cover the whole middleware stack
+    'product.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -33,6 +37,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'product.replicas.PinPrimaryMiddleware',
 ]
 
 ROOT_URLCONF = 'backend_django.urls'
@@ -62,9 +67,66 @@ DATABASES = {
         'PASSWORD': 'athira',  
         'HOST': 'localhost',
         'PORT': '5432',
+        # Keep connections open between requests, checking them before reuse
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# A streaming replica of the primary, e.g. DATABASE_REPLICA_HOST=db-replica
+if os.environ.get('DATABASE_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DATABASE_REPLICA_HOST'],
+        'PORT': os.environ.get('DATABASE_REPLICA_PORT', DATABASES['default']['PORT']),
+    }
+
+DATABASE_ROUTERS = ['product.replicas.ReplicaRouter']
+
+# Alias the catalog and admin statistics views read from; None reads from the primary
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+
+# Seconds reads stay on the primary after a write: longer than the replica's lag
+REPLICA_PIN_SECONDS = 5
+
+# Run the test suite against SQLite unless TEST_DB=postgres is set
+if 'test' in sys.argv and os.environ.get('TEST_DB', 'sqlite') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_db.sqlite3',
+    }
+
+if 'test' in sys.argv:
+    # A second, separately written database stands in for the replica. It
+    # is only created for tests that use it, and those enable routing with
+    # override_settings(REPLICA_DATABASE='replica'). Its tables are created
+    # from the models, as a replica receives the schema rather than running
+    # the data migrations itself.
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'TEST': {'MIGRATE': False},
+    }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        DATABASES['replica']['TEST']['NAME'] = f"test_{DATABASES['default']['NAME']}_replica"
+    REPLICA_DATABASE = None
+
+# Shared cache: Redis in production (REDIS_URL), per-process memory otherwise
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -95,11 +157,43 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'product.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 12,
-}
\ No newline at end of file
+}
+
+# Seconds the combined /api/admin/dashboard/ payload is cached for
+ADMIN_DASHBOARD_CACHE_TTL = 10
+
+# Seconds a cached catalog page lives; writes invalidate it sooner
+CATALOG_CACHE_TTL = 300
+
+# Seconds stock added to a cart stays reserved for that cart; None disables reservations
+CART_RESERVATION_TTL = None
+
+# Seconds an auth token stays valid after it is issued; None never expires it
+AUTH_TOKEN_TTL = None
+
+# Seconds a token -> user lookup is cached in the shared cache
+AUTH_TOKEN_CACHE_TTL = 300
+
+# Size and lifetime of the per-process token cache. Revoked tokens may keep
+# working in other processes for up to AUTH_TOKEN_LOCAL_CACHE_TTL seconds.
+AUTH_TOKEN_LOCAL_CACHE_SIZE = 1024
+AUTH_TOKEN_LOCAL_CACHE_TTL = 5
+
+# Serve MEDIA_ROOT from Django at MEDIA_URL. Turn off when the web server
+# serves the directory itself (with the same long Cache-Control header).
+SERVE_MEDIA = True
+
+# Seconds browsers and CDNs may cache uploaded images; files never change
+# under their name, so this can be long
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Build image thumbnails in a background thread after the upload commits;
+# False builds them inside the request
+IMAGE_DERIVATIVES_IN_BACKGROUND = True
@@ -1,16 +1,23 @@
 from django.contrib import admin
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from .models import (
+    Category, Product, ProductVariant, Cart, CartItem, StockReservation, Order, OrderItem
+)
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'created_at']
     search_fields = ['name']
 
+class ProductVariantInline(admin.TabularInline):
+    model = ProductVariant
+    extra = 0
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'price', 'stock', 'is_featured', 'created_at']
-    list_filter = ['category', 'is_featured', 'size']
+    list_filter = ['category', 'is_featured', 'variants__size']
     search_fields = ['name', 'brand']
+    inlines = [ProductVariantInline]
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -18,7 +25,11 @@ class CartAdmin(admin.ModelAdmin):
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
-    list_display = ['cart', 'product', 'quantity']
+    list_display = ['cart', 'variant', 'quantity']
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['cart', 'variant', 'quantity', 'expires_at']
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .admin_views import (
     AdminProductViewSet, AdminCategoryViewSet, 
-    AdminOrderViewSet, AdminUserViewSet
+    AdminOrderViewSet, AdminUserViewSet, AdminAnalyticsViewSet, dashboard, metrics
 )
 
 router = DefaultRouter()
@@ -10,7 +10,10 @@ router.register(r'products', AdminProductViewSet, basename='admin-products')
 router.register(r'categories', AdminCategoryViewSet, basename='admin-categories')
 router.register(r'orders', AdminOrderViewSet, basename='admin-orders')
 router.register(r'users', AdminUserViewSet, basename='admin-users')
+router.register(r'analytics', AdminAnalyticsViewSet, basename='admin-analytics')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('dashboard/', dashboard, name='admin-dashboard'),
+    path('metrics/', metrics, name='admin-metrics'),
 ]
\ No newline at end of file
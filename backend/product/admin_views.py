@@ -1,12 +1,115 @@
+import csv
+import io
+from datetime import date, timedelta
+
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.http import HttpResponse
+from django.utils import timezone
+from .analytics import sales_by_category, sales_by_day, sales_by_product
+from .cache import DASHBOARD_CACHE_KEY
+from .exports import (
+    EXPORT_CONTENT_TYPES, ORDER_COLUMNS, ORDER_ITEM_COLUMNS, PRODUCT_COLUMNS,
+    export_response, flatten_orders, flatten_products, order_records, product_records
+)
+from .images import remove_product_image, set_product_image
+from .imports import IMPORT_FORMATS, import_format, import_products, read_rows
+from .metrics import PROMETHEUS_CONTENT_TYPE, registry
 from .models import Category, Product, Order
+from .pagination import KeysetPagination
+from .replicas import ReplicaReadMixin, replica_reads
+from .search import search_products
 from .serializers import (
-    CategorySerializer, ProductSerializer, OrderSerializer, UserSerializer
+    CategorySerializer, ProductImageSerializer, ProductSerializer, OrderSerializer, UserSerializer
 )
+from .services import MAX_BULK_PRODUCT_IDS, CatalogError, bulk_update_products, update_order
+
+def product_stats():
+    """Product counters computed in a single conditional-aggregation query"""
+    return Product.objects.aggregate(
+        total_products=Count('id'),
+        low_stock=Count('id', filter=Q(stock__lt=10)),
+        out_of_stock=Count('id', filter=Q(stock=0)),
+        featured_products=Count('id', filter=Q(is_featured=True)),
+    )
+
+def order_stats():
+    """Order counters and delivered revenue computed in a single query"""
+    stats = Order.objects.aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(status='pending')),
+        processing_orders=Count('id', filter=Q(status='processing')),
+        completed_orders=Count('id', filter=Q(status='delivered')),
+        total_revenue=Sum('total_amount', filter=Q(status='delivered')),
+    )
+    stats['total_revenue'] = float(stats['total_revenue'] or 0)
+    return stats
+
+def export_output(request):
+    """
+    The export format from ?output= (csv or jsonl). DRF reserves ?format=
+    for content negotiation, so exports use their own parameter.
+    """
+    output = request.query_params.get('output', 'csv')
+    return output if output in EXPORT_CONTENT_TYPES else None
+
+def invalid_output():
+    return Response(
+        {'error': f"output must be one of {', '.join(EXPORT_CONTENT_TYPES)}"},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+def user_stats():
+    """User counters computed in a single query"""
+    stats = User.objects.aggregate(
+        total_users=Count('id'),
+        admin_users=Count('id', filter=Q(is_staff=True)),
+        active_users=Count('id', filter=Q(is_active=True)),
+    )
+    stats['regular_users'] = stats['total_users'] - stats['admin_users']
+    return stats
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def dashboard(request):
+    """
+    Product, order and user statistics in one response
+    GET /api/admin/dashboard/
+
+    Cached for ADMIN_DASHBOARD_CACHE_TTL seconds so the dashboard polling
+    loop does not rescan the orders table on every refresh; the counters
+    are read from the replica.
+    """
+    data = cache.get(DASHBOARD_CACHE_KEY)
+    if data is None:
+        with replica_reads(request):
+            data = {
+                'products': product_stats(),
+                'orders': order_stats(),
+                'users': user_stats(),
+            }
+        cache.set(DASHBOARD_CACHE_KEY, data, settings.ADMIN_DASHBOARD_CACHE_TTL)
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """
+    Request latency histograms, query counts and DB time per view
+    GET /api/admin/metrics/
+
+    Prometheus text format; the counters belong to the worker process that
+    serves the request.
+    """
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
 
 class AdminCategoryViewSet(viewsets.ModelViewSet):
     """Admin ViewSet for Category management"""
@@ -14,47 +117,162 @@ class AdminCategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsAdminUser]
 
-class AdminProductViewSet(viewsets.ModelViewSet):
+class AdminProductViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Admin ViewSet for Product management"""
-    queryset = Product.objects.all()
+    queryset = Product.objects.catalog()
     serializer_class = ProductSerializer
     permission_classes = [IsAdminUser]
+    replica_actions = ('stats',)
 
     def get_queryset(self):
-        queryset = Product.objects.all().order_by('-created_at')
-        category = self.request.query_params.get('category', None)
-        search = self.request.query_params.get('search', None)
+        return self.filter_products(
+            Product.objects.catalog().order_by('-created_at'), self.request.query_params
+        )
+
+    def filter_products(self, queryset, params):
+        """
+        Apply the list filters (category, search) from `params`
+        """
+        category = params.get('category', None)
+        search = params.get('search', None)
         
         if category:
             queryset = queryset.filter(category_id=category)
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            queryset = search_products(queryset, search)
         
         return queryset
 
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """
+        Change price, stock or featured flag of many products at once
+        POST /api/admin/products/bulk-update/
+        Body: {
+            "ids": [integer, ...]  or  "filter": {"category": id, "search": "string"},
+            "price": {"set": amount} or {"percent": change},
+            "stock": {"set": quantity} or {"adjust": change},
+            "is_featured": boolean
+        }
+        A stock change applies to every size of the products. A percent
+        price change also reprices sizes with their own price; a set price
+        clears them. Runs as one UPDATE (two with a price or stock change)
+        and returns the number of products changed.
+        An empty filter selects every product.
+        """
+        ids = request.data.get('ids')
+        product_filter = request.data.get('filter')
+        if (ids is None) == (product_filter is None):
+            return Response(
+                {'error': 'Give either ids or filter'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if ids is not None:
+            if (not isinstance(ids, list) or len(ids) > MAX_BULK_PRODUCT_IDS
+                    or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids)):
+                return Response(
+                    {'error': f'ids must be a list of at most {MAX_BULK_PRODUCT_IDS} integers'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = Product.objects.filter(pk__in=ids)
+        elif isinstance(product_filter, dict):
+            queryset = self.filter_products(Product.objects.all(), product_filter)
+        else:
+            return Response(
+                {'error': 'filter must be an object'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            updated = bulk_update_products(queryset, request.data)
+        except CatalogError as e:
+            return Response({'error': e.message}, status=e.status_code)
+        return Response({'updated': updated})
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get product statistics"""
-        total_products = Product.objects.count()
-        low_stock = Product.objects.filter(stock__lt=10).count()
-        out_of_stock = Product.objects.filter(stock=0).count()
-        featured_products = Product.objects.filter(is_featured=True).count()
-        
-        return Response({
-            'total_products': total_products,
-            'low_stock': low_stock,
-            'out_of_stock': out_of_stock,
-            'featured_products': featured_products
-        })
-
-class AdminOrderViewSet(viewsets.ModelViewSet):
+        return Response(product_stats())
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """
+        Create or update products from a CSV or JSON Lines file, keyed by SKU
+        POST /api/admin/products/import/
+        Body (multipart): {
+            "file": CSV or JSON Lines file,
+            "input_format": "csv" | "jsonl" (default: from the file name)
+        }
+        Returns counts of created and updated products and the rows that
+        were rejected with their errors.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('input_format') or import_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response(
+                {'error': f"input_format must be one of {', '.join(IMPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = import_products(read_rows(lines, file_format))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Could not read file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+    @action(detail=True, methods=['post', 'delete'], parser_classes=[MultiPartParser])
+    def image(self, request, pk=None):
+        """
+        Upload or remove the product's image
+        POST /api/admin/products/{id}/image/
+        Body (multipart): {"image": JPEG, PNG or WebP file}
+        DELETE /api/admin/products/{id}/image/
+
+        The grid, detail and cart thumbnails are built in the background;
+        "images" is null in product payloads until they are ready.
+        """
+        product = self.get_object()
+        if request.method == 'DELETE':
+            remove_product_image(product)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        serializer = ProductImageSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        set_product_image(product, serializer.validated_data['image'])
+        product.refresh_from_db()
+        return Response(ProductSerializer(product).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every matching product as a file
+        GET /api/admin/products/export/?output=csv|jsonl
+        Accepts the list filters (category, search). CSV has one row per
+        size; JSON Lines nests the sizes under "variants".
+        """
+        output = export_output(request)
+        if output is None:
+            return invalid_output()
+        records = product_records(self.get_queryset())
+        if output == 'csv':
+            records = flatten_products(records)
+        return export_response(records, PRODUCT_COLUMNS, output, 'products')
+
+class AdminOrderViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Admin ViewSet for Order management"""
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = KeysetPagination
+    replica_actions = ('stats',)
 
     def get_queryset(self):
-        queryset = Order.objects.all().order_by('-created_at')
+        queryset = Order.objects.with_items().order_by('-created_at')
         status_filter = self.request.query_params.get('status', None)
         user_id = self.request.query_params.get('user', None)
         
@@ -65,6 +283,9 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def perform_update(self, serializer):
+        update_order(serializer.instance, serializer.save)
+
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         """Update order status"""
@@ -77,31 +298,34 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        order.status = new_status
-        order.save()
-        
+        def save():
+            order.status = new_status
+            order.save()
+            return order
+
+        update_order(order, save)
         return Response(OrderSerializer(order).data)
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get order statistics"""
-        from django.db.models import Sum, Count
-        
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(status='pending').count()
-        processing_orders = Order.objects.filter(status='processing').count()
-        completed_orders = Order.objects.filter(status='delivered').count()
-        total_revenue = Order.objects.filter(status='delivered').aggregate(
-            total=Sum('total_amount')
-        )['total'] or 0
-        
-        return Response({
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'processing_orders': processing_orders,
-            'completed_orders': completed_orders,
-            'total_revenue': float(total_revenue)
-        })
+        return Response(order_stats())
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every matching order as a file
+        GET /api/admin/orders/export/?output=csv|jsonl
+        Accepts the list filters (status, user). CSV has one row per order
+        line; JSON Lines has one order per line with its items nested.
+        """
+        output = export_output(request)
+        if output is None:
+            return invalid_output()
+        records = order_records(self.get_queryset())
+        if output == 'csv':
+            records = flatten_orders(records)
+        return export_response(records, ORDER_COLUMNS + ORDER_ITEM_COLUMNS, output, 'orders')
 
     def destroy(self, request, *args, **kwargs):
         """Prevent deleting orders"""
@@ -110,22 +334,82 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
             status=status.HTTP_405_METHOD_NOT_ALLOWED
         )
 
-class AdminUserViewSet(viewsets.ReadOnlyModelViewSet):
+class AdminUserViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Admin ViewSet for User management"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
+    replica_actions = ('stats',)
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get user statistics"""
-        total_users = User.objects.count()
-        admin_users = User.objects.filter(is_staff=True).count()
-        active_users = User.objects.filter(is_active=True).count()
-        
-        return Response({
-            'total_users': total_users,
-            'admin_users': admin_users,
-            'active_users': active_users,
-            'regular_users': total_users - admin_users
-        })
\ No newline at end of file
+        return Response(user_stats())
+
+class AdminAnalyticsViewSet(viewsets.ViewSet):
+    """
+    Sales analytics read from the daily rollup tables (product.analytics),
+    never from the orders themselves. Cancelled orders are not counted.
+
+    daily: GET /api/admin/analytics/daily/
+    categories: GET /api/admin/analytics/categories/
+    products: GET /api/admin/analytics/products/
+    top_sellers: GET /api/admin/analytics/top-sellers/
+
+    Query Parameters:
+    - start, end: Inclusive date range (YYYY-MM-DD), default the last 30 days
+    - limit: Rows for products / top-sellers (default 10, max 100)
+    """
+    permission_classes = [IsAdminUser]
+    default_days = 30
+    max_limit = 100
+
+    def date_range(self, request):
+        try:
+            end = date.fromisoformat(request.query_params.get('end') or timezone.localdate().isoformat())
+            start = request.query_params.get('start')
+            start = date.fromisoformat(start) if start else end - timedelta(days=self.default_days - 1)
+        except ValueError:
+            raise ValidationError({'error': 'start and end must be dates (YYYY-MM-DD)'})
+        return start, end
+
+    def limit(self, request):
+        try:
+            return max(1, min(int(request.query_params.get('limit', 10)), self.max_limit))
+        except ValueError:
+            raise ValidationError({'error': 'limit must be an integer'})
+
+    def respond(self, request, rows):
+        start, end = self.date_range(request)
+        for row in rows:
+            row['revenue'] = float(row['revenue'] or 0)
+        return Response({'start': start, 'end': end, 'results': rows})
+
+    @action(detail=False, methods=['get'])
+    def daily(self, request):
+        """Orders, units sold and revenue per day"""
+        return self.respond(request, sales_by_day(*self.date_range(request)))
+
+    @action(detail=False, methods=['get'])
+    def categories(self, request):
+        """Units sold and revenue per category"""
+        rows = [
+            {'category_id': row['category_id'], 'category': row['category__name'],
+             'quantity': row['quantity'], 'revenue': row['revenue']}
+            for row in sales_by_category(*self.date_range(request))
+        ]
+        return self.respond(request, rows)
+
+    @action(detail=False, methods=['get'])
+    def products(self, request):
+        """Units sold and revenue per product, highest revenue first"""
+        rows = sales_by_product(*self.date_range(request), limit=self.limit(request))
+        return self.respond(request, rows)
+
+    @action(detail=False, methods=['get'], url_path='top-sellers')
+    def top_sellers(self, request):
+        """Products with the most units sold"""
+        rows = sales_by_product(
+            *self.date_range(request), order_by='-quantity', limit=self.limit(request)
+        )
+        return self.respond(request, rows)
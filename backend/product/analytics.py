@@ -0,0 +1,177 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, DailySales, Order, OrderItem
+
+# Orders in these states are not counted as sales
+EXCLUDED_STATUSES = {'cancelled'}
+
+REBUILD_BATCH_SIZE = 5000
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def counts_as_sale(status):
+    return status not in EXCLUDED_STATUSES
+
+
+def record_order(order, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) an order's contribution to the rollups.
+
+    Missing rollup rows are created with ignore_conflicts and then every
+    row is incremented with one UPDATE per table, so concurrent orders for
+    the same day and products never overwrite each other. The number of
+    queries does not depend on the number of order lines.
+    """
+    date = timezone.localdate(order.created_at)
+    lines = list(order.items.values_list(
+        'product_id', 'product__category_id', 'product_name', 'quantity', 'price'
+    ))
+
+    DailySales.objects.bulk_create([DailySales(date=date)], ignore_conflicts=True)
+    DailySales.objects.filter(date=date).update(
+        orders=F('orders') + sign,
+        items=F('items') + sign * sum(line[3] for line in lines),
+        revenue=F('revenue') + Value(sign * order.total_amount, output_field=MONEY),
+    )
+
+    # Lines of deleted products cannot be attributed to a product
+    products = {}
+    for product_id, category_id, name, quantity, price in lines:
+        if product_id is None:
+            continue
+        totals = products.setdefault(product_id, [category_id, name, 0, Decimal('0')])
+        totals[2] += quantity
+        totals[3] += price * quantity
+    if not products:
+        return
+
+    DailyProductSales.objects.bulk_create(
+        [
+            DailyProductSales(date=date, product_id=product_id, category_id=category_id, product_name=name)
+            for product_id, (category_id, name, _, _) in products.items()
+        ],
+        ignore_conflicts=True,
+    )
+    DailyProductSales.objects.filter(date=date, product_id__in=products).update(
+        quantity=Case(
+            *[When(product_id=product_id, then=F('quantity') + sign * quantity)
+              for product_id, (_, _, quantity, _) in products.items()],
+            output_field=IntegerField(),
+        ),
+        revenue=Case(
+            *[When(product_id=product_id, then=F('revenue') + Value(sign * revenue, output_field=MONEY))
+              for product_id, (_, _, _, revenue) in products.items()],
+            output_field=MONEY,
+        ),
+    )
+
+
+def record_order_on_commit(order):
+    """
+    record_order() in its own short transaction once the current one
+    commits. Today's DailySales row is shared by every checkout; updating
+    it inside the checkout would hold its lock until the checkout commits
+    and queue every checkout on it. A rollup that fails after the commit
+    is logged, and rebuild_rollups() repairs the drift.
+    """
+    def record():
+        with transaction.atomic():
+            record_order(order)
+
+    transaction.on_commit(record, robust=True)
+
+
+def record_status_change(order, previous_status):
+    """Update the rollups after `order` moved from `previous_status`"""
+    was_sale, is_sale = counts_as_sale(previous_status), counts_as_sale(order.status)
+    if was_sale != is_sale:
+        record_order(order, sign=1 if is_sale else -1)
+
+
+def rebuild_rollups(since=None):
+    """
+    Recompute the rollups from orders, for every day or from `since` on.
+    Runs in one transaction, so readers see either the old or the new rollup.
+    """
+    orders = Order.objects.exclude(status__in=EXCLUDED_STATUSES)
+    items = OrderItem.objects.exclude(order__status__in=EXCLUDED_STATUSES)
+    if since is not None:
+        orders = orders.filter(created_at__date__gte=since)
+        items = items.filter(order__created_at__date__gte=since)
+
+    with transaction.atomic():
+        stale_days = DailySales.objects.all()
+        stale_products = DailyProductSales.objects.all()
+        if since is not None:
+            stale_days = stale_days.filter(date__gte=since)
+            stale_products = stale_products.filter(date__gte=since)
+        stale_days.delete()
+        stale_products.delete()
+
+        units = defaultdict(int, (
+            items.annotate(day=TruncDate('order__created_at')).values('day')
+            .annotate(units=Sum('quantity')).order_by().values_list('day', 'units')
+        ))
+        days = (
+            orders.annotate(day=TruncDate('created_at')).values('day')
+            .annotate(orders=Count('id'), revenue=Sum('total_amount')).order_by()
+        )
+        DailySales.objects.bulk_create(
+            [
+                DailySales(date=row['day'], orders=row['orders'], items=units[row['day']], revenue=row['revenue'])
+                for row in days
+            ],
+            batch_size=REBUILD_BATCH_SIZE,
+        )
+
+        rows = items.exclude(product=None).annotate(day=TruncDate('order__created_at')).values(
+            'day', 'product_id', 'product__category_id'
+        ).annotate(
+            units=Sum('quantity'),
+            total=Sum(F('quantity') * F('price'), output_field=MONEY),
+            name=Max('product_name'),
+        ).order_by()
+        batch = []
+        for row in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append(DailyProductSales(
+                date=row['day'], product_id=row['product_id'], category_id=row['product__category_id'],
+                product_name=row['name'], quantity=row['units'], revenue=row['total'],
+            ))
+            if len(batch) == REBUILD_BATCH_SIZE:
+                DailyProductSales.objects.bulk_create(batch)
+                batch = []
+        DailyProductSales.objects.bulk_create(batch)
+
+
+def sales_by_day(start, end):
+    return list(
+        DailySales.objects.filter(date__range=(start, end)).order_by('date')
+        .values('date', 'orders', 'items', 'revenue')
+    )
+
+
+def sales_by_category(start, end):
+    return list(
+        DailyProductSales.objects.filter(date__range=(start, end))
+        .values('category_id', 'category__name')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('-revenue', 'category_id')
+    )
+
+
+def sales_by_product(start, end, order_by='-revenue', limit=None):
+    rows = (
+        DailyProductSales.objects.filter(date__range=(start, end))
+        .values('product_id')
+        .annotate(name=Max('product_name'), quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .filter(quantity__gt=0)
+        .order_by(order_by, 'product_id')
+    )
+    return list(rows[:limit] if limit else rows)
@@ -0,0 +1,144 @@
+"""
+Async read endpoints for the catalog, served by the ASGI application.
+
+These mirror the DRF list/detail/featured views under /api/async/ but query
+the database with Django's async ORM, so a worker can keep serving other
+requests while PostgreSQL works. The responses, cache entries and ETags
+match the synchronous endpoints. The less common list options (search,
+?fields=, ?facets=, cursor pagination) are passed to the DRF view in a
+thread. Like the DRF views, they read from the replica unless the user is
+pinned to the primary.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import acached_catalog_response
+from .facets import apply_facet_filters
+from .models import Category, Product
+from .replicas import areplica_reads
+from .serializers import CategorySerializer, ProductSerializer
+from .views import ProductViewSet
+
+# Product list options only the synchronous view implements
+DELEGATED_PARAMS = ('search', 'fields', 'facets', 'cursor', 'pagination')
+
+sync_product_list = sync_to_async(ProductViewSet.as_view({'get': 'list'}))
+
+
+async def paginate(request, queryset, serializer_class):
+    """Page-number pagination with the same body as DRF's PageNumberPagination"""
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    count = await queryset.acount()
+    last_page = max(1, -(-count // page_size))
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    if not 1 <= page <= last_page:
+        raise Http404('Invalid page.')
+
+    start = (page - 1) * page_size
+    items = [item async for item in queryset[start:start + page_size]]
+
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page < last_page else None,
+        'previous': previous,
+        'results': serializer_class(items, many=True).data,
+    }
+
+
+def read_from_replica(view):
+    """Route the view's ORM reads as areplica_reads() decides"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        async with areplica_reads(request):
+            return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def not_found(message):
+    return JsonResponse({'detail': message}, status=404)
+
+
+@require_GET
+@read_from_replica
+async def product_list(request):
+    """
+    List products
+    GET /api/async/products/
+    Same query parameters as /api/products/
+    """
+    if any(name in request.GET for name in DELEGATED_PARAMS):
+        return await sync_product_list(request)
+
+    queryset = Product.objects.catalog().order_by('-created_at')
+    if request.GET.get('featured'):
+        queryset = queryset.filter(is_featured=True)
+    try:
+        queryset = apply_facet_filters(queryset, request.GET)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+
+    try:
+        return await acached_catalog_response(
+            request, lambda: paginate(request, queryset, ProductSerializer)
+        )
+    except Http404 as e:
+        return not_found(str(e))
+
+
+@require_GET
+@read_from_replica
+async def product_detail(request, pk):
+    """
+    Get a product
+    GET /api/async/products/{id}/
+    """
+    async def build():
+        product = await Product.objects.catalog().aget(pk=pk)
+        return ProductSerializer(product).data
+
+    try:
+        return await acached_catalog_response(request, build)
+    except Product.DoesNotExist:
+        return not_found('No Product matches the given query.')
+
+
+@require_GET
+@read_from_replica
+async def featured_products(request):
+    """
+    Get featured products
+    GET /api/async/products/featured/
+    """
+    async def build():
+        queryset = Product.objects.catalog().filter(is_featured=True).order_by('-created_at')
+        return ProductSerializer([product async for product in queryset], many=True).data
+
+    return await acached_catalog_response(request, build)
+
+
+@require_GET
+@read_from_replica
+async def category_list(request):
+    """
+    List categories
+    GET /api/async/categories/
+    """
+    try:
+        return await acached_catalog_response(
+            request, lambda: paginate(request, Category.objects.order_by('pk'), CategorySerializer)
+        )
+    except Http404 as e:
+        return not_found(str(e))
@@ -0,0 +1,149 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LRUCache:
+    """Thread-safe in-process cache with a size bound and a per-entry TTL"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LRUCache(settings.AUTH_TOKEN_LOCAL_CACHE_SIZE)
+
+
+def token_cache_key(key):
+    # Hash the token so raw credentials never appear in the shared cache.
+    # v2: entries hold CACHED_USER_FIELDS only.
+    return 'auth:token:v2:%s' % hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_expires_at(created):
+    if settings.AUTH_TOKEN_TTL is None:
+        return None
+    return created + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+
+
+def token_expired(token):
+    expires = token_expires_at(token.created)
+    return expires is not None and expires <= timezone.now()
+
+
+def issue_token(user):
+    """The user's token, replaced with a fresh one if it has expired"""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token):
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+def invalidate_token(key):
+    """Forget a cached token in this process and in the shared cache"""
+    local_tokens.delete(key)
+    cache.delete(token_cache_key(key))
+
+
+# User columns kept in the token caches: what permission checks and the
+# user serializer read. The password hash and the rest stay in the
+# database, and load on access like any deferred field. Listed in column
+# order, as Model.from_db() expects.
+CACHED_USER_FIELDS = ['id', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff', 'is_active']
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that skips the Token/User query on repeat requests.
+
+    Lookups are cached in a bounded in-process LRU and in the shared Django
+    cache. Only the user's CACHED_USER_FIELDS values are cached, so every
+    request gets its own User instance. Deleting a token (logout) or saving its user
+    drops the cached entry; other processes may keep serving their local
+    copy for up to AUTH_TOKEN_LOCAL_CACHE_TTL seconds.
+
+    With AUTH_TOKEN_TTL set, tokens older than that many seconds are
+    rejected and replaced on the next login.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = local_tokens.get(key)
+        if entry is None:
+            entry = cache.get(token_cache_key(key))
+            if entry is None:
+                entry = self._load(key)
+            self._remember_locally(key, entry)
+
+        user_id, created, values = entry
+        expires = token_expires_at(created)
+        if expires is not None and expires <= timezone.now():
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        user = get_user_model().from_db(None, CACHED_USER_FIELDS, values)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        token = Token(key=key, user_id=user_id, created=created)
+        token.user = user
+        return user, token
+
+    def _load(self, key):
+        try:
+            token = Token.objects.select_related('user').only(
+                'key', 'user', 'created', *(f'user__{name}' for name in CACHED_USER_FIELDS)
+            ).get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        user = token.user
+        entry = (user.pk, token.created, [getattr(user, name) for name in CACHED_USER_FIELDS])
+        cache.set(token_cache_key(key), entry, self._timeout(token.created, settings.AUTH_TOKEN_CACHE_TTL))
+        return entry
+
+    def _remember_locally(self, key, entry):
+        local_tokens.set(key, entry, self._timeout(entry[1], settings.AUTH_TOKEN_LOCAL_CACHE_TTL))
+
+    def _timeout(self, created, ttl):
+        # Never cache an entry beyond the token's own expiry
+        expires = token_expires_at(created)
+        if expires is None:
+            return ttl
+        return max(0, min(ttl, (expires - timezone.now()).total_seconds()))
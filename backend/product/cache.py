@@ -0,0 +1,146 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponseNotModified, JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .replicas import areading_stale_catalog, catalog_written, reading_stale_catalog
+
+CATALOG_VERSION_KEY = 'catalog:version'
+DASHBOARD_CACHE_KEY = 'admin:dashboard'
+
+
+def get_catalog_version():
+    """
+    Current catalog version. Every cached catalog page is keyed by it, so
+    bumping the version makes all previously cached pages unreachable.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never restarts at a
+        # value that older cached pages were stored under
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def aget_catalog_version():
+    """Async get_catalog_version(), for the ASGI read views"""
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def catalog_committed():
+    bump_catalog_version()
+    catalog_written()
+
+
+def invalidate_catalog():
+    """
+    Drop every cached catalog page.
+
+    The version is bumped immediately and again once the surrounding
+    transaction commits, so a page rendered from pre-commit data by a
+    concurrent request cannot outlive the write. After the commit, pages
+    read from a lagging replica are not cached either.
+    """
+    bump_catalog_version()
+    transaction.on_commit(catalog_committed)
+
+
+def _request_digest(request):
+    # request.GET is the same QueryDict as DRF's request.query_params
+    params = sorted(request.GET.lists())
+    return hashlib.md5(
+        json.dumps([request.path, params]).encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+def invalidate_dashboard():
+    """Drop the cached admin dashboard so its counters are recomputed"""
+    cache.delete(DASHBOARD_CACHE_KEY)
+
+
+def catalog_cache_key(request):
+    return f'catalog:{get_catalog_version()}:{_request_digest(request)}'
+
+
+async def acatalog_cache_key(request):
+    return f'catalog:{await aget_catalog_version()}:{_request_digest(request)}'
+
+
+def _etag(data):
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.md5(body.encode(), usedforsecurity=False).hexdigest()
+
+
+def cached_catalog_response(request, build_response):
+    """
+    Serve a catalog GET from the cache, building it with `build_response`
+    on a miss. Responses carry an ETag and a matching If-None-Match gets a
+    304 without a body. Pages read from a replica that may lag a recent
+    catalog write are not cached.
+    """
+    key = catalog_cache_key(request)
+    cached = cache.get(key)
+    if cached is None:
+        response = build_response()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        cached = (_etag(response.data), response.data)
+        if not reading_stale_catalog():
+            cache.set(key, cached, settings.CATALOG_CACHE_TTL)
+
+    etag, data = cached
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(data, headers={'ETag': etag})
+
+
+async def acached_catalog_response(request, build_data):
+    """
+    cached_catalog_response() for plain Django async views. `build_data` is
+    a coroutine function returning the response body; pages are cached
+    under the same keys and shape as the DRF views, and likewise not when
+    read from a replica that may lag a recent catalog write.
+    """
+    key = await acatalog_cache_key(request)
+    cached = await cache.aget(key)
+    if cached is None:
+        data = await build_data()
+        cached = (_etag(data), data)
+        if not await areading_stale_catalog():
+            await cache.aset(key, cached, settings.CATALOG_CACHE_TTL)
+
+    etag, data = cached
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponseNotModified(headers={'ETag': etag})
+    return JsonResponse(data, encoder=JSONEncoder, safe=False, headers={'ETag': etag})
+
+
+class CatalogCacheMixin:
+    """Read-through cache for the list and retrieve actions of a catalog ViewSet"""
+
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        return cached_catalog_response(request, lambda: build(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        build = super().retrieve
+        return cached_catalog_response(request, lambda: build(request, *args, **kwargs))
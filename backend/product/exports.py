@@ -0,0 +1,131 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+# Rows fetched per server-side cursor round trip (and per prefetch batch)
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+PRODUCT_COLUMNS = [
+    'id', 'variant_id', 'name', 'brand', 'size', 'price', 'stock', 'is_featured',
+    'category_id', 'category', 'image_url', 'created_at', 'updated_at',
+]
+
+ORDER_COLUMNS = [
+    'id', 'created_at', 'status', 'user_id', 'username', 'email',
+    'shipping_address', 'phone_number', 'total_amount',
+]
+
+ORDER_ITEM_COLUMNS = ['product_id', 'product_name', 'brand', 'size', 'quantity', 'price', 'subtotal']
+
+
+class Echo:
+    """File-like object whose write() returns the data, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def product_records(queryset):
+    """Products with their sizes nested under 'variants'"""
+    for product in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'id': product.id,
+            'name': product.name,
+            'brand': product.brand,
+            'price': product.price,
+            'stock': product.stock,
+            'is_featured': product.is_featured,
+            'category_id': product.category_id,
+            'category': product.category.name,
+            'image_url': product.image_url,
+            'created_at': product.created_at,
+            'updated_at': product.updated_at,
+            'variants': [
+                {'id': variant.id, 'size': variant.size, 'stock': variant.stock, 'price': variant.price}
+                for variant in product.variants.all()
+            ],
+        }
+
+
+def order_records(queryset):
+    """Orders with their lines nested under 'items'"""
+    for order in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'id': order.id,
+            'created_at': order.created_at,
+            'status': order.status,
+            'user_id': order.user_id,
+            'username': order.user.username,
+            'email': order.user.email,
+            'shipping_address': order.shipping_address,
+            'phone_number': order.phone_number,
+            'total_amount': order.total_amount,
+            'items': [
+                {
+                    'product_id': item.product_id,
+                    'product_name': item.product_name,
+                    'brand': item.product_brand,
+                    'size': item.product_size,
+                    'quantity': item.quantity,
+                    'price': item.price,
+                    'subtotal': item.subtotal,
+                }
+                for item in order.items.all()
+            ],
+        }
+
+
+def flatten_products(records):
+    """One CSV row per size, with the size's stock and price"""
+    for record in records:
+        variants = record.pop('variants')
+        for variant in variants or [{'id': None, 'size': None, 'stock': None, 'price': None}]:
+            yield {
+                **record,
+                'variant_id': variant['id'],
+                'size': variant['size'],
+                'stock': variant['stock'],
+                'price': record['price'] if variant['price'] is None else variant['price'],
+            }
+
+
+def flatten_orders(records):
+    """One CSV row per order line, repeating the order columns"""
+    for record in records:
+        items = record.pop('items')
+        for item in items or [dict.fromkeys(ORDER_ITEM_COLUMNS)]:
+            yield {**record, **item}
+
+
+def csv_lines(records, columns):
+    writer = csv.DictWriter(Echo(), fieldnames=columns, extrasaction='ignore')
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, cls=JSONEncoder) + '\n'
+
+
+def export_response(records, columns, output, filename):
+    """
+    Stream `records` as CSV (flat `columns`) or JSON Lines. Records are
+    produced lazily from a chunked cursor, so memory use does not depend on
+    the number of rows.
+    """
+    if output == 'csv':
+        lines = csv_lines(records, columns)
+    else:
+        lines = jsonl_lines(records)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_CONTENT_TYPES[output])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
@@ -0,0 +1,161 @@
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+from rest_framework.exceptions import ValidationError
+
+from .cache import get_catalog_version
+from .models import ProductVariant
+
+# (label, min, max) price buckets in rupees; max is exclusive, None is open-ended
+PRICE_BUCKETS = [
+    ('0-500', 0, 500),
+    ('500-1000', 500, 1000),
+    ('1000-2000', 1000, 2000),
+    ('2000-5000', 2000, 5000),
+    ('5000+', 5000, None),
+]
+
+SIZE_RANK = {code: rank for rank, (code, _) in enumerate(ProductVariant.SIZE_CHOICES)}
+
+# Query params that narrow the product list and get facet counts
+FACET_PARAMS = ('category', 'size', 'brand', 'min_price', 'max_price', 'in_stock')
+
+
+def _values(params, name):
+    return [value for value in params.get(name, '').split(',') if value]
+
+
+def _ids(params, name):
+    try:
+        return [int(value) for value in _values(params, name)]
+    except ValueError:
+        raise ValidationError({name: 'Invalid id'})
+
+
+def _price(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'Invalid price'})
+    # Decimal also parses NaN and Infinity
+    if not price.is_finite():
+        raise ValidationError({name: 'Invalid price'})
+    return price
+
+
+def facet_filters(params):
+    """
+    Filter conditions for the facet filters present in `params`, keyed by facet.
+
+    size, brand and category accept comma-separated values
+    (?size=M,L&brand=Arrow), size keeps products sold in any of the sizes,
+    prices are inclusive bounds and in_stock=true keeps products with stock
+    left.
+    """
+    filters = {}
+    if categories := _ids(params, 'category'):
+        filters['category'] = Q(category_id__in=categories)
+    if sizes := _values(params, 'size'):
+        filters['size'] = Exists(ProductVariant.objects.filter(product=OuterRef('pk'), size__in=sizes))
+    if brands := _values(params, 'brand'):
+        filters['brand'] = Q(brand__in=brands)
+
+    price = Q()
+    if (min_price := _price(params, 'min_price')) is not None:
+        price &= Q(price__gte=min_price)
+    if (max_price := _price(params, 'max_price')) is not None:
+        price &= Q(price__lte=max_price)
+    if price:
+        filters['price'] = price
+
+    if params.get('in_stock') == 'true':
+        filters['in_stock'] = Q(stock__gt=0)
+    return filters
+
+
+def apply_facet_filters(queryset, params):
+    for condition in facet_filters(params).values():
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def _facet_cache_key(queryset, params):
+    selected = sorted((name, params.get(name)) for name in FACET_PARAMS if params.get(name))
+    digest = hashlib.md5(
+        json.dumps([str(queryset.query), selected]).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'facets:{get_catalog_version()}:{digest}'
+
+
+def facet_counts(queryset, params):
+    """
+    Counts for every facet value given the current selection.
+
+    Each facet is counted with every filter applied except its own, so the
+    shopper can see how many items each alternative would add. That is one
+    grouped query per facet (five in total) whatever the catalog size. Size
+    counts are products sold in that size.
+    Results are cached until the catalog version changes.
+    """
+    queryset = queryset.order_by()
+    key = _facet_cache_key(queryset, params)
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+
+    filters = facet_filters(params)
+
+    def narrowed(facet):
+        qs = queryset
+        for name, condition in filters.items():
+            if name != facet:
+                qs = qs.filter(condition)
+        return qs
+
+    counts = {
+        'category': [
+            {'value': row['category_id'], 'label': row['category__name'], 'count': row['count']}
+            for row in narrowed('category').values('category_id', 'category__name')
+            .annotate(count=Count('id')).order_by('category__name')
+        ],
+        'size': sorted(
+            (
+                {'value': row['size'], 'count': row['count']}
+                for row in ProductVariant.objects.filter(product__in=narrowed('size').values('pk'))
+                .values('size').annotate(count=Count('id')).order_by()
+            ),
+            key=lambda facet: SIZE_RANK.get(facet['value'], len(SIZE_RANK)),
+        ),
+        'brand': [
+            {'value': row['brand'], 'count': row['count']}
+            for row in narrowed('brand').values('brand').annotate(count=Count('id')).order_by('brand')
+        ],
+    }
+
+    buckets = narrowed('price').aggregate(**{
+        f'bucket_{i}': Count('id', filter=Q(price__gte=low) & (Q(price__lt=high) if high else Q()))
+        for i, (_, low, high) in enumerate(PRICE_BUCKETS)
+    })
+    counts['price'] = [
+        {'value': label, 'min': low, 'max': high, 'count': buckets[f'bucket_{i}']}
+        for i, (label, low, high) in enumerate(PRICE_BUCKETS)
+    ]
+
+    stock = narrowed('in_stock').aggregate(
+        in_stock=Count('id', filter=Q(stock__gt=0)),
+        out_of_stock=Count('id', filter=Q(stock__lte=0)),
+    )
+    counts['in_stock'] = [
+        {'value': True, 'count': stock['in_stock']},
+        {'value': False, 'count': stock['out_of_stock']},
+    ]
+
+    cache.set(key, counts, settings.CATALOG_CACHE_TTL)
+    return counts
@@ -0,0 +1,154 @@
+"""
+Product image uploads and their resized derivatives.
+
+An upload is stored once under a fresh name (see models.product_image_path).
+After the transaction commits, a background thread renders each variant in
+WebP and JPEG next to it and records the names on the product. Derivative
+names include the original's name and the variant size, so a file never
+changes once written and can be cached by browsers for a year.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from PIL import Image, ImageOps
+
+from .cache import invalidate_catalog
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Variant -> (width, height, crop). Cropped variants fill the box exactly;
+# the others are shrunk to fit inside it, keeping their aspect ratio.
+IMAGE_VARIANTS = {
+    'grid': (480, 480, True),
+    'detail': (1200, 1200, False),
+    'cart': (160, 160, True),
+}
+
+# Format -> (Pillow format, save options)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Largest accepted upload, in bytes
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+
+_builder = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+
+
+def derivative_name(original, variant, file_format):
+    width, height, _ = IMAGE_VARIANTS[variant]
+    stem = PurePosixPath(original).stem
+    return f'products/derived/{stem}-{variant}-{width}x{height}.{file_format}'
+
+
+def expected_derivatives(original):
+    """The derivative names build_derivatives records for `original`"""
+    return {
+        variant: {file_format: derivative_name(original, variant, file_format) for file_format in DERIVATIVE_FORMATS}
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def render(image, width, height, crop):
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+    return resized
+
+
+def load_original(name):
+    """The original as an RGB image, upright, decoded no larger than needed"""
+    with default_storage.open(name) as f:
+        image = Image.open(f)
+        # JPEG can decode straight to a reduced size, far faster than a full decode
+        largest = max(max(width, height) for width, height, _ in IMAGE_VARIANTS.values())
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def build_derivatives(product_id):
+    """
+    Write any missing derivatives of the product's image and record them.
+    Files that already exist are kept, so running it again is cheap.
+    """
+    original = Product.objects.filter(pk=product_id).values_list('image', flat=True).first()
+    if not original:
+        return
+    names = expected_derivatives(original)
+    image = None
+    for variant, formats in names.items():
+        resized = None
+        for file_format, name in formats.items():
+            if default_storage.exists(name):
+                continue
+            if image is None:
+                image = load_original(original)
+            if resized is None:
+                resized = render(image, *IMAGE_VARIANTS[variant])
+            pillow_format, options = DERIVATIVE_FORMATS[file_format]
+            buffer = BytesIO()
+            resized.save(buffer, pillow_format, **options)
+            formats[file_format] = default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    # Only if the image was not replaced in the meantime
+    if Product.objects.filter(pk=product_id, image=original).update(image_derivatives=names):
+        invalidate_catalog()
+
+
+def _build_in_background(product_id):
+    close_old_connections()
+    try:
+        build_derivatives(product_id)
+    except Exception:
+        logger.exception('Could not build image derivatives for product %s', product_id)
+    finally:
+        connection.close()
+
+
+def schedule_derivatives(product_id):
+    """Build the product's derivatives once the current transaction commits"""
+    if settings.IMAGE_DERIVATIVES_IN_BACKGROUND:
+        transaction.on_commit(lambda: _builder.submit(_build_in_background, product_id))
+    else:
+        transaction.on_commit(lambda: build_derivatives(product_id))
+
+
+def delete_image_files(original, derivatives):
+    for name in [original] + [name for formats in derivatives.values() for name in formats.values()]:
+        if name:
+            default_storage.delete(name)
+
+
+def set_product_image(product, upload):
+    """Store `upload` as the product's image and queue its derivatives"""
+    previous = product.image.name, product.image_derivatives
+    with transaction.atomic():
+        product.image.save(upload.name, upload, save=False)
+        product.image_derivatives = {}
+        product.save(update_fields=['image', 'image_derivatives', 'updated_at'])
+        transaction.on_commit(lambda: delete_image_files(*previous))
+        schedule_derivatives(product.pk)
+
+
+def remove_product_image(product):
+    previous = product.image.name, product.image_derivatives
+    with transaction.atomic():
+        product.image = ''
+        product.image_derivatives = {}
+        product.save(update_fields=['image', 'image_derivatives', 'updated_at'])
+        transaction.on_commit(lambda: delete_image_files(*previous))
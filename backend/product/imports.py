@@ -0,0 +1,246 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from urllib.parse import urlsplit
+
+from django.db import transaction
+
+from .cache import invalidate_catalog
+from .models import Cart, Category, Product, ProductVariant
+from .search import refresh_search_vectors
+from .services import refresh_cart_summaries, refresh_product_stock
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# Rows validated and upserted per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Per-row errors returned in the report; the total is always counted
+MAX_REPORTED_ERRORS = 1000
+
+# Columns written on insert and overwritten when the SKU already exists
+IMPORT_FIELDS = [
+    'name', 'description', 'price', 'category', 'image_url', 'brand', 'is_featured',
+]
+
+# Columns of the row's size, written on insert and overwritten when the
+# product already has that size
+VARIANT_IMPORT_FIELDS = ['stock', 'price']
+
+SIZES = {code for code, _ in ProductVariant.SIZE_CHOICES}
+BOOLEAN_VALUES = {
+    '1': True, 'true': True, 'yes': True, 'y': True,
+    '': False, '0': False, 'false': False, 'no': False, 'n': False,
+}
+
+
+def import_format(filename):
+    """csv or jsonl, from the file name's extension; None if unknown"""
+    extension = filename.rsplit('.', 1)[-1].lower()
+    return {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(extension)
+
+
+def read_rows(lines, file_format):
+    """Yield each record of a CSV or JSON Lines text stream as a dict"""
+    if file_format == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # Rows that are not JSON objects are reported by validate_row
+        yield row if isinstance(row, dict) else {}
+
+
+def category_map():
+    """Category ids keyed by id and by lower-cased name, loaded in one query"""
+    categories = {}
+    for pk, name in Category.objects.values_list('id', 'name'):
+        categories[str(pk)] = pk
+        categories.setdefault(name.strip().lower(), pk)
+    return categories
+
+
+def _text(row, name, max_length, required=True):
+    value = row.get(name)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError('This field is required.')
+    if len(value) > max_length:
+        raise ValueError(f'Ensure this field has no more than {max_length} characters.')
+    return value
+
+
+def _price(row, categories):
+    try:
+        value = Decimal(str(row.get('price', '')).strip())
+    except InvalidOperation:
+        raise ValueError('A valid number is required.')
+    if not value.is_finite() or value < 0 or value >= Decimal('1e8'):
+        raise ValueError('Enter a price between 0 and 99999999.99.')
+    return value.quantize(Decimal('0.01'))
+
+
+def _category(row, categories):
+    key = str(row.get('category') or row.get('category_id') or '').strip().lower()
+    if key not in categories:
+        raise ValueError(f'Unknown category "{key}".' if key else 'This field is required.')
+    return categories[key]
+
+
+def _image_url(row, categories):
+    value = _text(row, 'image_url', 500, required=False)
+    # A structural check; URLValidator's regex would dominate the import time
+    if value:
+        parts = urlsplit(value)
+        if parts.scheme not in ('http', 'https') or not parts.netloc or ' ' in value:
+            raise ValueError('Enter a valid URL.')
+    return value
+
+
+def _stock(row, categories):
+    value = row.get('stock')
+    if value in (None, ''):
+        return 0
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError('A valid integer is required.')
+
+
+def _size(row, categories):
+    value = _text(row, 'size', 3, required=False).upper() or 'M'
+    if value not in SIZES:
+        raise ValueError(f'"{value}" is not a valid size.')
+    return value
+
+
+def _is_featured(row, categories):
+    value = row.get('is_featured')
+    if isinstance(value, bool):
+        return value
+    value = '' if value is None else str(value).strip().lower()
+    if value not in BOOLEAN_VALUES:
+        raise ValueError('Must be a valid boolean.')
+    return BOOLEAN_VALUES[value]
+
+
+# Field -> parser(row, categories); parsers raise ValueError
+ROW_PARSERS = {
+    'sku': lambda row, categories: _text(row, 'sku', 64),
+    'name': lambda row, categories: _text(row, 'name', 200),
+    'description': lambda row, categories: _text(row, 'description', 100_000, required=False),
+    'price': _price,
+    'category_id': _category,
+    'image_url': _image_url,
+    'stock': _stock,
+    'size': _size,
+    'brand': lambda row, categories: _text(row, 'brand', 100, required=False),
+    'is_featured': _is_featured,
+}
+
+
+def validate_row(row, categories):
+    """
+    Build an unsaved ProductVariant, with its unsaved Product, from one
+    import record. Returns (variant, errors) where errors maps a column to
+    its message.
+
+    Columns: sku, name, price, category (id or name; category_id also
+    accepted), description, image_url, stock, size, brand, is_featured.
+    """
+    if not row:
+        return None, {'row': 'Not a valid record.'}
+    values, errors = {}, {}
+    for name, parse in ROW_PARSERS.items():
+        try:
+            values[name] = parse(row, categories)
+        except ValueError as e:
+            errors[name] = str(e)
+    if errors:
+        return None, errors
+    size, stock = values.pop('size'), values.pop('stock')
+    return ProductVariant(product=Product(**values), size=size, stock=stock, price=values['price']), {}
+
+
+def _upsert(variants):
+    """
+    Insert or update one batch of products by SKU and their sizes by
+    (product, size); returns (created, updated) product counts
+    """
+    products = {variant.product.sku: variant.product for variant in variants}
+    skus = list(products)
+    with transaction.atomic():
+        existing = set(Product.objects.filter(sku__in=skus).values_list('sku', flat=True))
+        Product.objects.bulk_create(
+            list(products.values()),
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=IMPORT_FIELDS + ['updated_at'],
+        )
+        ids = dict(Product.objects.filter(sku__in=skus).values_list('sku', 'id'))
+        ProductVariant.objects.bulk_create(
+            [
+                ProductVariant(
+                    product_id=ids[variant.product.sku],
+                    size=variant.size,
+                    stock=variant.stock,
+                    # A size is only priced on its own when it differs from the product
+                    price=None if variant.price == products[variant.product.sku].price else variant.price,
+                )
+                for variant in variants
+            ],
+            update_conflicts=True,
+            unique_fields=['product', 'size'],
+            update_fields=VARIANT_IMPORT_FIELDS,
+        )
+        # bulk_create sends no signals, so do what they would have done
+        selection = Product.objects.filter(sku__in=skus)
+        refresh_product_stock(selection)
+        refresh_search_vectors(selection)
+        if existing:
+            refresh_cart_summaries(Cart.objects.filter(items__product__sku__in=existing))
+    return len(skus) - len(existing), len(existing)
+
+
+def import_products(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate and upsert product records (dicts) keyed by SKU.
+
+    Rows sharing a SKU are sizes of one product: the product takes its
+    fields from the last of them, and each row sets the stock of its size
+    (and the size's own price when it differs). Rows are consumed lazily in
+    batches; each batch is checked against one preloaded category map and
+    written with one bulk_create(update_conflicts=True) for the products
+    and one for their sizes, in its own transaction. Invalid rows are
+    skipped and reported by their 1-based row number. When a SKU and size
+    occur twice, the later row wins.
+    """
+    categories = category_map()
+    report = {'created': 0, 'updated': 0, 'error_count': 0, 'errors': []}
+    rows = iter(rows)
+    row_number = 0
+    while batch := list(islice(rows, batch_size)):
+        variants = {}
+        for row in batch:
+            row_number += 1
+            variant, errors = validate_row(row, categories)
+            if errors:
+                report['error_count'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'row': row_number, 'errors': errors})
+            else:
+                variants[variant.product.sku, variant.size] = variant
+        if variants:
+            created, updated = _upsert(list(variants.values()))
+            report['created'] += created
+            report['updated'] += updated
+
+    if report['created'] or report['updated']:
+        invalidate_catalog()
+    return report
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from product.models import OrderItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy product name, brand, size and image onto order lines placed before '
+        'order items stored a product snapshot. Lines are processed in primary '
+        'key batches, one transaction per batch, so the command can be stopped '
+        'and re-run safely.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        pending = OrderItem.objects.filter(product_name='', product__isnull=False)
+        last_pk, updated = 0, 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    pending.filter(pk__gt=last_pk).select_related('product', 'variant')
+                    .order_by('pk')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                for item in batch:
+                    item.snapshot(item.product, item.variant)
+                OrderItem.objects.bulk_update(batch, list(OrderItem.SNAPSHOT_FIELDS) + ['product_size'])
+            last_pk = batch[-1].pk
+            updated += len(batch)
+            self.stdout.write(f'{updated} order lines updated')
+        self.stdout.write(self.style.SUCCESS(f'Done, {updated} order lines updated'))
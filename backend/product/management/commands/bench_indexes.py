@@ -0,0 +1,128 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from product.admin_views import order_stats, product_stats
+from product.models import Category, Order, Product
+from product.seeding import seed_categories, seed_orders, seed_products, seed_users
+
+# Indexes added for the product/order list filters, benchmarked with and without
+BENCHMARKED_INDEXES = {
+    Product: [
+        'product_created_id_idx', 'product_category_created_idx',
+        'product_featured_idx',
+    ],
+    Order: [
+        'order_user_created_id_idx', 'order_created_id_idx', 'order_status_created_idx',
+    ],
+}
+
+
+def query_shapes():
+    """The querysets issued by views.py and admin_views.py, keyed by a label"""
+    category_id = Category.objects.values_list('id', flat=True).first()
+    user_id = Order.objects.values_list('user_id', flat=True).first()
+    page = slice(120, 132)
+    return {
+        'products newest page 11': lambda: Product.objects.order_by('-created_at', '-id')[page],
+        'products by category': lambda: Product.objects.filter(
+            category_id=category_id).order_by('-created_at', '-id')[:12],
+        'featured products': lambda: Product.objects.filter(
+            is_featured=True).order_by('-created_at', '-id')[:12],
+        'product stats': product_stats,
+        'order history': lambda: Order.objects.filter(
+            user_id=user_id).order_by('-created_at', '-id')[:12],
+        'admin orders by status': lambda: Order.objects.filter(
+            status='processing').order_by('-created_at', '-id')[:12],
+        'admin orders newest': lambda: Order.objects.order_by('-created_at', '-id')[:12],
+        'order stats': order_stats,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a scratch database with products and orders, then time the hot '
+        'product/order queries with and without the filter/sort indexes. '
+        'Do not run against a database holding real data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000)
+        parser.add_argument('--orders', type=int, default=5_000_000)
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--skip-seed', action='store_true')
+        parser.add_argument('--explain', action='store_true', help='Print query plans')
+
+    def handle(self, *args, **options):
+        if not options['skip_seed']:
+            self.seed(options)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        shapes = query_shapes()
+        self.stdout.write('Timing without indexes')
+        self.set_indexes(enabled=False)
+        before = self.run_queries(shapes, options)
+        self.stdout.write('Timing with indexes')
+        self.set_indexes(enabled=True)
+        after = self.run_queries(shapes, options)
+
+        self.stdout.write(f"\n{'query':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        for label in shapes:
+            speedup = before[label] / after[label] if after[label] else float('inf')
+            self.stdout.write(
+                f'{label:<28}{before[label]:>12.2f}{after[label]:>12.2f}{speedup:>9.1f}x'
+            )
+
+    def set_indexes(self, enabled):
+        with connection.schema_editor() as editor:
+            for model, names in BENCHMARKED_INDEXES.items():
+                for index in model._meta.indexes:
+                    if index.name not in names:
+                        continue
+                    if enabled:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE product_product, product_order')
+
+    def run_queries(self, shapes, options):
+        timings = {}
+        for label, build in shapes.items():
+            if options['explain']:
+                queryset = build()
+                if isinstance(queryset, dict):
+                    self.stdout.write(f'-- {label}: aggregate, see timings')
+                elif connection.vendor == 'postgresql':
+                    self.stdout.write(f'-- {label}\n{queryset.explain(analyze=True)}')
+                else:
+                    self.stdout.write(f'-- {label}\n{queryset.explain()}')
+            samples = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                result = build()
+                if not isinstance(result, dict):
+                    list(result)
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[label] = statistics.median(samples)
+        return timings
+
+    def seed(self, options):
+        rng = random.Random(42)
+        batch = options['batch_size']
+        category_ids = seed_categories()
+        self.stdout.write(f"Seeding {options['users']} users")
+        user_ids = seed_users(options['users'], batch, prefix='bench-user')
+        self.stdout.write(f"Seeding {options['products']} products")
+        variants = seed_products(options['products'], category_ids, rng, batch, sku_prefix='BENCH')
+        self.stdout.write(f"Seeding {options['orders']} orders")
+        # Only the order rows matter to these queries; lines would triple the seeding time
+        seed_orders(options['orders'], user_ids, variants, rng, batch, with_items=False)
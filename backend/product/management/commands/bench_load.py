@@ -0,0 +1,97 @@
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Synchronous DRF read endpoints and their async counterparts
+ENDPOINTS = {
+    'wsgi': ['/api/products/', '/api/products/featured/', '/api/categories/'],
+    'asgi': ['/api/async/products/', '/api/async/products/featured/', '/api/async/categories/'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the catalog read endpoints of a running WSGI and ASGI server '
+        'and report requests/sec and latency percentiles for each. Start both '
+        'with the same worker count, for example:\n'
+        '  gunicorn backend_django.wsgi -w 4 -b 127.0.0.1:8000\n'
+        '  gunicorn backend_django.asgi -w 4 -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8001\n'
+        'Use --no-cache-bust to measure cached responses instead of the database path.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', default='http://127.0.0.1:8000', help='Base URL of the WSGI server')
+        parser.add_argument('--asgi', default='http://127.0.0.1:8001', help='Base URL of the ASGI server')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per endpoint')
+        parser.add_argument(
+            '--no-cache-bust', dest='cache_bust', action='store_false',
+            help='Reuse one URL per endpoint so responses come from the catalog cache'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'server':<8}{'endpoint':<34}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+        )
+        for server in ('wsgi', 'asgi'):
+            base = urlsplit(options[server])
+            if base.scheme != 'http':
+                raise CommandError(f'--{server} must be an http:// URL')
+            for path in ENDPOINTS[server]:
+                stats = self.load(base.netloc, path, options)
+                self.stdout.write(
+                    f"{server:<8}{path:<34}{stats['rps']:>10.1f}{stats['p50']:>10.1f}"
+                    f"{stats['p99']:>10.1f}{stats['errors']:>8}"
+                )
+
+    def load(self, netloc, path, options):
+        deadline = time.monotonic() + options['duration']
+        counter = iter(range(10 ** 12))
+        lock = threading.Lock()
+
+        def worker():
+            # One keep-alive connection per simulated client
+            connection = http.client.HTTPConnection(netloc, timeout=30)
+            latencies, errors = [], 0
+            while time.monotonic() < deadline:
+                url = path
+                if options['cache_bust']:
+                    # A unique unused parameter gives every request its own
+                    # catalog cache key, so each one reaches the database
+                    with lock:
+                        url = f'{path}?bench={next(counter)}'
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', url)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        errors += 1
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    connection.close()
+                    connection = http.client.HTTPConnection(netloc, timeout=30)
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+            connection.close()
+            return latencies, errors
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(lambda _: worker(), range(options['concurrency'])))
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+        if not latencies:
+            return {'rps': 0, 'p50': 0, 'p99': 0, 'errors': sum(errors for _, errors in results)}
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            'errors': sum(errors for _, errors in results),
+        }
@@ -0,0 +1,83 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from product.models import Category, Product, ProductVariant
+from product.serializers import ProductRowSerializer, ProductSerializer
+
+GRID_FIELDS = ['id', 'name', 'price', 'image_url']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Time product list serialization per 1,000 products, excluding the '
+        'queries: the full ModelSerializer, a sparse ModelSerializer and the '
+        '.values() fast path. '
+        'Benchmark rows are created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['products'])
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        category = Category.objects.create(
+            name='Benchmark', description='Category description ' * 20
+        )
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Benchmark product {i}', description='Long product description ' * 30,
+                price=Decimal('999.00'), category=category, image_url=f'https://example.com/{i}.jpg',
+                stock=30, brand='Benchmark',
+            )
+            for i in range(count)
+        ])
+        ProductVariant.objects.bulk_create([
+            ProductVariant(product=product, size=size, stock=10)
+            for product in products for size in ('S', 'M', 'L')
+        ])
+
+    def run(self, options):
+        queryset = Product.objects.catalog().filter(category__name='Benchmark')
+        row_serializer = ProductRowSerializer(GRID_FIELDS)
+        # Loaded once: only serialization is timed, not the queries
+        products = list(queryset)
+        rows = list(queryset.values(*row_serializer.columns()))
+
+        def full():
+            return ProductSerializer(products, many=True).data
+
+        def sparse():
+            serializer = ProductSerializer(products, many=True)
+            serializer.child.restrict({name: {} for name in GRID_FIELDS}, expand=set())
+            return serializer.data
+
+        def values():
+            return [row_serializer.to_representation(row) for row in rows]
+
+        per_thousand = 1000 / options['products']
+        self.stdout.write(f"{'path':<24}{'ms / 1000 products':>20}")
+        for label, run in (('full ModelSerializer', full), ('sparse ModelSerializer', sparse),
+                           ('values() fast path', values)):
+            samples = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                run()
+                samples.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(f'{label:<24}{statistics.median(samples) * per_thousand:>20.2f}')
@@ -0,0 +1,263 @@
+import json
+import math
+import random
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.utils import timezone
+
+from product.authentication import issue_token
+from product.models import Cart, Category, Order, Product, ProductVariant
+from product.seeding import BRANDS, CATEGORIES, COLOURS, MATERIALS, seed_users
+from product.services import clear_cart
+
+# Endpoint -> share of the traffic, roughly a storefront's mix
+TRAFFIC_MIX = {
+    'browse': 30,
+    'browse_category': 10,
+    'product_detail': 15,
+    'featured': 5,
+    'search': 12,
+    'cart_add': 12,
+    'cart_view': 6,
+    'checkout': 5,
+    'admin_dashboard': 3,
+    'admin_product_stats': 2,
+}
+
+PERCENTILES = {'p50_ms': 0.50, 'p95_ms': 0.95, 'p99_ms': 0.99}
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Shopper:
+    """
+    One simulated client. Requests go through the full Django stack (URL
+    routing, middleware, authentication) in process, without a network hop.
+    """
+
+    def __init__(self, targets, tokens, admin_token, seed):
+        self.client = Client(raise_request_exception=False)
+        self.targets = targets
+        self.tokens = tokens
+        self.admin_token = admin_token
+        self.rng = random.Random(seed)
+
+    def request(self, method, path, data=None, token=None):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        if method == 'get':
+            return self.client.get(path, data, headers=headers)
+        return self.client.post(path, data, content_type='application/json', headers=headers)
+
+    def prepare(self, endpoint):
+        """Build the measured request; checkout first puts an item in the cart"""
+        rng, targets = self.rng, self.targets
+        token = rng.choice(self.tokens)
+        variant_id, product_id = rng.choice(targets['variants'])
+        if endpoint == 'browse':
+            return 'get', f'/api/products/?page={rng.randint(1, 5)}', None, None
+        if endpoint == 'browse_category':
+            category_id = rng.choice(targets['categories'])
+            return 'get', f'/api/products/?category={category_id}&page={rng.randint(1, 3)}', None, None
+        if endpoint == 'product_detail':
+            return 'get', f'/api/products/{product_id}/', None, None
+        if endpoint == 'featured':
+            return 'get', '/api/products/featured/', None, None
+        if endpoint == 'search':
+            return 'get', f"/api/products/?search={rng.choice(targets['terms'])}", None, None
+        if endpoint == 'cart_add':
+            return 'post', '/api/cart/add/', {'variant_id': variant_id, 'quantity': 1}, token
+        if endpoint == 'cart_view':
+            return 'get', '/api/cart/', None, token
+        if endpoint == 'checkout':
+            self.request('post', '/api/cart/add/', {'variant_id': variant_id, 'quantity': 1}, token)
+            body = {'shipping_address': '12 Market Road, Kochi', 'phone_number': '9999999999'}
+            return 'post', '/api/orders/', body, token
+        if endpoint == 'admin_dashboard':
+            return 'get', '/api/admin/dashboard/', None, self.admin_token
+        return 'get', '/api/admin/products/stats/', None, self.admin_token
+
+    def run(self, mix, count, warmup):
+        endpoints, weights = list(mix), list(mix.values())
+        samples = []
+        for i in range(warmup + count):
+            endpoint = self.rng.choices(endpoints, weights)[0]
+            method, path, data, token = self.prepare(endpoint)
+            start = time.perf_counter()
+            response = self.request(method, path, data, token)
+            elapsed = (time.perf_counter() - start) * 1000
+            if i < warmup:
+                continue
+            queries = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+            samples.append((endpoint, elapsed, response.status_code, queries and int(queries[1])))
+        return samples
+
+    def run_in_thread(self, mix, count, warmup):
+        try:
+            return self.run(mix, count, warmup)
+        finally:
+            # Each worker thread opens its own database connections
+            connections.close_all()
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample[1] for sample in samples)
+    queries = [sample[3] for sample in samples if sample[3] is not None]
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 1),
+        'errors': sum(1 for sample in samples if sample[2] >= 500),
+        'client_errors': sum(1 for sample in samples if 400 <= sample[2] < 500),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        **{name: round(percentile(latencies, fraction), 2) for name, fraction in PERCENTILES.items()},
+        'max_ms': round(latencies[-1], 2),
+        'mean_queries': round(statistics.fmean(queries), 1) if queries else None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a storefront traffic mix (browse, search, add to cart, checkout, '
+        'admin stats) through the real URL routes and middleware, in process and '
+        'fully offline, and report throughput and p50/p95/p99 latency per '
+        'endpoint as JSON. Runs are repeatable for a given --seed and can be '
+        'compared with --baseline. Checkout writes orders and decrements stock, '
+        'so run it against a scratch database filled by seed_shop. On SQLite keep '
+        '--concurrency at 1, as concurrent writers lock the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Timed requests in total')
+        parser.add_argument('--warmup', type=int, default=200, help='Untimed requests in total')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--shoppers', type=int, default=50, help='Distinct customer accounts')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--exclude', action='append', choices=TRAFFIC_MIX, default=[],
+            help='Leave an endpoint out of the mix (repeatable). SQLite searches with a '
+                 'pure-Python scorer, so exclude search there for comparable numbers.'
+        )
+        parser.add_argument('--cold-cache', action='store_true', help='Clear the cache before the run')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='JSON report of an earlier run to compare with')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < options['concurrency']:
+            raise CommandError('--requests must be at least --concurrency, which must be positive')
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read the baseline: {e}')
+
+        targets = self.targets()
+        tokens, admin_token = self.accounts(options['shoppers'])
+        if options['cold_cache']:
+            cache.clear()
+
+        mix = {endpoint: weight for endpoint, weight in TRAFFIC_MIX.items() if endpoint not in options['exclude']}
+        if not mix:
+            raise CommandError('Every endpoint is excluded')
+        concurrency = options['concurrency']
+        shoppers = [
+            Shopper(targets, tokens[worker::concurrency] or tokens, admin_token, options['seed'] + worker)
+            for worker in range(concurrency)
+        ]
+        per_worker = options['requests'] // concurrency
+        warmup = options['warmup'] // concurrency
+
+        started_at = timezone.now()
+        start = time.perf_counter()
+        if concurrency == 1:
+            results = [shoppers[0].run(mix, per_worker, warmup)]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(lambda shopper: shopper.run_in_thread(mix, per_worker, warmup), shoppers))
+        elapsed = time.perf_counter() - start
+
+        samples = [sample for worker_samples in results for sample in worker_samples]
+        by_endpoint = {}
+        for sample in samples:
+            by_endpoint.setdefault(sample[0], []).append(sample)
+        report = {
+            'meta': {
+                'started_at': started_at.isoformat(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'products': Product.objects.count(),
+                'orders': Order.objects.count(),
+                'users': User.objects.count(),
+                'concurrency': concurrency,
+                'warmup': warmup * concurrency,
+                'seed': options['seed'],
+                'mix': mix,
+                'duration_s': round(elapsed, 2),
+            },
+            'overall': summarize(samples, elapsed),
+            'endpoints': {
+                endpoint: summarize(by_endpoint[endpoint], elapsed)
+                for endpoint in TRAFFIC_MIX if endpoint in by_endpoint
+            },
+        }
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.print_table(report, baseline)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+            if baseline:
+                self.print_table(report, baseline)
+
+    def targets(self):
+        variants = list(
+            ProductVariant.objects.filter(stock__gte=20).order_by('id').values_list('id', 'product_id')[:2000]
+        )
+        categories = list(Category.objects.order_by('id').values_list('id', flat=True))
+        if not variants or not categories:
+            raise CommandError('No products in stock; fill the database with seed_shop first')
+        # Words the seeded catalog uses, plus a misspelling for the fuzzy path
+        terms = [word.lower() for word in COLOURS + MATERIALS + BRANDS + list(CATEGORIES.values())]
+        return {'variants': variants, 'categories': categories, 'terms': terms + ['cottn', 'jaket']}
+
+    def accounts(self, count):
+        """Tokens for the benchmark shoppers, with empty carts, and for an admin"""
+        seed_users(count, prefix='bench-shopper')
+        shoppers = list(User.objects.filter(username__startswith='bench-shopper-').order_by('id')[:count])
+        for cart in Cart.objects.filter(user__in=shoppers):
+            clear_cart(cart)
+        admin, _ = User.objects.get_or_create(username='bench-admin', defaults={'is_staff': True})
+        return [issue_token(user).key for user in shoppers], issue_token(admin).key
+
+    def print_table(self, report, baseline):
+        header = f"{'endpoint':<22}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'errors':>8}"
+        if baseline:
+            header += f"{'p95 vs base':>13}"
+        self.stdout.write(header)
+        rows = {**report['endpoints'], 'overall': report['overall']}
+        for endpoint, stats in rows.items():
+            queries = '-' if stats['mean_queries'] is None else f"{stats['mean_queries']:.1f}"
+            line = (
+                f"{endpoint:<22}{stats['throughput_rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+                f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{queries:>9}{stats['errors']:>8}"
+            )
+            if baseline:
+                before = baseline['overall'] if endpoint == 'overall' else baseline['endpoints'].get(endpoint)
+                if before and before['p95_ms']:
+                    line += f"{(stats['p95_ms'] / before['p95_ms'] - 1) * 100:>+12.0f}%"
+            self.stdout.write(line)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from product.images import build_derivatives, expected_derivatives
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the missing thumbnails of uploaded product images, for example '
+        'after a restart dropped queued builds or after IMAGE_VARIANTS changed. '
+        'Products whose derivatives are up to date are skipped, so the command '
+        'can be stopped and re-run safely.'
+    )
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').order_by('pk').values_list('pk', 'image', 'image_derivatives')
+        built, failed = 0, 0
+        for pk, image, derivatives in products.iterator():
+            if derivatives == expected_derivatives(image):
+                continue
+            try:
+                build_derivatives(pk)
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                failed += 1
+                self.stderr.write(f'product {pk}: {e}')
+                continue
+            built += 1
+            if built % 100 == 0:
+                self.stdout.write(f'{built} products done')
+        self.stdout.write(self.style.SUCCESS(f'Done, {built} products built, {failed} failed'))
@@ -0,0 +1,41 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product.imports import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_format, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or update products from a CSV or JSON Lines file, keyed by SKU. '
+        'The file is streamed and written in batches; rejected rows are listed '
+        'with their errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--input-format', choices=IMPORT_FORMATS, help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        file_format = options['input_format'] or import_format(options['path'])
+        if file_format is None:
+            raise CommandError('Cannot tell the file format from its name, pass --input-format')
+
+        start = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                report = import_products(read_rows(lines, file_format), options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f"... {report['error_count'] - len(report['errors'])} more rejected rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} created, {report['updated']} updated, "
+            f"{report['error_count']} rejected in {elapsed:.1f}s"
+        ))
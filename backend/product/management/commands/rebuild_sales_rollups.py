@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product.analytics import rebuild_rollups
+from product.models import DailyProductSales, DailySales
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the daily sales rollups read by /api/admin/analytics/ from '
+        'the orders table. Run after migrating, or with --since to repair recent days.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild (YYYY-MM-DD); default all days')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date (YYYY-MM-DD)')
+
+        rebuild_rollups(since)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {DailySales.objects.count()} days and '
+            f'{DailyProductSales.objects.count()} product-days of sales'
+        ))
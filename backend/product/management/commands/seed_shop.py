@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product.seeding import SCALES, SEED_BATCH_SIZE, SEED_PASSWORD, seed_shop
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill a scratch database with synthetic categories, products, users, '
+        'carts and orders for benchmarks. Presets write roughly 10k (small), '
+        '100k (medium), 1M (large) and 10M (huge) rows; single counts can be '
+        'overridden. The same --seed always produces the same data. Do not run '
+        'against a database holding real data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        for table in ('products', 'users', 'carts', 'orders'):
+            parser.add_argument(f'--{table}', type=int, help='Default: from --scale')
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        counts = {
+            table: count if options[table] is None else options[table]
+            for table, count in SCALES[options['scale']].items()
+        }
+        start = time.perf_counter()
+        seed_shop(
+            **counts, seed=options['seed'], batch_size=options['batch_size'],
+            log=lambda message: self.stdout.write(f'{message} ({time.perf_counter() - start:.1f}s)'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {time.perf_counter() - start:.1f}s; '
+            f'users shopper-N log in with "{SEED_PASSWORD}"'
+        ))
@@ -0,0 +1,193 @@
+"""
+Per-endpoint request metrics.
+
+MetricsMiddleware times every request and, through a database execute
+wrapper, counts its SQL queries and the time spent in them. Requests are
+grouped by DRF view and action (e.g. CartViewSet.add_item). Each response
+gets a Server-Timing header, and the totals are exposed in the Prometheus
+text format by /api/admin/metrics/.
+
+The numbers are kept in memory per process, like prometheus_client does
+without its multiprocess mode, so each worker reports its own requests.
+The cost per request is a few perf_counter() calls and one short lock.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Methods reported under their own label; clients can send any verb, so
+# the rest share 'other' and cannot grow the registry without bound
+KNOWN_METHODS = frozenset({'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'})
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Query counter of the request being handled. asgiref copies the context
+# into sync_to_async threads, so async views' ORM calls are counted too.
+current_request = ContextVar('request_metrics', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every database connection"""
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver; the wrapper list outlives reconnects"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class EndpointMetrics:
+    __slots__ = ('buckets', 'count', 'latency', 'queries', 'db_time')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.latency = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, method, latency, stats):
+        with self._lock:
+            endpoint = self._endpoints.get((view, method))
+            if endpoint is None:
+                endpoint = self._endpoints[(view, method)] = EndpointMetrics()
+            endpoint.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+            endpoint.count += 1
+            endpoint.latency += latency
+            endpoint.queries += stats.queries
+            endpoint.db_time += stats.db_time
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            endpoints = sorted(
+                (key, (list(m.buckets), m.count, m.latency, m.queries, m.db_time))
+                for key, m in self._endpoints.items()
+            )
+
+        lines = [
+            '# HELP shop_request_duration_seconds Request latency per view and method.',
+            '# TYPE shop_request_duration_seconds histogram',
+        ]
+        for (view, method), (buckets, count, latency, _, _) in endpoints:
+            labels = f'view="{view}",method="{method}"'
+            cumulative = 0
+            for bound, observed in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                cumulative += observed
+                lines.append(f'shop_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'shop_request_duration_seconds_sum{{{labels}}} {latency:.6f}')
+            lines.append(f'shop_request_duration_seconds_count{{{labels}}} {count}')
+
+        lines += [
+            '# HELP shop_db_queries_total SQL queries run while handling requests.',
+            '# TYPE shop_db_queries_total counter',
+        ]
+        lines += [
+            f'shop_db_queries_total{{view="{view}",method="{method}"}} {queries}'
+            for (view, method), (_, _, _, queries, _) in endpoints
+        ]
+        lines += [
+            '# HELP shop_db_duration_seconds_total Time spent in SQL queries while handling requests.',
+            '# TYPE shop_db_duration_seconds_total counter',
+        ]
+        lines += [
+            f'shop_db_duration_seconds_total{{view="{view}",method="{method}"}} {db_time:.6f}'
+            for (view, method), (_, _, _, _, db_time) in endpoints
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def view_label(request):
+    """'ViewSet.action' for DRF viewsets, the view's name otherwise"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    func = match.func
+    cls = getattr(func, 'cls', None)
+    if cls is None:
+        return getattr(func, '__name__', match.view_name)
+    actions = getattr(func, 'actions', None) or {}
+    action = actions.get(request.method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+def method_label(request):
+    return request.method if request.method in KNOWN_METHODS else 'other'
+
+
+class MetricsMiddleware:
+    """Records latency, query count and DB time per view; adds Server-Timing"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, stats, start)
+
+    def finish(self, request, response, stats, start):
+        latency = time.perf_counter() - start
+        registry.observe(view_label(request), method_label(request), latency, stats)
+        response['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'total;dur={latency * 1000:.1f}'
+        )
+        return response
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:39
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    """AddIndex that only touches the database on PostgreSQL (GIN is unsupported elsewhere)"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def populate_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        UPDATE product_product AS p SET search_vector =
+            setweight(to_tsvector('english', coalesce(p.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(p.brand, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(c.name, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(p.description, '')), 'C')
+        FROM product_category AS c
+        WHERE c.id = p.category_id
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0003_hot_filter_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        AddPostgresIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        AddPostgresIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
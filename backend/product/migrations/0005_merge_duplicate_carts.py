@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """Move the lines of any extra carts a user has into their oldest cart"""
+    Cart = apps.get_model('product', 'Cart')
+    CartItem = apps.get_model('product', 'CartItem')
+    duplicates = (
+        Cart.objects.values('user_id')
+        .annotate(carts=Count('id'), keep=Min('id'))
+        .filter(carts__gt=1)
+    )
+    for group in duplicates:
+        extra = Cart.objects.filter(user_id=group['user_id']).exclude(pk=group['keep'])
+        CartItem.objects.filter(cart__in=extra).update(cart_id=group['keep'])
+        extra.delete()
+
+
+def merge_duplicate_cart_lines(apps, schema_editor):
+    """Fold repeated (cart, product) lines into the oldest one before adding the constraint"""
+    CartItem = apps.get_model('product', 'CartItem')
+    duplicates = (
+        CartItem.objects.values('cart_id', 'product_id')
+        .annotate(lines=Count('id'), keep=Min('id'), total=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    for group in duplicates:
+        CartItem.objects.filter(pk=group['keep']).update(quantity=group['total'])
+        CartItem.objects.filter(
+            cart_id=group['cart_id'], product_id=group['product_id']
+        ).exclude(pk=group['keep']).delete()
+
+
+# Kept apart from the constraints added in 0006: on PostgreSQL these updates
+# and deletes leave deferred foreign key checks pending, and a table with
+# pending checks cannot be altered in the same transaction.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_product_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+        migrations.RunPython(merge_duplicate_cart_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:55
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_cart_summaries(apps, schema_editor):
+    Cart = apps.get_model('product', 'Cart')
+    CartItem = apps.get_model('product', 'CartItem')
+    lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    money = DecimalField(max_digits=10, decimal_places=2)
+    Cart.objects.update(
+        item_count=Coalesce(Subquery(lines.annotate(count=Sum('quantity')).values('count')), 0),
+        total_amount=Coalesce(
+            Subquery(
+                lines.annotate(
+                    total=Sum(F('quantity') * F('product__price'), output_field=money)
+                ).values('total')
+            ),
+            Value(Decimal('0')),
+            output_field=money,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0006_cart_line_uniqueness_and_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(populate_cart_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0007_cart_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_brand',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image_url',
+            field=models.URLField(default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_size',
+            field=models.CharField(default='', max_length=3),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='product',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='product.product'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:28
+
+import product.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0010_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, upload_to=product.models.product_image_path),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+    ]
@@ -0,0 +1,55 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0011_product_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('XS', 'Extra Small'), ('S', 'Small'), ('M', 'Medium'), ('L', 'Large'), ('XL', 'Extra Large'), ('XXL', 'Double XL')], default='M', max_length=3)),
+                ('stock', models.IntegerField(default=0)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='product.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'size'), name='unique_product_size')],
+            },
+        ),
+        # Lines of one product in different sizes become separate lines
+        migrations.RemoveConstraint(
+            model_name='cartitem',
+            name='unique_cart_product',
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='variant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='product.productvariant'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='variant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='product.productvariant'),
+        ),
+        # Reservations are short-lived holds; they are dropped by the next
+        # migration and taken again on the next cart change
+        migrations.RemoveConstraint(
+            model_name='stockreservation',
+            name='unique_reservation_cart_product',
+        ),
+        migrations.RemoveIndex(
+            model_name='stockreservation',
+            name='reservation_product_exp_idx',
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='variant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='product.productvariant'),
+        ),
+    ]
@@ -0,0 +1,139 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 2000
+
+
+def merge_sizes(apps, schema_editor):
+    """
+    Turn every product into a parent with one variant per size.
+
+    Products that only differ in size (same category, name and brand,
+    ignoring case) are merged into the oldest of them; each row becomes a
+    variant with its stock, and its price when it differs from the
+    parent's. Cart lines, order lines and sales rollups of the merged rows
+    are moved to the parent, then the merged rows are deleted.
+    """
+    Product = apps.get_model('product', 'Product')
+    ProductVariant = apps.get_model('product', 'ProductVariant')
+    CartItem = apps.get_model('product', 'CartItem')
+    OrderItem = apps.get_model('product', 'OrderItem')
+    StockReservation = apps.get_model('product', 'StockReservation')
+    DailyProductSales = apps.get_model('product', 'DailyProductSales')
+
+    StockReservation.objects.all().delete()
+
+    groups = defaultdict(list)
+    rows = Product.objects.order_by('id').values_list(
+        'id', 'category_id', 'name', 'brand', 'size', 'stock', 'price', 'sku', 'image_url'
+    )
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        groups[(row[1], row[2].strip().lower(), row[3].strip().lower())].append(row)
+
+    variants = {}   # (parent id, size) -> ProductVariant
+    merged = {}     # merged product id -> (parent id, size)
+    fills = {}      # parent id -> {field: value} taken from merged rows
+    for group in groups.values():
+        parent_id, parent_price = group[0][0], group[0][6]
+        for product_id, _, _, _, size, stock, price, sku, image_url in group:
+            variant = variants.get((parent_id, size))
+            if variant is None:
+                variant = variants[(parent_id, size)] = ProductVariant(
+                    product_id=parent_id, size=size, stock=0,
+                    price=None if price == parent_price else price,
+                )
+            variant.stock += stock
+            if product_id != parent_id:
+                merged[product_id] = (parent_id, size)
+                fill = fills.setdefault(parent_id, {})
+                if sku and not group[0][7]:
+                    fill.setdefault('sku', sku)
+                if image_url and not group[0][8]:
+                    fill.setdefault('image_url', image_url)
+    ProductVariant.objects.bulk_create(variants.values(), batch_size=BATCH_SIZE)
+    variant_ids = {
+        (product_id, size): pk
+        for pk, product_id, size in ProductVariant.objects.values_list('id', 'product_id', 'size').iterator()
+    }
+
+    # Lines of products that were not merged: the variant of their own size
+    for size in {size for _, size in variants}:
+        own_variant = ProductVariant.objects.filter(product_id=OuterRef('product_id'), size=size)
+        for model in (CartItem, OrderItem):
+            model.objects.filter(product__size=size).update(variant_id=Subquery(own_variant.values('id')[:1]))
+
+    # Lines and rollups of merged products move to their parent
+    for product_id, (parent_id, size) in merged.items():
+        variant_id = variant_ids[(parent_id, size)]
+        CartItem.objects.filter(product_id=product_id).update(product_id=parent_id, variant_id=variant_id)
+        OrderItem.objects.filter(product_id=product_id).update(product_id=parent_id, variant_id=variant_id)
+        for sales in DailyProductSales.objects.filter(product_id=product_id):
+            parent_sales = DailyProductSales.objects.filter(product_id=parent_id, date=sales.date).first()
+            if parent_sales is None:
+                sales.product_id = parent_id
+                sales.save(update_fields=['product'])
+            else:
+                parent_sales.quantity += sales.quantity
+                parent_sales.revenue += sales.revenue
+                parent_sales.save(update_fields=['quantity', 'revenue'])
+                sales.delete()
+
+    # A cart holding two merged rows of the same size keeps one line
+    duplicates = (
+        CartItem.objects.values('cart_id', 'variant_id')
+        .annotate(lines=Count('id'), quantity=Sum('quantity'), keep=Min('id'))
+        .filter(lines__gt=1)
+    )
+    for line in list(duplicates):
+        CartItem.objects.filter(pk=line['keep']).update(quantity=line['quantity'])
+        CartItem.objects.filter(cart_id=line['cart_id'], variant_id=line['variant_id']).exclude(
+            pk=line['keep']
+        ).delete()
+
+    merged_ids = list(merged)
+    for start in range(0, len(merged_ids), BATCH_SIZE):
+        Product.objects.filter(id__in=merged_ids[start:start + BATCH_SIZE]).delete()
+    for parent_id, fill in fills.items():
+        if fill:
+            Product.objects.filter(pk=parent_id).update(**fill)
+
+    # Product.stock becomes the total over the sizes
+    totals = ProductVariant.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    Product.objects.update(stock=Coalesce(Subquery(totals.annotate(total=Sum('stock')).values('total')), 0))
+
+
+def restore_sizes(apps, schema_editor):
+    """
+    Give each product the size of its first variant. Merged rows are not
+    split again; cart lines of other sizes are folded into one line.
+    """
+    Product = apps.get_model('product', 'Product')
+    ProductVariant = apps.get_model('product', 'ProductVariant')
+    CartItem = apps.get_model('product', 'CartItem')
+
+    first = ProductVariant.objects.filter(product=OuterRef('pk')).order_by('id')
+    Product.objects.update(size=Coalesce(Subquery(first.values('size')[:1]), Value('M')))
+    duplicates = (
+        CartItem.objects.values('cart_id', 'product_id')
+        .annotate(lines=Count('id'), quantity=Sum('quantity'), keep=Min('id'))
+        .filter(lines__gt=1)
+    )
+    for line in list(duplicates):
+        CartItem.objects.filter(pk=line['keep']).update(quantity=line['quantity'])
+        CartItem.objects.filter(cart_id=line['cart_id'], product_id=line['product_id']).exclude(
+            pk=line['keep']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0012_product_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_sizes, restore_sizes),
+    ]
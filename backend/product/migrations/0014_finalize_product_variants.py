@@ -0,0 +1,47 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0013_merge_product_sizes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='stockreservation',
+            name='product',
+        ),
+        migrations.AlterField(
+            model_name='stockreservation',
+            name='variant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='product.productvariant'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockreservation',
+            constraint=models.UniqueConstraint(fields=('cart', 'variant'), name='unique_reservation_cart_variant'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['variant', 'expires_at'], name='reservation_variant_exp_idx'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='variant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.productvariant'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'variant'), name='unique_cart_variant'),
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='size',
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='stock',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
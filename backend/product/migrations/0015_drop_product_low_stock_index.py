@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0014_finalize_product_variants'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_low_stock_idx',
+        ),
+    ]
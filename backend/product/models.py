@@ -1,5 +1,11 @@
+import os
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files.storage import default_storage
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -12,7 +18,82 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def catalog(self):
+        """
+        Products with their category and sizes, without the (large) search
+        vector column. Variants are loaded with one prefetch query per page.
+        """
+        return self.select_related('category').defer('search_vector').prefetch_related(
+            models.Prefetch('variants', queryset=ProductVariant.objects.order_by('id'))
+        )
+
+def product_image_path(instance, filename):
+    # A fresh name per upload, so files (and their derivatives) never change
+    # under a URL that browsers may have cached
+    extension = os.path.splitext(filename)[1].lower()
+    return f'products/originals/{uuid.uuid4().hex}{extension}'
+
 class Product(models.Model):
+    # Stock keeping unit; the key bulk imports upsert on
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    name = models.CharField(max_length=200)
+    description = models.TextField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
+    # External image; products with an uploaded `image` may leave it blank
+    image_url = models.URLField(max_length=500, blank=True)
+    # Uploaded original, set through product.images.set_product_image
+    image = models.ImageField(upload_to=product_image_path, blank=True)
+    # Variant -> format -> storage name of the resized copies of `image`,
+    # filled in by product.images.build_derivatives once they exist
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    # Total stock of the product's variants, kept current by
+    # product.services.refresh_product_stock; sold per variant
+    stock = models.IntegerField(default=0, editable=False)
+    brand = models.CharField(max_length=100, default='')
+    is_featured = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by product.search.refresh_search_vectors (PostgreSQL only)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Full-text and typo-tolerant name search (PostgreSQL only)
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            # Newest-first listing and keyset pagination
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+            # Category filter on the public and admin product lists
+            models.Index(fields=['category', '-created_at', '-id'], name='product_category_created_idx'),
+            # Featured products, newest first
+            models.Index(
+                fields=['-created_at', '-id'], name='product_featured_idx',
+                condition=models.Q(is_featured=True),
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def thumbnail_url(self):
+        """
+        URL of the cart-size JPEG of the uploaded image, the original while
+        it is being built, or image_url for products without an upload
+        """
+        cart = (self.image_derivatives or {}).get('cart')
+        if cart:
+            return default_storage.url(cart['jpeg'])
+        if self.image:
+            return self.image.url
+        return self.image_url
+
+class ProductVariant(models.Model):
+    """One size of a product, with its own stock and optional price"""
     SIZE_CHOICES = [
         ('XS', 'Extra Small'),
         ('S', 'Small'),
@@ -22,45 +103,114 @@ class Product(models.Model):
         ('XXL', 'Double XL'),
     ]
 
-    name = models.CharField(max_length=200)
-    description = models.TextField()
-    price = models.DecimalField(max_digits=10, decimal_places=2)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
-    image_url = models.URLField(max_length=500)
-    stock = models.IntegerField(default=0)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
     size = models.CharField(max_length=3, choices=SIZE_CHOICES, default='M')
-    brand = models.CharField(max_length=100, default='')
-    is_featured = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    stock = models.IntegerField(default=0)
+    # Overrides the product's price for this size when set
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'size'], name='unique_product_size'),
+        ]
 
     def __str__(self):
-        return self.name
+        return f"{self.product.name} ({self.size})"
+
+    @property
+    def unit_price(self):
+        return self.product.price if self.price is None else self.price
+
+class CartQuerySet(models.QuerySet):
+    def with_items(self):
+        """Prefetch cart lines together with their variants, products and categories"""
+        return self.prefetch_related(
+            models.Prefetch(
+                'items',
+                queryset=CartItem.objects.select_related('product__category', 'variant').order_by('id'),
+            )
+        )
 
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart')
+    # Denormalized summary for the header badge, kept current by the cart
+    # services in the same transaction as each change
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # get_or_create(user=...) stays race-free with one cart per user
+            models.UniqueConstraint(fields=['user'], name='unique_user_cart'),
+        ]
+
     def __str__(self):
         return f"Cart - {self.user.username}"
 
     @property
     def total_price(self):
+        # Reuses the prefetched items when the cart was loaded with with_items()
         return sum(item.subtotal for item in self.items.all())
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE)
+    # The variant's product, so lines can be listed and repriced per product
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # One line per variant so quantity changes can be atomic increments
+            models.UniqueConstraint(fields=['cart', 'variant'], name='unique_cart_variant'),
+        ]
+
     def __str__(self):
-        return f"{self.quantity} x {self.product.name}"
+        return f"{self.quantity} x {self.variant}"
+
+    @property
+    def unit_price(self):
+        return self.product.price if self.variant.price is None else self.variant.price
 
     @property
     def subtotal(self):
-        return self.product.price * self.quantity
+        return self.unit_price * self.quantity
+
+class StockReservation(models.Model):
+    """
+    Stock held by a cart line until expires_at. Only written when
+    settings.CART_RESERVATION_TTL is set.
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'variant'], name='unique_reservation_cart_variant'),
+        ]
+        indexes = [
+            models.Index(fields=['variant', 'expires_at'], name='reservation_variant_exp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.variant} held until {self.expires_at}"
+
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        """
+        Load the user and order lines alongside the orders. Lines carry a
+        snapshot of their product, so no product or category is joined.
+        """
+        return self.select_related('user').prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.order_by('id'))
+        )
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -79,18 +229,90 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Order history per user and the admin order list, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_id_idx'),
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # Admin order list filtered by status, and the per-status counters
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Deleting a product keeps the order history; the line keeps its snapshot
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Snapshot of the product taken at checkout, rendered by order history
+    product_name = models.CharField(max_length=200, default='')
+    product_brand = models.CharField(max_length=100, default='')
+    product_size = models.CharField(max_length=3, default='')
+    product_image_url = models.URLField(max_length=500, default='')
+
+    SNAPSHOT_FIELDS = {
+        'product_name': 'name',
+        'product_brand': 'brand',
+        'product_image_url': 'thumbnail_url',
+    }
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name}"
+        return f"{self.quantity} x {self.product_name}"
+
+    def snapshot(self, product, variant=None):
+        """Copy the product fields shown in order history onto this line"""
+        for field, source in self.SNAPSHOT_FIELDS.items():
+            setattr(self, field, getattr(product, source))
+        if variant is not None:
+            self.product_size = variant.size
 
     @property
     def subtotal(self):
-        return self.price * self.quantity
\ No newline at end of file
+        return self.price * self.quantity
+
+class DailySales(models.Model):
+    """
+    Per-day sales rollup over orders that are not cancelled, maintained by
+    product.analytics as orders are placed or change status.
+    """
+    date = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    items = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily sales"
+
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders, {self.revenue}"
+
+class DailyProductSales(models.Model):
+    """
+    Per-day, per-product sales rollup. Product and category ids are kept
+    without foreign key constraints so history survives their deletion.
+    """
+    date = models.DateField()
+    product = models.ForeignKey(
+        Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+'
+    )
+    product_name = models.CharField(max_length=200)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily product sales"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: {self.quantity} x {self.product_name}"
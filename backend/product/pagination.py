@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Newest-first pagination with two modes.
+
+    By default this is the regular page-number pagination. Passing
+    ?pagination=cursor (or a ?cursor= from a previous response) switches to
+    keyset pagination over (created_at, id): each page is fetched with a
+    range condition on the composite index instead of an OFFSET scan, and
+    no COUNT(*) is run. Cursor responses have next/previous links but no
+    count. Cursor mode is refused for querysets in any other order, such as
+    search results ranked by relevance, which it would otherwise re-sort.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+    unordered_cursor_message = 'Cursor pagination is only available for newest-first results'
+    keyset_orderings = (('-created_at',), ('-created_at', '-id'))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        if tuple(queryset.query.order_by) not in self.keyset_orderings:
+            raise ValidationError({self.mode_query_param: self.unordered_cursor_message})
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by('created_at', 'id')
+            if position:
+                created_at, pk = position
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                )
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+            if position:
+                created_at, pk = position
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.first = results[0] if results else None
+        self.last = results[-1] if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_cursor_link(self.last, reverse=False) if self.has_next else None,
+            'previous': self.get_cursor_link(self.first, reverse=True) if self.has_previous else None,
+            'results': data,
+        })
+
+    def get_position(self, item):
+        # Pages hold model instances, or plain dicts on the .values() fast path
+        if isinstance(item, dict):
+            return item['created_at'], item['id']
+        return item.created_at, item.pk
+
+    def get_cursor_link(self, item, reverse):
+        if item is None:
+            return None
+        created_at, pk = self.get_position(item)
+        token = json.dumps([created_at.isoformat(), pk, int(reverse)])
+        cursor = base64.urlsafe_b64encode(token.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            created_at, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return (datetime.fromisoformat(created_at), int(pk)), bool(reverse)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
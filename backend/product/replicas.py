@@ -0,0 +1,185 @@
+"""
+Read-replica routing.
+
+Reads go to the primary unless a view opts in: ReplicaReadMixin (and the
+replica_reads() block for function views) sends the ORM reads of the
+read-only catalog and admin statistics actions to
+settings.REPLICA_DATABASE. Writes always go to the primary.
+
+A replica lags the primary by up to REPLICA_PIN_SECONDS, so:
+
+- a user who has just sent a write (any unsafe method) reads from the
+  primary for that long, and sees their own changes;
+- catalog pages read from the replica shortly after a catalog write are
+  served but not put in the catalog cache, where they would outlive the
+  lag.
+
+Pins are kept in the cache, so they are shared between workers when
+REDIS_URL is set and per process otherwise.
+
+The async catalog views are not DRF views: areplica_reads() authenticates
+their token itself, so pinned users read from the primary there too.
+"""
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+
+CATALOG_WRITTEN_KEY = 'db:catalog-written'
+
+# Alias reads are routed to for the request being handled; None is the
+# primary. asgiref copies the context into sync_to_async threads.
+read_database = ContextVar('read_database', default=None)
+
+
+def user_pin_key(user_id):
+    return f'db:pinned:{user_id}'
+
+
+def replica_enabled():
+    return settings.REPLICA_DATABASE is not None
+
+
+def pin_to_primary(user):
+    """Read from the primary for the user's next REPLICA_PIN_SECONDS"""
+    if replica_enabled() and user.is_authenticated:
+        cache.set(user_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def catalog_written():
+    """Mark the replica as possibly behind on the catalog"""
+    if replica_enabled():
+        cache.set(CATALOG_WRITTEN_KEY, True, settings.REPLICA_PIN_SECONDS)
+
+
+def reading_stale_catalog():
+    """True when reads go to a replica that may not have the last catalog write"""
+    return read_database.get() is not None and cache.get(CATALOG_WRITTEN_KEY) is not None
+
+
+async def areading_stale_catalog():
+    return read_database.get() is not None and await cache.aget(CATALOG_WRITTEN_KEY) is not None
+
+
+def read_alias(request):
+    """The alias a read-only request may read from: the replica unless its user is pinned"""
+    if not replica_enabled() or request.method not in SAFE_METHODS:
+        return None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and cache.get(user_pin_key(user.pk)):
+        return None
+    return settings.REPLICA_DATABASE
+
+
+@contextmanager
+def replica_reads(request):
+    """Route the ORM reads made inside the block as read_alias() decides"""
+    token = read_database.set(read_alias(request))
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+def api_user(request):
+    """The user DRF's authenticators find on a plain Django request, if any"""
+    for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authenticator().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+async def aread_alias(request):
+    """read_alias() for async views, whose request DRF has not authenticated"""
+    if not replica_enabled() or request.method not in SAFE_METHODS:
+        return None
+    user = await sync_to_async(api_user)(request)
+    if user is not None and await cache.aget(user_pin_key(user.pk)):
+        return None
+    return settings.REPLICA_DATABASE
+
+
+@asynccontextmanager
+async def areplica_reads(request):
+    """replica_reads() for async views; the ORM's worker threads inherit the alias"""
+    token = read_database.set(await aread_alias(request))
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+class ReplicaRouter:
+    """Sends reads to read_database (when set) and writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        # Instances read from the replica are saved to the primary
+        instance = hints.get('instance')
+        if (
+            instance is not None
+            and settings.REPLICA_DATABASE is not None
+            and instance._state.db == settings.REPLICA_DATABASE
+        ):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Serves the safe requests of `replica_actions` from the read replica.
+    The alias is chosen after authentication, so pinned users are known.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions:
+            self._read_database = read_database.set(read_alias(request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_database', None)
+        if token is not None:
+            read_database.reset(token)
+            self._read_database = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PinPrimaryMiddleware:
+    """Pins the user to the primary after any unsafe request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            # DRF sets the authenticated user on the Django request too
+            pin_to_primary(request.user)
+        return response
+
+    async def __acall__(self, request):
+        # The async views only serve GET requests
+        return await self.get_response(request)
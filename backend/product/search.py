@@ -0,0 +1,106 @@
+from difflib import SequenceMatcher
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+)
+from django.db import connection
+from django.db.models import Case, F, OuterRef, Q, Subquery, When
+
+SEARCH_CONFIG = 'english'
+
+# Minimum word similarity for a fuzzy (typo-tolerant) match in the fallback
+FUZZY_THRESHOLD = 0.75
+
+# Field groups scored by the fallback search, with their weights
+WEIGHTED_FIELDS = (
+    (1.0, ('name', 'brand')),
+    (0.4, ('category__name',)),
+    (0.1, ('description',)),
+)
+
+
+def search_vector():
+    """
+    tsvector expression stored in Product.search_vector: name and brand
+    weigh most, then the category name, then the description.
+    """
+    from .models import Category
+
+    category_name = Subquery(
+        Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1]
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('brand', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """Recompute the stored search vector for every product in `queryset`"""
+    if connection.vendor == 'postgresql':
+        queryset.update(search_vector=search_vector())
+
+
+def search_products(queryset, term):
+    """
+    Filter `queryset` to products matching `term`, best matches first.
+
+    On PostgreSQL this ranks full-text matches against the GIN-indexed
+    search vector and adds trigram matches on the name, so misspelled
+    queries still find products. Other databases (SQLite in tests) use a
+    pure-Python scorer over the same fields.
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, term)
+    return _python_search(queryset, term)
+
+
+def _postgres_search(queryset, term):
+    query = SearchQuery(term, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.annotate(
+        rank=SearchRank(F('search_vector'), query),
+        similarity=TrigramSimilarity('name', term),
+    ).filter(
+        Q(search_vector=query) | Q(name__trigram_similar=term)
+    ).order_by('-rank', '-similarity', '-created_at')
+
+
+def _word_score(term, words):
+    if any(term in word for word in words):
+        return 1.0
+    best = max((SequenceMatcher(None, term, word).ratio() for word in words), default=0)
+    return best / 2 if best >= FUZZY_THRESHOLD else 0
+
+
+def _row_score(row, terms):
+    """Sum of the best weighted match per term; 0 unless every term matches"""
+    total = 0
+    for term in terms:
+        term_score = max(
+            weight * _word_score(term, ' '.join(row[field] or '' for field in fields).lower().split())
+            for weight, fields in WEIGHTED_FIELDS
+        )
+        if not term_score:
+            return 0
+        total += term_score
+    return total
+
+
+def _python_search(queryset, term):
+    terms = term.lower().split()
+    columns = ['id'] + [field for _, fields in WEIGHTED_FIELDS for field in fields]
+    scores = [
+        (score, row['id'])
+        for row in queryset.values(*columns)
+        if (score := _row_score(row, terms))
+    ]
+    if not scores:
+        return queryset.none()
+    scores.sort(key=lambda item: -item[0])
+    ranking = Case(*[When(pk=pk, then=position) for position, (_, pk) in enumerate(scores)])
+    return queryset.filter(pk__in=[pk for _, pk in scores]).order_by(ranking)
@@ -0,0 +1,226 @@
+"""
+Synthetic shop data for benchmarks and local load tests.
+
+Every table is filled with bulk_create in fixed-size batches, so memory use
+stays flat from ten thousand to ten million rows. Output is deterministic
+for a given random seed. Only run it against a scratch database.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .analytics import rebuild_rollups
+from .models import Cart, CartItem, Category, Order, OrderItem, Product, ProductVariant
+from .search import refresh_search_vectors
+from .services import refresh_cart_summaries, refresh_product_stock
+
+SEED_BATCH_SIZE = 5000
+
+# Row counts per preset; together with the cart and order lines each preset
+# writes roughly 10k, 100k, 1M and 10M rows
+SCALES = {
+    'small': {'products': 2_000, 'users': 500, 'carts': 300, 'orders': 1_500},
+    'medium': {'products': 20_000, 'users': 5_000, 'carts': 3_000, 'orders': 15_000},
+    'large': {'products': 200_000, 'users': 50_000, 'carts': 30_000, 'orders': 150_000},
+    'huge': {'products': 2_000_000, 'users': 500_000, 'carts': 300_000, 'orders': 1_500_000},
+}
+
+# Products kept in memory to fill carts and orders. Picks are skewed towards
+# the front of the pool, so a few products sell far more than the rest.
+PRODUCT_POOL_SIZE = 50_000
+
+# Password of every seeded user
+SEED_PASSWORD = 'shop-password'
+
+CATEGORIES = {
+    'Shirts': 'Shirt', 'T-Shirts': 'T-Shirt', 'Jeans': 'Jeans', 'Trousers': 'Trousers',
+    'Jackets': 'Jacket', 'Suits': 'Suit', 'Ethnic': 'Kurta', 'Shorts': 'Shorts',
+    'Sweaters': 'Sweater', 'Accessories': 'Belt',
+}
+BRANDS = [
+    'Acme', 'Northwind', 'Blue Harbor', 'Urban Loom', 'Peak Outfitters', 'Monsoon',
+    'Redwood', 'Linen & Co', 'Sahara', 'Fjord', 'Kestrel', 'Indigo Mill',
+]
+FITS = ['Slim Fit', 'Regular Fit', 'Relaxed', 'Tailored', 'Classic', 'Oversized']
+COLOURS = ['Navy', 'Black', 'White', 'Olive', 'Grey', 'Maroon', 'Beige', 'Sky Blue', 'Charcoal']
+MATERIALS = ['Cotton', 'Linen', 'Denim', 'Wool', 'Polyester Blend', 'Silk', 'Corduroy']
+
+# Order statuses weighted roughly like a live shop
+STATUS_WEIGHTS = {'pending': 8, 'processing': 8, 'shipped': 12, 'delivered': 64, 'cancelled': 8}
+
+
+@contextmanager
+def explicit_created_at(model):
+    """Let bulk_create keep the created_at values set on the instances"""
+    field = model._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def random_datetime(rng, now, days=730):
+    # Spread rows over two years so date ordering looks like production data
+    return now - timedelta(seconds=rng.randrange(0, days * 86400))
+
+
+def batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield range(start, min(start + batch_size, count))
+
+
+def pick(rng, pool):
+    return pool[int(len(pool) * rng.random() ** 2)]
+
+
+def seed_categories():
+    """The default categories, reusing any that already exist; returns their ids"""
+    existing = set(Category.objects.filter(name__in=CATEGORIES).values_list('name', flat=True))
+    Category.objects.bulk_create([
+        Category(name=name, description=f'{name} for every occasion')
+        for name in CATEGORIES if name not in existing
+    ])
+    return list(Category.objects.filter(name__in=CATEGORIES).values_list('id', flat=True))
+
+
+def seed_users(count, batch_size=SEED_BATCH_SIZE, prefix='shopper'):
+    """Users <prefix>-0 ... that can log in with SEED_PASSWORD; returns their ids"""
+    # Hashing once keeps seeding fast; every user shares the same hash
+    password = make_password(SEED_PASSWORD)
+    for batch in batches(count, batch_size):
+        User.objects.bulk_create([
+            User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com', password=password)
+            for i in batch
+        ], ignore_conflicts=True)
+    return list(User.objects.filter(username__startswith=f'{prefix}-').values_list('id', flat=True))
+
+
+def seed_products(count, category_ids, rng, batch_size=SEED_BATCH_SIZE, sku_prefix='SEED'):
+    """
+    Create `count` products with unique SKUs, each sold in a run of one to
+    four consecutive sizes. Returns a random sample of up to
+    PRODUCT_POOL_SIZE of their variants for seed_carts and seed_orders.
+    """
+    categories = dict(Category.objects.filter(id__in=category_ids).values_list('id', 'name'))
+    sizes = [code for code, _ in ProductVariant.SIZE_CHOICES]
+    now = timezone.now()
+    pool, seen = [], 0
+    for batch in batches(count, batch_size):
+        products = []
+        for i in batch:
+            category_id = rng.choice(category_ids)
+            colour, material, brand = rng.choice(COLOURS), rng.choice(MATERIALS), rng.choice(BRANDS)
+            noun = CATEGORIES.get(categories[category_id], categories[category_id])
+            products.append(Product(
+                sku=f'{sku_prefix}-{i:08d}',
+                name=f'{rng.choice(FITS)} {colour} {material} {noun}',
+                description=f'{material} {noun.lower()} in {colour.lower()} by {brand}.',
+                price=Decimal(rng.randrange(199, 9999)),
+                category_id=category_id,
+                image_url=f'https://example.com/products/{i}.jpg',
+                brand=brand,
+                is_featured=rng.random() < 0.02,
+                created_at=random_datetime(rng, now),
+            ))
+        with explicit_created_at(Product):
+            Product.objects.bulk_create(products)
+        variants = []
+        for product in products:
+            first = rng.randrange(len(sizes))
+            variants += [
+                ProductVariant(product=product, size=size, stock=rng.randrange(0, 60))
+                for size in sizes[first:first + rng.randint(1, 4)]
+            ]
+        ProductVariant.objects.bulk_create(variants)
+        seeded = Product.objects.filter(sku__in=[product.sku for product in products])
+        refresh_product_stock(seeded)
+        refresh_search_vectors(seeded)
+
+        # Reservoir sampling keeps the pool uniform over all variants
+        for variant in variants:
+            seen += 1
+            if len(pool) < PRODUCT_POOL_SIZE:
+                pool.append(variant)
+            elif (slot := rng.randrange(seen)) < PRODUCT_POOL_SIZE:
+                pool[slot] = variant
+    return pool
+
+
+def seed_carts(count, user_ids, variants, rng, batch_size=SEED_BATCH_SIZE):
+    """Open carts of 1-5 lines for `count` distinct users"""
+    owners = rng.sample(user_ids, min(count, len(user_ids)))
+    for batch in batches(len(owners), batch_size):
+        carts = Cart.objects.bulk_create([Cart(user_id=owners[i]) for i in batch])
+        items = []
+        for cart in carts:
+            lines = {pick(rng, variants) for _ in range(rng.randint(1, 5))}
+            items += [CartItem(cart=cart, variant=variant, product_id=variant.product_id,
+                               quantity=rng.randint(1, 3))
+                      for variant in lines]
+        CartItem.objects.bulk_create(items)
+        refresh_cart_summaries(Cart.objects.filter(pk__in=[cart.pk for cart in carts]))
+
+
+def seed_orders(count, user_ids, variants, rng, batch_size=SEED_BATCH_SIZE, with_items=True):
+    """
+    Past orders spread over two years, each with 1-4 snapshot lines. Without
+    `with_items` only the order rows are written, with a random total.
+    """
+    now = timezone.now()
+    statuses, weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+    for batch in batches(count, batch_size):
+        orders, lines = [], []
+        for _ in batch:
+            order = Order(
+                user_id=rng.choice(user_ids), status=rng.choices(statuses, weights)[0],
+                shipping_address=f'{rng.randint(1, 999)} Market Road, Kochi',
+                phone_number=f'9{rng.randrange(10 ** 9):09d}', created_at=random_datetime(rng, now),
+                total_amount=Decimal(rng.randrange(199, 50000)),
+            )
+            if with_items:
+                order_lines = []
+                for variant in {pick(rng, variants) for _ in range(rng.randint(1, 4))}:
+                    line = OrderItem(product=variant.product, variant=variant,
+                                     quantity=rng.randint(1, 3), price=variant.unit_price)
+                    line.snapshot(variant.product, variant)
+                    order_lines.append(line)
+                order.total_amount = sum(line.subtotal for line in order_lines)
+                lines.append(order_lines)
+            orders.append(order)
+        with explicit_created_at(Order):
+            Order.objects.bulk_create(orders)
+        if with_items:
+            for order, order_lines in zip(orders, lines):
+                for line in order_lines:
+                    line.order = order
+            OrderItem.objects.bulk_create([line for order_lines in lines for line in order_lines])
+
+
+def seed_shop(products, users, carts, orders, seed=42, batch_size=SEED_BATCH_SIZE, log=None):
+    """
+    Fill the database with a whole shop: categories, products, users, open
+    carts and order history, then rebuild the sales rollups. `log` is called
+    with a progress message before each step.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+
+    log('Seeding categories')
+    category_ids = seed_categories()
+    log(f'Seeding {users} users')
+    user_ids = seed_users(users, batch_size)
+    log(f'Seeding {products} products')
+    pool = seed_products(products, category_ids, rng, batch_size)
+    if pool and user_ids:
+        log(f'Seeding {carts} carts')
+        seed_carts(carts, user_ids, pool, rng, batch_size)
+        log(f'Seeding {orders} orders')
+        seed_orders(orders, user_ids, pool, rng, batch_size)
+    log('Rebuilding sales rollups')
+    rebuild_rollups()
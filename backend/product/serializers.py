@@ -1,6 +1,56 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from django.core.files.storage import default_storage
+from django.db import transaction
+from .images import MAX_IMAGE_UPLOAD_SIZE
+from .models import Category, Product, ProductVariant, Cart, CartItem, Order, OrderItem
+
+def parse_fields(value):
+    """
+    Turn "id,items.quantity,items.product.name" into a nested selection
+    {'id': {}, 'items': {'quantity': {}, 'product': {'name': {}}}}
+    """
+    selection = {}
+    for path in filter(None, (part.strip() for part in value.split(','))):
+        node = selection
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return selection
+
+class SparseFieldsMixin:
+    """
+    Lets a serializer render a subset of its fields on read requests.
+
+    The top-level serializer takes the selection from ?fields= (dotted
+    names reach into nested serializers, e.g. items.product.name). Fields
+    listed in Meta.expandable_fields are rendered as the related id when a
+    selection is given, unless they are named in ?expand=. Without ?fields=
+    the full representation is returned.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method == 'GET':
+            fields = request.query_params.get('fields')
+            if fields:
+                expand = set(parse_fields(request.query_params.get('expand', '')))
+                self.restrict(parse_fields(fields), expand)
+
+    def restrict(self, selection, expand):
+        for name in list(self.fields):
+            if name not in selection:
+                self.fields.pop(name)
+        for name in getattr(getattr(self, 'Meta', None), 'expandable_fields', ()):
+            if name in self.fields and name not in expand:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        for name, nested in selection.items():
+            field = self.fields.get(name)
+            target = getattr(field, 'child', field)
+            if nested and isinstance(target, SparseFieldsMixin):
+                target.restrict(nested, expand)
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,12 +74,39 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
         return user
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
 
-class ProductSerializer(serializers.ModelSerializer):
+class MediaURLField(serializers.ReadOnlyField):
+    """URL of a stored file, from a FieldFile or its name; null when empty"""
+
+    def to_representation(self, value):
+        name = getattr(value, 'name', value)
+        return default_storage.url(name) if name else None
+
+class ImageDerivativesField(serializers.ReadOnlyField):
+    """
+    {"grid": {"webp": url, "jpeg": url}, "detail": ..., "cart": ...}, or
+    null until the derivatives have been built
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return {
+            variant: {file_format: default_storage.url(name) for file_format, name in formats.items()}
+            for variant, formats in value.items()
+        }
+
+class ProductVariantSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ProductVariant
+        fields = ['id', 'size', 'stock', 'price']
+        extra_kwargs = {'size': {'required': True}}
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(),
@@ -37,19 +114,151 @@ class ProductSerializer(serializers.ModelSerializer):
         write_only=True
     )
 
+    # Uploaded through /api/admin/products/{id}/image/
+    image = MediaURLField()
+    images = ImageDerivativesField(source='image_derivatives')
+
+    # Written as a whole: sizes are matched by size, missing ones are deleted
+    variants = ProductVariantSerializer(many=True, required=False)
+
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = ['search_vector', 'image_derivatives']
+        expandable_fields = ('category',)
+
+    def validate_sku(self, value):
+        # A blank SKU means "none"; store NULL so it stays out of the unique index
+        return value or None
+
+    def validate_variants(self, value):
+        sizes = [variant['size'] for variant in value]
+        if len(set(sizes)) != len(sizes):
+            raise serializers.ValidationError('Each size may be given once.')
+        return value
 
-class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    def create(self, validated_data):
+        variants = validated_data.pop('variants', None)
+        with transaction.atomic():
+            product = super().create(validated_data)
+            # A new product is sold in one size until told otherwise
+            self.save_variants(product, variants or [{'size': 'M'}])
+        return product
+
+    def update(self, instance, validated_data):
+        variants = validated_data.pop('variants', None)
+        with transaction.atomic():
+            product = super().update(instance, validated_data)
+            if variants is not None:
+                self.save_variants(product, variants)
+        return product
+
+    def save_variants(self, product, variants):
+        kept = []
+        for fields in variants:
+            fields = dict(fields)
+            variant, _ = ProductVariant.objects.update_or_create(
+                product=product, size=fields.pop('size'), defaults=fields
+            )
+            kept.append(variant.pk)
+        for variant in product.variants.exclude(pk__in=kept):
+            variant.delete()
+        # The stock total was refreshed by the variant signals
+        product.refresh_from_db(fields=['stock', 'updated_at'])
+
+class ProductImageSerializer(serializers.Serializer):
+    image = serializers.ImageField()
+
+    def validate_image(self, value):
+        if value.size > MAX_IMAGE_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f'Images may be at most {MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)} MB.'
+            )
+        return value
+
+class ProductRowSerializer:
+    """
+    Read-only fast path for product lists.
+
+    Renders plain `.values()` rows with the field objects of
+    ProductSerializer, so the output matches it field for field, without
+    building model instances or per-row serializers. `fields` and `expand`
+    follow the ?fields= / ?expand=category rules of SparseFieldsMixin;
+    variants are fetched for a whole page with one query.
+    """
+
+    def __init__(self, fields, expand=()):
+        product_fields = ProductSerializer().fields
+        self.fields = [
+            (name, product_fields[name]) for name in fields
+            if name in product_fields and name not in ('category', 'variants')
+            and not product_fields[name].write_only
+        ]
+        self.category = 'category' in fields
+        self.category_fields = []
+        if self.category and 'category' in expand:
+            self.category_fields = list(CategorySerializer().fields.items())
+        self.variant_fields = []
+        if 'variants' in fields:
+            variant_fields = ProductVariantSerializer().fields
+            self.variant_fields = [
+                (name, variant_fields[name]) for name in fields['variants'] or variant_fields
+                if name in variant_fields
+            ]
+
+    def columns(self):
+        """Column names to pass to QuerySet.values()"""
+        columns = ['id', 'created_at'] + [field.source for _, field in self.fields]
+        if self.category:
+            columns.append('category_id')
+        columns += [f'category__{name}' for name, _ in self.category_fields]
+        return list(dict.fromkeys(columns))
+
+    def render(self, rows):
+        """Represent a page of rows"""
+        variants = defaultdict(list)
+        if self.variant_fields:
+            columns = ['product_id'] + [field.source for _, field in self.variant_fields]
+            for variant in ProductVariant.objects.filter(
+                product_id__in=[row['id'] for row in rows]
+            ).order_by('id').values(*columns):
+                variants[variant['product_id']].append({
+                    name: None if variant[field.source] is None else field.to_representation(variant[field.source])
+                    for name, field in self.variant_fields
+                })
+        return [self.to_representation(row, variants) for row in rows]
+
+    def to_representation(self, row, variants=None):
+        data = {
+            name: None if row[field.source] is None else field.to_representation(row[field.source])
+            for name, field in self.fields
+        }
+        if self.category_fields:
+            data['category'] = {
+                name: None if row[f'category__{name}'] is None
+                else field.to_representation(row[f'category__{name}'])
+                for name, field in self.category_fields
+            }
+        elif self.category:
+            data['category'] = row['category_id']
+        if self.variant_fields:
+            data['variants'] = (variants or {}).get(row['id'], [])
+        return data
+
+class CartProductSerializer(ProductSerializer):
+    # The line's own variant is rendered next to it
+    variants = None
+
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    product = CartProductSerializer(read_only=True)
+    variant = ProductVariantSerializer(read_only=True)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'quantity', 'subtotal', 'added_at']
+        fields = ['id', 'product', 'variant', 'quantity', 'unit_price', 'subtotal', 'added_at']
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
@@ -57,15 +266,28 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ['id', 'user', 'items', 'total_price', 'created_at', 'updated_at']
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+class CartSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Cart
+        fields = ['item_count', 'total_amount']
+
+class OrderedProductSerializer(SparseFieldsMixin, serializers.Serializer):
+    """The product as it was at checkout, read from the order line's snapshot"""
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    name = serializers.CharField(source='product_name', read_only=True)
+    brand = serializers.CharField(source='product_brand', read_only=True)
+    size = serializers.CharField(source='product_size', read_only=True)
+    image_url = serializers.CharField(source='product_image_url', read_only=True)
+
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    product = OrderedProductSerializer(source='*', read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'quantity', 'price', 'subtotal']
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user = UserSerializer(read_only=True)
 
@@ -0,0 +1,579 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce, Greatest, Round
+from django.utils import timezone
+
+from .analytics import record_order_on_commit, record_status_change
+from .cache import invalidate_catalog, invalidate_dashboard
+from .models import (
+    Cart, CartItem, Order, OrderItem, Product, ProductVariant, StockReservation
+)
+
+
+# Upper bound on operations accepted by one /api/cart/batch/ request
+MAX_BATCH_OPERATIONS = 100
+
+# Upper bound on product ids accepted by one bulk admin update
+MAX_BULK_PRODUCT_IDS = 10_000
+
+
+class ShopError(Exception):
+    """An error reported to the client as {'error': message}"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class CartError(ShopError):
+    """Raised when a cart change cannot be applied"""
+
+
+class CheckoutError(ShopError):
+    """Raised when a cart cannot be turned into an order"""
+
+
+class CatalogError(ShopError):
+    """Raised when a bulk catalog change is invalid"""
+
+
+def reservations_enabled():
+    return bool(settings.CART_RESERVATION_TTL)
+
+
+def held_stock(variant_ids, exclude_cart=None):
+    """
+    Quantity held by unexpired reservations of other carts, per variant id.
+    Always empty when reservations are disabled.
+    """
+    if not reservations_enabled():
+        return {}
+    held = StockReservation.objects.filter(
+        variant_id__in=variant_ids, expires_at__gt=timezone.now()
+    )
+    if exclude_cart is not None:
+        held = held.exclude(cart=exclude_cart)
+    return dict(
+        held.values('variant_id').annotate(total=Sum('quantity')).values_list('variant_id', 'total')
+    )
+
+
+def available_stock(variant, cart):
+    """Stock of `variant` that `cart` may still claim"""
+    return variant.stock - held_stock([variant.id], exclude_cart=cart).get(variant.id, 0)
+
+
+def reserve_stock(cart_items):
+    """
+    Hold each line's quantity for its cart until CART_RESERVATION_TTL from
+    now. Written as a single upsert, so no variant row is locked.
+    """
+    if not reservations_enabled() or not cart_items:
+        return
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.CART_RESERVATION_TTL)
+    StockReservation.objects.filter(
+        variant_id__in=[item.variant_id for item in cart_items], expires_at__lte=now
+    ).delete()
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(
+                cart_id=item.cart_id,
+                variant_id=item.variant_id,
+                quantity=item.quantity,
+                expires_at=expires_at,
+            )
+            for item in cart_items
+        ],
+        update_conflicts=True,
+        unique_fields=['cart', 'variant'],
+        update_fields=['quantity', 'expires_at'],
+    )
+
+
+def release_stock(cart, variant_ids=None):
+    if not reservations_enabled():
+        return
+    reservations = StockReservation.objects.filter(cart=cart)
+    if variant_ids is not None:
+        reservations = reservations.filter(variant_id__in=variant_ids)
+    reservations.delete()
+
+
+def refresh_product_stock(products):
+    """
+    Recompute the stock total of every product in `products` from its
+    variants, in a single UPDATE.
+    """
+    variants = ProductVariant.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    products.update(
+        stock=Coalesce(Subquery(variants.annotate(total=Sum('stock')).values('total')), 0),
+        updated_at=timezone.now(),
+    )
+
+
+def refresh_cart_summaries(carts):
+    """
+    Recompute item_count and total_amount for every cart in `carts` from
+    its lines at current prices, in a single UPDATE.
+    """
+    lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    money = DecimalField(max_digits=10, decimal_places=2)
+    unit_price = Coalesce(F('variant__price'), F('product__price'), output_field=money)
+    carts.update(
+        item_count=Coalesce(Subquery(lines.annotate(count=Sum('quantity')).values('count')), 0),
+        total_amount=Coalesce(
+            Subquery(
+                lines.annotate(
+                    total=Sum(F('quantity') * unit_price, output_field=money)
+                ).values('total')
+            ),
+            Value(Decimal('0')),
+            output_field=money,
+        ),
+    )
+
+
+def _pick_variant(variants, size, prefix='Size'):
+    """The variant of `size` among a product's variants, or its only one"""
+    if size is not None:
+        for variant in variants:
+            if variant.size == size:
+                return variant
+        raise CartError(f'{prefix} {size} not found', status_code=404)
+    if len(variants) != 1:
+        raise CartError(f'{prefix} is required')
+    return variants[0]
+
+
+def resolve_variant(variant_id=None, product_id=None, size=None):
+    """
+    The variant a cart request refers to: by variant_id, or by product_id
+    and size. The size may be left out for products sold in one size only.
+    """
+    if variant_id is not None:
+        variant = ProductVariant.objects.select_related('product').filter(pk=variant_id).first()
+        if variant is None:
+            raise CartError('Variant not found', status_code=404)
+        return variant
+    if product_id is None:
+        raise CartError('variant_id or product_id is required')
+    variants = list(ProductVariant.objects.select_related('product').filter(product_id=product_id))
+    if not variants:
+        raise CartError('Product not found', status_code=404)
+    return _pick_variant(variants, size)
+
+
+@contextmanager
+def cart_change(cart_id):
+    """
+    Run a cart change in a transaction that holds the cart row lock and
+    refreshes the cart's summary columns before committing. The lock
+    serializes changes to one cart, so the summary always matches the lines.
+    """
+    with transaction.atomic():
+        Cart.objects.select_for_update().values_list('pk').get(pk=cart_id)
+        yield
+        refresh_cart_summaries(Cart.objects.filter(pk=cart_id))
+
+
+def add_to_cart(cart, variant, quantity):
+    """
+    Add `quantity` of `variant` to the cart and return the cart line.
+
+    The quantity is raised with a conditional UPDATE ... SET quantity =
+    quantity + n, so concurrent adds never lose an increment and the stock
+    limit is re-checked against the row being updated. A missing line is
+    inserted; if a concurrent request inserted it first, the increment is
+    retried.
+    """
+    with cart_change(cart.pk):
+        return _add_to_cart(cart, variant, quantity)
+
+
+def _add_to_cart(cart, variant, quantity):
+    available = available_stock(variant, cart)
+    if available < quantity:
+        raise CartError(f'Insufficient stock. Only {max(available, 0)} items available')
+
+    for _ in range(2):
+        updated = CartItem.objects.filter(
+            cart=cart, variant=variant, quantity__lte=available - quantity
+        ).update(quantity=F('quantity') + quantity)
+        if updated:
+            cart_item = CartItem.objects.get(cart=cart, variant=variant)
+            break
+
+        current = CartItem.objects.filter(cart=cart, variant=variant).values_list(
+            'quantity', flat=True
+        ).first()
+        if current is not None:
+            raise CartError(
+                f'Cannot add {quantity} more. Only {max(available - current, 0)} items available'
+            )
+        try:
+            with transaction.atomic():
+                cart_item = CartItem.objects.create(
+                    cart=cart, variant=variant, product_id=variant.product_id, quantity=quantity
+                )
+            break
+        except IntegrityError:
+            continue
+    else:
+        raise CartError('Cart was changed concurrently, please retry', status_code=409)
+
+    cart_item.variant = variant
+    cart_item.product = variant.product
+    reserve_stock([cart_item])
+    return cart_item
+
+
+def set_cart_quantity(cart_item, quantity):
+    """
+    Set a line's quantity, removing the line when quantity <= 0. Returns
+    the updated line, or None when it was removed.
+    """
+    if quantity <= 0:
+        remove_cart_item(cart_item)
+        return None
+
+    with cart_change(cart_item.cart_id):
+        available = available_stock(cart_item.variant, cart_item.cart_id)
+        if available < quantity:
+            raise CartError(f'Insufficient stock. Only {max(available, 0)} items available')
+
+        CartItem.objects.filter(pk=cart_item.pk).update(quantity=quantity)
+        cart_item.quantity = quantity
+        reserve_stock([cart_item])
+    return cart_item
+
+
+def apply_cart_operations(cart, operations):
+    """
+    Apply a list of add/update/remove operations to the cart atomically.
+
+    Each operation is a dict: {"op": "add", "variant_id", "quantity"},
+    {"op": "update", "cart_item_id" or "variant_id", "quantity"} or
+    {"op": "remove", "cart_item_id" or "variant_id"}. Instead of a
+    variant_id, an operation may give "product_id" and "size" (the size can
+    be left out for products sold in one size). Operations are applied in
+    order to the current lines, every referenced variant is fetched with one
+    query, stock is checked on the final quantities, and the result is
+    written with one upsert and one delete. Nothing is written if any
+    operation fails.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise CartError('operations must be a non-empty list')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise CartError(f'At most {MAX_BATCH_OPERATIONS} operations per batch')
+
+    parsed = [_parse_operation(index, operation) for index, operation in enumerate(operations)]
+
+    with cart_change(cart.pk):
+        lines = list(cart.items.all())
+        quantities = {line.variant_id: line.quantity for line in lines}
+        variant_by_line = {line.id: line.variant_id for line in lines}
+
+        for op in parsed:
+            if op['cart_item_id'] is not None and op['variant_id'] is None and op['product_id'] is None:
+                op['variant_id'] = variant_by_line.get(op['cart_item_id'])
+                if op['variant_id'] is None:
+                    raise CartError(
+                        f"Operation {op['index']}: cart item not found", status_code=404
+                    )
+
+        variant_ids = {op['variant_id'] for op in parsed if op['variant_id'] is not None}
+        product_ids = {op['product_id'] for op in parsed if op['variant_id'] is None}
+        variants = {}
+        sizes = defaultdict(list)
+        for variant in ProductVariant.objects.select_related('product').filter(
+            Q(id__in=variant_ids) | Q(product_id__in=product_ids)
+        ).order_by('id'):
+            variants[variant.id] = variant
+            if variant.product_id in product_ids:
+                sizes[variant.product_id].append(variant)
+
+        for op in parsed:
+            if op['variant_id'] is None:
+                if op['product_id'] not in sizes:
+                    raise CartError(f"Operation {op['index']}: product not found", status_code=404)
+                op['variant_id'] = _pick_variant(
+                    sizes[op['product_id']], op['size'], f"Operation {op['index']}: size"
+                ).id
+            variant_id = op['variant_id']
+            if variant_id not in variants:
+                raise CartError(f"Operation {op['index']}: variant not found", status_code=404)
+            if op['op'] == 'add':
+                quantities[variant_id] = quantities.get(variant_id, 0) + op['quantity']
+            elif op['op'] == 'update':
+                quantities[variant_id] = max(op['quantity'], 0)
+            else:
+                quantities[variant_id] = 0
+
+        touched = {op['variant_id'] for op in parsed}
+        held = held_stock([vid for vid in touched if quantities[vid]], exclude_cart=cart)
+        for variant_id in touched:
+            quantity = quantities[variant_id]
+            available = variants[variant_id].stock - held.get(variant_id, 0)
+            if quantity and available < quantity:
+                raise CartError(
+                    f'Insufficient stock for {variants[variant_id]}. '
+                    f'Only {max(available, 0)} items available'
+                )
+
+        kept = [
+            CartItem(
+                cart=cart,
+                variant_id=variant_id,
+                product_id=variants[variant_id].product_id,
+                quantity=quantities[variant_id],
+            )
+            for variant_id in touched if quantities[variant_id]
+        ]
+        removed = [variant_id for variant_id in touched if not quantities[variant_id]]
+        if kept:
+            CartItem.objects.bulk_create(
+                kept,
+                update_conflicts=True,
+                unique_fields=['cart', 'variant'],
+                update_fields=['quantity'],
+            )
+        if removed:
+            cart.items.filter(variant_id__in=removed).delete()
+            release_stock(cart, removed)
+        reserve_stock(kept)
+
+
+def _parse_operation(index, operation):
+    if not isinstance(operation, dict) or operation.get('op') not in ('add', 'update', 'remove'):
+        raise CartError(f'Operation {index}: op must be one of add, update, remove')
+
+    def integer(name, default=None):
+        value = operation.get(name, default)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise CartError(f'Operation {index}: invalid {name}')
+
+    parsed = {
+        'index': index,
+        'op': operation['op'],
+        'variant_id': integer('variant_id'),
+        'product_id': integer('product_id'),
+        'size': operation.get('size'),
+        'cart_item_id': integer('cart_item_id'),
+        'quantity': integer('quantity', 1 if operation['op'] == 'add' else None),
+    }
+    if parsed['op'] == 'add' and parsed['variant_id'] is None and parsed['product_id'] is None:
+        raise CartError(f'Operation {index}: variant_id or product_id is required')
+    if parsed['variant_id'] is None and parsed['product_id'] is None and parsed['cart_item_id'] is None:
+        raise CartError(f'Operation {index}: cart_item_id, variant_id or product_id is required')
+    if parsed['op'] == 'add' and parsed['quantity'] <= 0:
+        raise CartError(f'Operation {index}: quantity must be greater than 0')
+    if parsed['op'] == 'update' and parsed['quantity'] is None:
+        raise CartError(f'Operation {index}: quantity is required')
+    return parsed
+
+
+def remove_cart_item(cart_item):
+    with cart_change(cart_item.cart_id):
+        CartItem.objects.filter(pk=cart_item.pk).delete()
+        release_stock(cart_item.cart_id, [cart_item.variant_id])
+
+
+def clear_cart(cart):
+    with cart_change(cart.pk):
+        cart.items.all().delete()
+        release_stock(cart)
+
+
+def place_order(user, shipping_address, phone_number):
+    """
+    Turn the user's cart into an order inside one transaction.
+
+    The cart row is locked first, so lines added while the order is placed
+    wait for it instead of being removed with the ordered ones. The variants
+    in the cart are then locked once (in id order, so concurrent checkouts
+    cannot deadlock), stock is checked against the locked rows and
+    decremented with a single UPDATE, order lines are inserted with one
+    bulk_create and the ordered lines are removed from the cart. The number
+    of queries does not depend on the number of cart lines.
+    """
+    cart = Cart.objects.filter(user=user).first()
+    if cart is None:
+        raise CheckoutError('Cart not found', status_code=404)
+
+    with cart_change(cart.pk):
+        lines = list(cart.items.order_by('id'))
+        if not lines:
+            raise CheckoutError('Cart is empty')
+
+        quantities = defaultdict(int)
+        for line in lines:
+            quantities[line.variant_id] += line.quantity
+
+        variants = {
+            variant.id: variant
+            for variant in ProductVariant.objects.select_for_update(of=('self',)).select_related(
+                'product'
+            ).filter(id__in=quantities).order_by('id')
+        }
+        if len(variants) != len(quantities):
+            raise CheckoutError('Some items in your cart are no longer available', status_code=409)
+
+        held = held_stock(list(quantities), exclude_cart=cart)
+        for variant_id, quantity in quantities.items():
+            variant = variants[variant_id]
+            available = variant.stock - held.get(variant_id, 0)
+            if available < quantity:
+                raise CheckoutError(
+                    f'Insufficient stock for {variant}. Only {max(available, 0)} available'
+                )
+
+        order = Order.objects.create(
+            user=user,
+            total_amount=sum(variants[line.variant_id].unit_price * line.quantity for line in lines),
+            shipping_address=shipping_address,
+            phone_number=phone_number
+        )
+        items = []
+        for line in lines:
+            variant = variants[line.variant_id]
+            item = OrderItem(
+                order=order, product=variant.product, variant=variant,
+                quantity=line.quantity, price=variant.unit_price,
+            )
+            item.snapshot(variant.product, variant)
+            items.append(item)
+        OrderItem.objects.bulk_create(items)
+        record_order_on_commit(order)
+
+        ProductVariant.objects.filter(id__in=quantities).update(
+            stock=Case(
+                *[When(id=variant_id, then=F('stock') - quantity)
+                  for variant_id, quantity in quantities.items()],
+                output_field=IntegerField()
+            )
+        )
+        refresh_product_stock(
+            Product.objects.filter(id__in={variant.product_id for variant in variants.values()})
+        )
+        invalidate_catalog()
+
+        cart.items.filter(id__in=[line.id for line in lines]).delete()
+        release_stock(cart, list(quantities))
+
+    return order
+
+
+def update_order(order, save):
+    """
+    Save a change to `order` through `save()` and keep the sales rollups in
+    step with its status. The order row is locked so concurrent status
+    changes are applied one after the other.
+    """
+    with transaction.atomic():
+        previous_status = Order.objects.select_for_update().values_list(
+            'status', flat=True
+        ).get(pk=order.pk)
+        order = save()
+        record_status_change(order, previous_status)
+    return order
+
+
+def _number(value, name, parse):
+    try:
+        return parse(str(value))
+    except (ArithmeticError, ValueError):
+        raise CatalogError(f'{name} must be a number')
+
+
+def _product_changes(changes):
+    """UPDATE expressions for a bulk product change request"""
+    updates = {}
+
+    price = changes.get('price')
+    if price is not None:
+        if not isinstance(price, dict) or len(price) != 1 or not {'set', 'percent'} & set(price):
+            raise CatalogError('price must be {"set": amount} or {"percent": change}')
+        if 'set' in price:
+            amount = _number(price['set'], 'price.set', Decimal)
+            if not amount.is_finite() or amount < 0:
+                raise CatalogError('price.set must not be negative')
+            updates['price'] = Value(amount.quantize(Decimal('0.01')))
+        else:
+            percent = _number(price['percent'], 'price.percent', Decimal)
+            if not percent.is_finite() or percent <= -100:
+                raise CatalogError('price.percent must be greater than -100')
+            factor = Value(1 + percent / 100, output_field=DecimalField(max_digits=12, decimal_places=6))
+            updates['price'] = Round(F('price') * factor, 2)
+
+    stock = changes.get('stock')
+    if stock is not None:
+        if not isinstance(stock, dict) or len(stock) != 1 or not {'set', 'adjust'} & set(stock):
+            raise CatalogError('stock must be {"set": quantity} or {"adjust": change}')
+        if 'set' in stock:
+            quantity = _number(stock['set'], 'stock.set', int)
+            if quantity < 0:
+                raise CatalogError('stock.set must not be negative')
+            updates['stock'] = Value(quantity)
+        else:
+            # Stock never drops below zero
+            updates['stock'] = Greatest(F('stock') + _number(stock['adjust'], 'stock.adjust', int), 0)
+
+    featured = changes.get('is_featured')
+    if featured is not None:
+        if not isinstance(featured, bool):
+            raise CatalogError('is_featured must be true or false')
+        updates['is_featured'] = Value(featured)
+
+    if not updates:
+        raise CatalogError('Nothing to change: give price, stock or is_featured')
+    return updates
+
+
+def bulk_update_products(queryset, changes):
+    """
+    Apply a price / stock / featured change to every product in `queryset`
+    with one UPDATE of the products (and one of their variants for a price
+    or stock change) and return the number of products changed.
+
+    `changes` may hold any of:
+    - price: {"set": amount} or {"percent": change}, e.g. {"percent": -20};
+      a percent change also reprices sizes that have their own price, a
+      set price replaces them (every size then sells at the amount)
+    - stock: {"set": quantity} or {"adjust": change}, applied to every
+      variant of the products, never below zero
+    - is_featured: true or false
+
+    Catalog pages, facet counts, the admin dashboard and the summaries of
+    carts holding a repriced product are refreshed in the same transaction.
+    """
+    updates = _product_changes(changes)
+    stock = updates.pop('stock', None)
+    selection = Product.objects.filter(pk__in=queryset.order_by().values('pk'))
+    with transaction.atomic():
+        updated = selection.update(**updates, updated_at=timezone.now())
+        if updated:
+            if stock is not None:
+                ProductVariant.objects.filter(product__in=selection).update(stock=stock)
+                refresh_product_stock(selection)
+            if 'price' in updates:
+                ProductVariant.objects.filter(product__in=selection, price__isnull=False).update(
+                    price=None if 'set' in changes['price'] else updates['price']
+                )
+                refresh_cart_summaries(Cart.objects.filter(items__product__in=selection))
+            invalidate_catalog()
+            invalidate_dashboard()
+    return updated
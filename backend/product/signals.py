@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+from .cache import invalidate_catalog
+from .images import delete_image_files
+from .models import Cart, Category, Product, ProductVariant
+from .search import refresh_search_vectors
+from .services import refresh_cart_summaries, refresh_product_stock
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=Category)
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, update_fields=None, **kwargs):
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+    if not created and (update_fields is None or 'price' in update_fields):
+        # Cart totals are priced at the current product price
+        refresh_cart_summaries(Cart.objects.filter(items__product=instance))
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    instance._cart_ids = list(Cart.objects.filter(items__product=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    # The product's cart lines were removed by the cascade
+    if getattr(instance, '_cart_ids', None):
+        refresh_cart_summaries(Cart.objects.filter(pk__in=instance._cart_ids))
+    if instance.image:
+        transaction.on_commit(lambda: delete_image_files(instance.image.name, instance.image_derivatives))
+
+
+@receiver(post_save, sender=ProductVariant)
+def variant_saved(sender, instance, created, **kwargs):
+    refresh_product_stock(Product.objects.filter(pk=instance.product_id))
+    if not created:
+        # The variant may override the price its cart lines are charged
+        refresh_cart_summaries(Cart.objects.filter(items__variant=instance))
+
+
+@receiver(pre_delete, sender=ProductVariant)
+def variant_deleting(sender, instance, **kwargs):
+    instance._cart_ids = list(Cart.objects.filter(items__variant=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=ProductVariant)
+def variant_deleted(sender, instance, **kwargs):
+    # The variant's cart lines were removed by the cascade
+    refresh_product_stock(Product.objects.filter(pk=instance.product_id))
+    if getattr(instance, '_cart_ids', None):
+        refresh_cart_summaries(Cart.objects.filter(pk__in=instance._cart_ids))
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(instance.products.all())
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    # Cached lookups hold a copy of the user row, so drop them when it changes
+    if not created:
+        for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+            invalidate_token(key)
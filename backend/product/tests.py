@@ -1,3 +1,1708 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import local_tokens, token_cache_key
+from .metrics import registry
+from .replicas import CATALOG_WRITTEN_KEY
+from .models import (
+    Cart, CartItem, Category, DailyProductSales, DailySales, Order, OrderItem, Product,
+    ProductVariant, StockReservation
+)
+from .serializers import CartSerializer
+from .management.commands.bench_shop import Command as BenchShop
+from .services import refresh_cart_summaries, refresh_product_stock
+
+
+def make_catalog(count, featured_every=2):
+    """Create `count` products in size M spread over two categories."""
+    shirts = Category.objects.create(name='Shirts', description='Formal and casual shirts')
+    trousers = Category.objects.create(name='Trousers')
+    products = [
+        Product.objects.create(
+            name=f'Product {i}',
+            description='Cotton',
+            price=Decimal('499.00') + i,
+            category=shirts if i % 2 else trousers,
+            image_url=f'https://example.com/{i}.jpg',
+            stock=20,
+            brand='Acme',
+            is_featured=i % featured_every == 0,
+        )
+        for i in range(count)
+    ]
+    ProductVariant.objects.bulk_create(
+        [ProductVariant(product=product, size='M', stock=20) for product in products]
+    )
+    return products
+
+
+def make_product(sizes=(('M', 20),), **fields):
+    """Create a product sold in `sizes`, (size, stock) pairs"""
+    product = Product.objects.create(**fields)
+    for size, stock in sizes:
+        ProductVariant.objects.create(product=product, size=size, stock=stock)
+    product.refresh_from_db()
+    return product
+
+
+def variant(product, size='M'):
+    return ProductVariant.objects.get(product=product, size=size)
+
+
+def add_line(cart, product, quantity, size='M'):
+    return CartItem.objects.create(cart=cart, product=product, variant=variant(product, size), quantity=quantity)
+
+
+class TokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.user = User.objects.create_user('shopper', password='pass')
+        response = self.client.post('/api/auth/login/', {'username': 'shopper', 'password': 'pass'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+
+    def test_repeat_requests_skip_the_token_query(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/auth/user/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/user/')
+        self.assertEqual(response.data['username'], 'shopper')
+
+    def test_cache_holds_no_password_hash(self):
+        self.client.get('/api/auth/user/')
+        _, _, values = cache.get(token_cache_key(self.user.auth_token.key))
+        self.assertNotIn(self.user.password, values)
+        response = self.client.get('/api/auth/user/')
+        self.assertEqual(response.data['username'], 'shopper')
+        self.assertFalse(response.data['is_staff'])
+
+    def test_shared_cache_serves_other_processes(self):
+        self.client.get('/api/auth/user/')
+        local_tokens.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/auth/user/').status_code, 200)
+
+    def test_logout_invalidates_immediately(self):
+        self.client.get('/api/auth/user/')
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 401)
+
+    def test_user_changes_invalidate(self):
+        self.client.get('/api/auth/user/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 401)
+
+    def test_expired_token_is_rejected_and_replaced_on_login(self):
+        token = self.user.auth_token
+        with override_settings(AUTH_TOKEN_TTL=60):
+            self.assertEqual(self.client.get('/api/auth/user/').status_code, 200)
+            Token.objects.filter(pk=token.pk).update(created=timezone.now() - timedelta(minutes=2))
+            cache.clear()
+            local_tokens.clear()
+            response = self.client.get('/api/auth/user/')
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.data['detail'], 'Token has expired.')
+
+            response = self.client.post('/api/auth/login/', {'username': 'shopper', 'password': 'pass'})
+            self.assertNotEqual(response.data['token'], token.key)
+            self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+            self.assertEqual(self.client.get('/api/auth/user/').status_code, 200)
+
+
+class ProductQueryCountTests(APITestCase):
+    """Catalog endpoints must run in a fixed number of queries."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+
+    def assert_constant_queries(self, url, expected, user=None):
+        if user:
+            self.client.force_authenticate(user=user)
+        for count in (1, 12):
+            Product.objects.all().delete()
+            Category.objects.all().delete()
+            make_catalog(count, featured_every=1)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_product_list(self):
+        # COUNT(*) for the paginator + one page of products joined to
+        # categories + one prefetch of their variants
+        self.assert_constant_queries('/api/products/', 3)
+
+    def test_product_list_filtered_by_featured(self):
+        self.assert_constant_queries('/api/products/?featured=true', 3)
+
+    def test_featured(self):
+        self.assert_constant_queries('/api/products/featured/', 2)
+
+    def test_product_detail(self):
+        product = make_catalog(1)[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.data['category']['name'], product.category.name)
+        self.assertEqual(
+            [(v['size'], v['stock'], v['price']) for v in response.data['variants']], [('M', 20, None)]
+        )
+
+    def test_admin_product_list(self):
+        self.assert_constant_queries('/api/admin/products/', 3, user=self.admin)
+
+    def test_admin_product_search(self):
+        # The SQLite fallback scores candidates in Python with one extra query
+        expected = 3 if connection.vendor == 'postgresql' else 4
+        self.assert_constant_queries('/api/admin/products/?search=product', expected, user=self.admin)
+
+    def test_list_embeds_category(self):
+        make_catalog(3)
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data['count'], 3)
+        for item in response.data['results']:
+            self.assertIn(item['category']['name'], {'Shirts', 'Trousers'})
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(3)
+
+    def test_list_is_served_from_cache(self):
+        first = self.client.get('/api/products/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/products/')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_query_params_and_page_are_part_of_the_key(self):
+        self.client.get('/api/products/')
+        with self.assertNumQueries(3):
+            self.client.get('/api/products/?featured=true')
+        with self.assertNumQueries(3):
+            self.client.get('/api/products/?page=1')
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/products/featured/')['ETag']
+        response = self.client.get('/api/products/featured/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_product_save_invalidates(self):
+        product = self.products[0]
+        etag = self.client.get(f'/api/products/{product.id}/')['ETag']
+        product.name = 'Renamed'
+        product.save()
+        response = self.client.get(f'/api/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Renamed')
+
+    def test_category_delete_invalidates(self):
+        self.assertEqual(self.client.get('/api/categories/').data['count'], 2)
+        Category.objects.get(name='Trousers').delete()
+        self.assertEqual(self.client.get('/api/categories/').data['count'], 1)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.client.get('/api/products/999999/').status_code, 404)
+        with self.assertNumQueries(1):
+            self.client.get('/api/products/999999/')
+
+
+class AsyncReadTests(TestCase):
+    """The /api/async/ read endpoints match their DRF counterparts."""
+
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(15)
+        self.sync_client = APIClient()
+
+    async def assert_same(self, async_response, sync_url):
+        expected = await sync_to_async(self.sync_client.get)(sync_url)
+        self.assertEqual(async_response.status_code, expected.status_code)
+        data = async_response.json()
+        if isinstance(data, dict) and 'results' in data:
+            self.assertEqual(data['count'], expected.data['count'])
+            self.assertEqual(data['next'] is None, expected.data['next'] is None)
+            data, expected_data = data['results'], expected.data['results']
+        else:
+            expected_data = expected.data
+        self.assertEqual(data, json.loads(json.dumps(expected_data, cls=JSONEncoder)))
+
+    async def test_product_list(self):
+        await self.assert_same(await self.async_client.get('/api/async/products/'), '/api/products/')
+        response = await self.async_client.get('/api/async/products/?page=2&size=M,L')
+        await self.assert_same(response, '/api/products/?page=2&size=M,L')
+
+    async def test_product_detail_and_featured(self):
+        product = self.products[0]
+        response = await self.async_client.get(f'/api/async/products/{product.id}/')
+        await self.assert_same(response, f'/api/products/{product.id}/')
+        response = await self.async_client.get('/api/async/products/featured/')
+        await self.assert_same(response, '/api/products/featured/')
+
+    async def test_category_list(self):
+        await self.assert_same(await self.async_client.get('/api/async/categories/'), '/api/categories/')
+
+    async def test_errors(self):
+        response = await self.async_client.get('/api/async/products/999999/')
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get('/api/async/products/?page=9')
+        self.assertEqual(response.json(), {'detail': 'Invalid page.'})
+        response = await self.async_client.get('/api/async/products/?min_price=cheap')
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.post('/api/async/products/')
+        self.assertEqual(response.status_code, 405)
+
+    async def test_cached_with_etag(self):
+        first = await self.async_client.get('/api/async/products/')
+        response = await self.async_client.get(
+            '/api/async/products/', headers={'If-None-Match': first['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_search_is_delegated(self):
+        response = await self.async_client.get('/api/async/products/?search=product')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 15)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(30)
+        # Force ties on created_at so ordering relies on the id tiebreaker
+        Product.objects.filter(id__in=[p.id for p in self.products[:15]]).update(
+            created_at=self.products[0].created_at
+        )
+
+    def walk(self, url, link='next'):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url, pages = response.data[link], pages + 1
+        return ids, pages
+
+    def test_cursor_mode_visits_every_product_once_in_order(self):
+        ids, pages = self.walk('/api/products/?pagination=cursor')
+        expected = list(
+            Product.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_previous_link_walks_back(self):
+        first = self.client.get('/api/products/?pagination=cursor')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+
+    def test_cursor_page_skips_count_query(self):
+        next_url = self.client.get('/api/products/?pagination=cursor').data['next']
+        cache.clear()
+        # The page and the prefetch of its variants
+        with self.assertNumQueries(2):
+            self.client.get(next_url)
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/products/?page=2')
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/products/?cursor=bogus').status_code, 404)
+
+    def test_cursor_mode_refuses_search_results(self):
+        # Keyset pages would re-sort the results by date and lose their rank
+        for params in ('pagination=cursor', 'fields=id,name&pagination=cursor'):
+            response = self.client.get(f'/api/products/?search=product&{params}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('pagination', response.data)
+        self.assertEqual(self.client.get('/api/async/products/?search=product&pagination=cursor').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/?search=product').status_code, 200)
+
+    def test_order_history_cursor(self):
+        user = User.objects.create_user('buyer', password='pass')
+        for _ in range(14):
+            Order.objects.create(user=user, total_amount=1, shipping_address='x', phone_number='1')
+        self.client.force_authenticate(user=user)
+        ids, pages = self.walk('/api/orders/?pagination=cursor')
+        self.assertEqual(len(set(ids)), 14)
+        self.assertEqual(pages, 2)
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        shirts = Category.objects.create(name='Shirts')
+        denim = Category.objects.create(name='Denim')
+        defaults = {'price': Decimal('999.00'), 'image_url': 'https://example.com/x.jpg', 'stock': 5}
+        self.oxford = Product.objects.create(
+            name='Oxford Shirt', brand='Arrow', description='Button-down cotton', category=shirts, **defaults)
+        self.linen = Product.objects.create(
+            name='Linen Kurta', brand='Fabindia', description='Pairs well with a shirt', category=shirts, **defaults)
+        self.jeans = Product.objects.create(
+            name='Slim Jeans', brand="Levi's", description='Stretch denim', category=denim, **defaults)
+
+    def search(self, term, url='/api/products/'):
+        response = self.client.get(url, {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self.search('shirt'), [self.oxford.id, self.linen.id])
+
+    def test_matches_brand_and_category(self):
+        self.assertEqual(self.search('arrow'), [self.oxford.id])
+        self.assertEqual(self.search('denim'), [self.jeans.id])
+
+    def test_typos_still_match(self):
+        self.assertEqual(self.search('oxfrod'), [self.oxford.id])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.search('slim arrow'), [])
+
+    def test_admin_search(self):
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.search('kurta', url='/api/admin/products/'), [self.linen.id])
+
+    def test_search_vector_is_not_exposed(self):
+        response = self.client.get(f'/api/products/{self.oxford.id}/')
+        self.assertNotIn('search_vector', response.data)
+
+
+class FacetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        shirts = Category.objects.create(name='Shirts')
+        jeans = Category.objects.create(name='Jeans')
+        rows = [
+            ('Oxford', 'Arrow', 'M', '799.00', 10, shirts),
+            ('Poplin', 'Arrow', 'L', '1299.00', 0, shirts),
+            ('Flannel', 'Peter', 'L', '1499.00', 4, shirts),
+            ('Slim', "Levi's", 'M', '2499.00', 7, jeans),
+            ('Relaxed', "Levi's", 'XL', '5499.00', 2, jeans),
+        ]
+        for name, brand, size, price, stock, category in rows:
+            make_product(
+                sizes=[(size, stock)], name=name, brand=brand, price=Decimal(price),
+                category=category, description='', image_url='https://example.com/x.jpg',
+            )
+        self.shirts, self.jeans = shirts, jeans
+
+    def get(self, **params):
+        response = self.client.get('/api/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    @staticmethod
+    def counts(facet):
+        return {entry['value']: entry['count'] for entry in facet}
+
+    def test_filters(self):
+        self.assertEqual(self.get(size='L')['count'], 2)
+        self.assertEqual(self.get(size='M,XL', brand="Levi's")['count'], 2)
+        self.assertEqual(self.get(min_price='1000', max_price='2500')['count'], 3)
+        self.assertEqual(self.get(in_stock='true')['count'], 4)
+        self.assertEqual(self.get(category=self.shirts.id)['count'], 3)
+
+    def test_facet_counts_ignore_their_own_filter(self):
+        facets = self.get(size='L', brand='Arrow', facets='true')['facets']
+        # size counts: every Arrow product, whatever its size
+        self.assertEqual(self.counts(facets['size']), {'M': 1, 'L': 1})
+        # brand counts: every size-L product, whatever its brand
+        self.assertEqual(self.counts(facets['brand']), {'Arrow': 1, 'Peter': 1})
+        self.assertEqual(self.counts(facets['in_stock']), {True: 0, False: 1})
+
+    def test_price_buckets_and_size_order(self):
+        facets = self.get(facets='true')['facets']
+        self.assertEqual(
+            self.counts(facets['price']),
+            {'0-500': 0, '500-1000': 1, '1000-2000': 2, '2000-5000': 1, '5000+': 1},
+        )
+        self.assertEqual([entry['value'] for entry in facets['size']], ['M', 'L', 'XL'])
+        self.assertEqual(self.counts(facets['category']), {self.shirts.id: 3, self.jeans.id: 2})
+
+    def test_size_matches_any_variant(self):
+        ProductVariant.objects.create(product=Product.objects.get(name='Oxford'), size='L', stock=3)
+        self.assertEqual(self.get(size='L')['count'], 3)
+        self.assertEqual(self.get(size='M,L')['count'], 4)
+        facets = self.get(facets='true')['facets']
+        self.assertEqual(self.counts(facets['size']), {'M': 2, 'L': 3, 'XL': 1})
+
+    def test_facets_use_a_bounded_number_of_queries(self):
+        # COUNT + page + variants + one grouped query for each of the five facets
+        with self.assertNumQueries(8):
+            self.get(facets='true', size='M')
+        cache.clear()
+        with self.assertNumQueries(8):
+            self.get(facets='true', size='M,L,XL', brand='Arrow,Peter', in_stock='true')
+
+    def test_facets_are_cached_across_pages(self):
+        self.get(facets='true')
+        with self.assertNumQueries(3):
+            self.get(facets='true', page=1)
+
+    def test_product_change_refreshes_facets(self):
+        self.get(facets='true')
+        Product.objects.filter(name='Oxford').get().delete()
+        facets = self.get(facets='true')['facets']
+        self.assertEqual(self.counts(facets['size']), {'M': 1, 'L': 2, 'XL': 1})
+
+    def test_invalid_price(self):
+        for value in ('cheap', 'NaN', 'Infinity', '-inf'):
+            response = self.client.get('/api/products/', {'min_price': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertEqual(self.client.get('/api/async/products/', {'max_price': value}).status_code, 400)
+
+    def test_invalid_category(self):
+        for value in ('abc', f'{self.shirts.id},abc', '1.5'):
+            response = self.client.get('/api/products/', {'category': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertEqual(response.data, {'category': 'Invalid id'})
+            self.assertEqual(self.client.get('/api/async/products/', {'category': value}).status_code, 400)
+
+
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(5)
+        self.user = User.objects.create_user('shopper', password='pass')
+
+    def full(self, product_id):
+        return self.client.get(f'/api/products/{product_id}/').data
+
+    def test_fast_path_matches_full_serializer(self):
+        ProductVariant.objects.create(product=self.products[0], size='XL', stock=3, price=Decimal('549.00'))
+        response = self.client.get('/api/products/', {'fields': 'id,name,price,image_url,created_at,stock,variants'})
+        for item in response.data['results']:
+            full = self.full(item['id'])
+            self.assertEqual(item, {key: full[key] for key in item})
+            self.assertEqual(
+                set(item), {'id', 'name', 'price', 'image_url', 'created_at', 'stock', 'variants'}
+            )
+        response = self.client.get('/api/products/', {'fields': 'id,variants.size'})
+        self.assertEqual(response.data['results'][-1]['variants'], [{'size': 'M'}, {'size': 'XL'}])
+
+    def test_category_is_an_id_unless_expanded(self):
+        item = self.client.get('/api/products/', {'fields': 'id,category'}).data['results'][0]
+        full = self.full(item['id'])
+        self.assertEqual(item['category'], full['category']['id'])
+        item = self.client.get(
+            '/api/products/', {'fields': 'id,category', 'expand': 'category'}
+        ).data['results'][0]
+        self.assertEqual(item['category'], full['category'])
+
+    def test_fast_path_query_count(self):
+        with self.assertNumQueries(2):
+            self.client.get('/api/products/', {'fields': 'id,name', 'expand': 'category'})
+        # Variants of the whole page in one more query
+        with self.assertNumQueries(3):
+            self.client.get('/api/products/', {'fields': 'id,variants'})
+
+    def test_fast_path_with_cursor_pagination(self):
+        response = self.client.get('/api/products/', {'fields': 'id,name', 'pagination': 'cursor'})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_detail_fields(self):
+        product = self.products[0]
+        response = self.client.get(f'/api/products/{product.id}/', {'fields': 'name,price'})
+        self.assertEqual(set(response.data), {'name', 'price'})
+
+    def test_cart_and_order_fields(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=cart, product=self.products[0], variant=variant(self.products[0]), quantity=1
+        )
+        self.client.force_authenticate(user=self.user)
+        data = self.client.get(
+            '/api/cart/', {'fields': 'total_price,items.quantity,items.product.name,items.variant.size'}
+        ).data
+        self.assertEqual(set(data), {'items', 'total_price'})
+        self.assertEqual(
+            data['items'],
+            [{'quantity': 1, 'product': {'name': self.products[0].name}, 'variant': {'size': 'M'}}],
+        )
+
+        self.client.post('/api/orders/', {'shipping_address': 'Kochi', 'phone_number': '1'})
+        order = self.client.get(
+            '/api/orders/', {'fields': 'id,items.product.name,items.product.size'}
+        ).data['results'][0]
+        self.assertEqual(order['items'][0]['product'], {'name': self.products[0].name, 'size': 'M'})
+
+    def test_without_fields_the_full_payload_is_unchanged(self):
+        item = self.client.get('/api/products/').data['results'][0]
+        self.assertIn('description', item)
+        self.assertIn('description', item['category'])
+
+
+class CartReadTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', password='pass')
+        self.client.force_authenticate(user=self.user)
+
+    def fill_cart(self, lines):
+        cart = Cart.objects.create(user=self.user)
+        for product in make_catalog(lines):
+            add_line(cart, product, 2)
+        return cart
+
+    def test_cart_read_is_constant(self):
+        self.fill_cart(40)
+        # cart row + prefetched items joined to products and categories
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/cart/')
+        self.assertEqual(len(response.data['items']), 40)
+
+    def test_cart_payload_matches_unprefetched_serializer(self):
+        cart = self.fill_cart(5)
+        response = self.client.get('/api/cart/')
+        expected = CartSerializer(Cart.objects.get(pk=cart.pk)).data
+        self.assertEqual(response.data, expected)
+        self.assertEqual(
+            Decimal(response.data['total_price']),
+            sum(item.subtotal for item in cart.items.all()),
+        )
+
+    def test_empty_cart_is_created(self):
+        response = self.client.get('/api/cart/')
+        self.assertEqual(response.data['items'], [])
+        self.assertEqual(Decimal(response.data['total_price']), 0)
+
+
+class CartMutationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = make_catalog(1)[0]
+        self.user = User.objects.create_user('shopper', password='pass')
+        self.client.force_authenticate(user=self.user)
+
+    def add(self, quantity, client=None):
+        return (client or self.client).post(
+            '/api/cart/add/', {'product_id': self.product.id, 'quantity': quantity}
+        )
+
+    def test_repeated_adds_increment_one_line(self):
+        self.add(3)
+        response = self.add(4)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['quantity'], 7)
+        self.assertEqual(CartItem.objects.get().quantity, 7)
+
+    def test_add_beyond_stock(self):
+        self.add(15)
+        response = self.add(6)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Cannot add 6 more. Only 5 items available')
+        self.assertEqual(CartItem.objects.get().quantity, 15)
+
+    def test_update_and_remove(self):
+        item_id = self.add(2).data['id']
+        response = self.client.patch('/api/cart/update/', {'cart_item_id': item_id, 'quantity': 9})
+        self.assertEqual(response.data['quantity'], 9)
+        response = self.client.patch('/api/cart/update/', {'cart_item_id': item_id, 'quantity': 21})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch('/api/cart/update/', {'cart_item_id': item_id, 'quantity': 0})
+        self.assertEqual(response.data['message'], 'Item removed from cart')
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_sizes_are_separate_lines(self):
+        large = ProductVariant.objects.create(product=self.product, size='L', stock=2, price=Decimal('650.00'))
+        response = self.add(1)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Size is required')
+
+        response = self.client.post('/api/cart/add/', {'product_id': self.product.id, 'size': 'M'})
+        self.assertEqual(response.data['variant']['size'], 'M')
+        response = self.client.post('/api/cart/add/', {'variant_id': large.id, 'quantity': 2})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['subtotal'], '1300.00')
+        response = self.client.post('/api/cart/add/', {'variant_id': large.id})
+        self.assertEqual(response.data['error'], 'Cannot add 1 more. Only 0 items available')
+        response = self.client.post('/api/cart/add/', {'product_id': self.product.id, 'size': 'XS'})
+        self.assertEqual(response.status_code, 404)
+
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual((cart.item_count, cart.total_amount), (3, self.product.price + Decimal('1300.00')))
+
+    def test_invalid_ids(self):
+        response = self.client.post('/api/cart/add/', {'variant_id': 'abc'})
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Invalid variant_id'))
+        response = self.client.post('/api/cart/add/', {'product_id': 'abc'})
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Invalid product_id'))
+        self.assertFalse(CartItem.objects.exists())
+
+    @override_settings(CART_RESERVATION_TTL=900)
+    def test_reservations_hold_stock_for_other_carts(self):
+        self.add(15)
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', password='pass'))
+        response = self.add(6, client=other)
+        self.assertEqual(response.data['error'], 'Insufficient stock. Only 5 items available')
+        self.assertEqual(self.add(5, client=other).status_code, 201)
+
+        StockReservation.objects.filter(cart__user=self.user).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(self.add(6, client=other).status_code, 201)
+
+    @override_settings(CART_RESERVATION_TTL=900)
+    def test_checkout_respects_and_releases_reservations(self):
+        self.add(15)
+        other_user = User.objects.create_user('other', password='pass')
+        other_cart = Cart.objects.create(user=other_user)
+        add_line(other_cart, self.product, 10)
+        other = APIClient()
+        other.force_authenticate(other_user)
+        payload = {'shipping_address': 'Kochi', 'phone_number': '1'}
+        response = other.post('/api/orders/', payload)
+        self.assertEqual(response.data['error'], f'Insufficient stock for {self.product.name} (M). Only 5 available')
+
+        self.assertEqual(self.client.post('/api/orders/', payload).status_code, 201)
+        self.assertFalse(StockReservation.objects.exists())
+
+    @override_settings(CART_RESERVATION_TTL=900)
+    def test_clear_releases_reservations(self):
+        self.add(2)
+        self.client.delete('/api/cart/clear/')
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class CartSummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.first, self.second = make_catalog(2)
+        self.user = User.objects.create_user('shopper', password='pass')
+        self.client.force_authenticate(user=self.user)
+
+    def assert_summary(self, item_count, total_amount):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.data, {'item_count': item_count, 'total_amount': f'{total_amount:.2f}'})
+
+    def test_empty(self):
+        self.assert_summary(0, 0)
+
+    def test_follows_cart_changes(self):
+        first_id = self.client.post('/api/cart/add/', {'product_id': self.first.id, 'quantity': 2}).data['id']
+        self.client.post('/api/cart/add/', {'product_id': self.second.id, 'quantity': 1})
+        self.assert_summary(3, self.first.price * 2 + self.second.price)
+
+        self.client.patch('/api/cart/update/', {'cart_item_id': first_id, 'quantity': 5})
+        self.assert_summary(6, self.first.price * 5 + self.second.price)
+
+        self.client.delete('/api/cart/remove/', {'cart_item_id': first_id})
+        self.assert_summary(1, self.second.price)
+
+        self.client.post('/api/cart/batch/', {'operations': [
+            {'op': 'add', 'product_id': self.first.id, 'quantity': 4},
+        ]}, format='json')
+        self.assert_summary(5, self.first.price * 4 + self.second.price)
+
+        self.client.delete('/api/cart/clear/')
+        self.assert_summary(0, 0)
+
+    def test_failed_change_leaves_summary(self):
+        self.client.post('/api/cart/add/', {'product_id': self.first.id, 'quantity': 2})
+        response = self.client.post('/api/cart/add/', {'product_id': self.first.id, 'quantity': 30})
+        self.assertEqual(response.status_code, 400)
+        self.assert_summary(2, self.first.price * 2)
+
+    def test_checkout_empties_summary(self):
+        self.client.post('/api/cart/add/', {'product_id': self.first.id, 'quantity': 2})
+        self.client.post('/api/orders/', {'shipping_address': 'Somewhere', 'phone_number': '123'})
+        self.assert_summary(0, 0)
+
+    def test_price_change_and_delete_refresh_totals(self):
+        self.client.post('/api/cart/add/', {'product_id': self.first.id, 'quantity': 2})
+        self.client.post('/api/cart/add/', {'product_id': self.second.id, 'quantity': 1})
+        self.first.price = Decimal('100.00')
+        self.first.save()
+        self.assert_summary(3, Decimal('200.00') + self.second.price)
+        self.second.delete()
+        self.assert_summary(2, Decimal('200.00'))
+
+
+class CartBatchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_catalog(20)
+        self.user = User.objects.create_user('shopper', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.cart = Cart.objects.create(user=self.user)
+
+    def batch(self, operations):
+        return self.client.post('/api/cart/batch/', {'operations': operations}, format='json')
+
+    def test_applies_operations_in_order(self):
+        first, second, third = self.products[:3]
+        line = add_line(self.cart, third, 1)
+        response = self.batch([
+            {'op': 'add', 'product_id': first.id, 'quantity': 2},
+            {'op': 'add', 'product_id': first.id},
+            {'op': 'add', 'product_id': second.id, 'quantity': 5},
+            {'op': 'update', 'product_id': second.id, 'quantity': 4},
+            {'op': 'remove', 'cart_item_id': line.id},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item['product']['id']: item['quantity'] for item in response.data['items']},
+            {first.id: 3, second.id: 4},
+        )
+        self.assertEqual(
+            Decimal(response.data['total_price']), first.price * 3 + second.price * 4
+        )
+
+    def test_query_count_does_not_grow_with_operations(self):
+        def count(products):
+            self.cart.items.all().delete()
+            with CaptureQueriesContext(connection) as ctx:
+                self.batch([{'op': 'add', 'product_id': p.id, 'quantity': 1} for p in products])
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count(self.products[:1]), count(self.products))
+
+    def test_failure_applies_nothing(self):
+        response = self.batch([
+            {'op': 'add', 'product_id': self.products[0].id, 'quantity': 1},
+            {'op': 'add', 'product_id': self.products[1].id, 'quantity': 21},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient stock', response.data['error'])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_variants_and_sizes(self):
+        product = self.products[0]
+        large = ProductVariant.objects.create(product=product, size='L', stock=5)
+        response = self.batch([
+            {'op': 'add', 'variant_id': large.id, 'quantity': 2},
+            {'op': 'add', 'product_id': product.id, 'size': 'M'},
+            {'op': 'update', 'product_id': product.id, 'size': 'L', 'quantity': 3},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted((item['variant']['size'], item['quantity']) for item in response.data['items']),
+            [('L', 3), ('M', 1)],
+        )
+        response = self.batch([{'op': 'add', 'product_id': product.id}])
+        self.assertEqual(response.data['error'], 'Operation 0: size is required')
+
+    def test_validation(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        response = self.batch([{'op': 'explode'}])
+        self.assertEqual(response.data['error'], 'Operation 0: op must be one of add, update, remove')
+        response = self.batch([{'op': 'add', 'product_id': 999999}])
+        self.assertEqual(response.status_code, 404)
+        response = self.batch([{'op': 'remove', 'cart_item_id': 999999}])
+        self.assertEqual(response.status_code, 404)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs a database that allows concurrent writers')
+class ConcurrentCartTests(TransactionTestCase):
+    requests = 200
+
+    def setUp(self):
+        cache.clear()
+        self.product = make_catalog(1)[0]
+        self.user = User.objects.create_user('shopper', password='pass')
+        Cart.objects.create(user=self.user)
+
+    def fire(self, quantity):
+        def add(_):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                return client.post(
+                    '/api/cart/add/', {'product_id': self.product.id, 'quantity': quantity}
+                ).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            return list(pool.map(add, range(self.requests)))
+
+    def test_parallel_adds_lose_no_updates(self):
+        ProductVariant.objects.filter(product=self.product).update(stock=10_000)
+        statuses = self.fire(quantity=3)
+        self.assertEqual(statuses.count(201), self.requests)
+        self.assertEqual(CartItem.objects.get().quantity, 3 * self.requests)
+
+    def test_parallel_adds_never_exceed_stock(self):
+        ProductVariant.objects.filter(product=self.product).update(stock=50)
+        statuses = self.fire(quantity=1)
+        self.assertEqual(statuses.count(201), 50)
+        self.assertEqual(CartItem.objects.get().quantity, 50)
+
+
+class CheckoutTests(APITestCase):
+    payload = {'shipping_address': '12 MG Road, Kochi', 'phone_number': '9876543210'}
+
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.cart = Cart.objects.create(user=self.user)
+
+    def fill_cart(self, lines, quantity=2):
+        Product.objects.all().delete()
+        Category.objects.all().delete()
+        products = make_catalog(lines)
+        for product in products:
+            add_line(self.cart, product, quantity)
+        return products
+
+    def checkout_query_count(self, lines):
+        self.fill_cart(lines)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/orders/', self.payload)
+        self.assertEqual(response.status_code, 201)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_cart(self):
+        self.assertEqual(self.checkout_query_count(1), self.checkout_query_count(25))
+
+    def test_order_created_and_stock_decremented(self):
+        products = self.fill_cart(3, quantity=4)
+        response = self.client.post('/api/orders/', self.payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 3)
+        self.assertEqual(
+            Decimal(response.data['total_amount']),
+            sum(p.price * 4 for p in products),
+        )
+        self.assertEqual(
+            set(Product.objects.values_list('stock', flat=True)), {16}
+        )
+        self.assertFalse(self.cart.items.exists())
+
+    def test_insufficient_stock_rolls_back(self):
+        products = self.fill_cart(2, quantity=5)
+        ProductVariant.objects.filter(product=products[1]).update(stock=3)
+        response = self.client.post('/api/orders/', self.payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient stock', response.data['error'])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=products[0].pk).stock, 20)
+        self.assertEqual(self.cart.items.count(), 2)
+
+    def test_empty_cart(self):
+        response = self.client.post('/api/orders/', self.payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Cart is empty')
+
+    def test_lines_added_during_checkout_stay_in_the_cart(self):
+        products = self.fill_cart(2)
+        late = make_product(name='Late', description='Linen', price=Decimal('10'), category=products[0].category)
+
+        def add_late_line(products):
+            add_line(self.cart, late, 1)
+            refresh_product_stock(products)
+
+        with mock.patch('product.services.refresh_product_stock', side_effect=add_late_line):
+            response = self.client.post('/api/orders/', self.payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual(list(self.cart.items.values_list('product_id', flat=True)), [late.id])
+
+    def test_deleted_variant_is_reported(self):
+        products = self.fill_cart(2)
+        # Delete the variant under the cart line, as a concurrent delete would
+        ProductVariant.objects.filter(product=products[1])._raw_delete('default')
+        response = self.client.post('/api/orders/', self.payload)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error'], 'Some items in your cart are no longer available')
+        self.assertFalse(Order.objects.exists())
+        # The cascade the delete skipped, so the test transaction stays consistent
+        self.cart.items.filter(product=products[1]).delete()
+
+
+class OrderHistoryTests(APITestCase):
+    payload = {'shipping_address': '12 MG Road, Kochi', 'phone_number': '9876543210'}
+
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.products = make_catalog(6)
+
+    def place_order(self, lines):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        for product in self.products[:lines]:
+            add_line(cart, product, 1)
+        return self.client.post('/api/orders/', self.payload).data
+
+    def test_lines_render_the_snapshot(self):
+        self.place_order(1)
+        product = self.products[0]
+        product.name = 'Renamed'
+        product.save()
+        item = self.client.get('/api/orders/').data['results'][0]['items'][0]
+        self.assertEqual(item['product'], {
+            'id': product.id, 'name': 'Product 0', 'brand': 'Acme',
+            'size': 'M', 'image_url': 'https://example.com/0.jpg',
+        })
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.place_order(1)
+        # COUNT(*) + orders joined to users + one prefetch of all lines
+        with self.assertNumQueries(3):
+            self.client.get('/api/orders/')
+        for _ in range(3):
+            self.place_order(6)
+        with self.assertNumQueries(3):
+            self.client.get('/api/orders/')
+
+    def test_deleting_a_product_keeps_history(self):
+        self.place_order(2)
+        self.products[0].delete()
+        items = self.client.get('/api/orders/').data['results'][0]['items']
+        self.assertEqual([item['product']['id'] for item in items], [None, self.products[1].id])
+        self.assertEqual(items[0]['product']['name'], 'Product 0')
+
+    def test_backfill_command(self):
+        self.place_order(3)
+        OrderItem.objects.update(product_name='', product_brand='', product_size='', product_image_url='')
+        call_command('backfill_order_snapshots', batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            sorted(OrderItem.objects.values_list('product_name', flat=True)),
+            ['Product 0', 'Product 1', 'Product 2'],
+        )
+
+
+class AdminStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        products = make_catalog(4)
+        sold_out = variant(products[0])
+        sold_out.stock = 0
+        sold_out.save()
+        for status_value in ('pending', 'delivered', 'delivered'):
+            Order.objects.create(
+                user=self.admin, total_amount=Decimal('100.50'), status=status_value,
+                shipping_address='Kochi', phone_number='1',
+            )
+
+    def test_each_stats_endpoint_is_one_query(self):
+        for url in ('/api/admin/products/stats/', '/api/admin/orders/stats/',
+                    '/api/admin/users/stats/'):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_stats_values(self):
+        self.assertEqual(self.client.get('/api/admin/products/stats/').data, {
+            'total_products': 4, 'low_stock': 1, 'out_of_stock': 1, 'featured_products': 2,
+        })
+        self.assertEqual(self.client.get('/api/admin/orders/stats/').data, {
+            'total_orders': 3, 'pending_orders': 1, 'processing_orders': 0,
+            'completed_orders': 2, 'total_revenue': 201.0,
+        })
+        self.assertEqual(self.client.get('/api/admin/users/stats/').data, {
+            'total_users': 1, 'admin_users': 1, 'active_users': 1, 'regular_users': 0,
+        })
+
+    def test_dashboard_is_cached(self):
+        with self.assertNumQueries(3):
+            first = self.client.get('/api/admin/dashboard/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/admin/dashboard/')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first.data['orders']['total_orders'], 3)
+
+    def test_dashboard_requires_admin(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/api/admin/dashboard/').status_code, 401)
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRoutingTests(APITestCase):
+    # The replica is left empty, like one that has not caught up yet
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products = make_catalog(2)
+        self.user = User.objects.create_user('shopper', password='pass')
+
+    def product_count(self, client=None, url='/api/products/'):
+        return len((client or self.client).get(url).data['results'])
+
+    def test_catalog_reads_go_to_the_replica(self):
+        with CaptureQueriesContext(connections['default']) as primary:
+            self.assertEqual(self.product_count(), 0)
+            self.assertEqual(self.client.get('/api/categories/').data['count'], 0)
+            self.assertEqual(self.client.get(f'/api/products/{self.products[0].id}/').status_code, 404)
+            self.assertEqual(self.client.get('/api/products/featured/').data, [])
+        self.assertEqual(len(primary), 0)
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.product_count(), 0)
+        response = self.client.post(
+            '/api/cart/add/', {'product_id': self.products[0].id, 'size': 'M', 'quantity': 1}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.product_count(), 2)
+        # Other users still read from the replica
+        self.assertEqual(self.product_count(APIClient(), '/api/products/?in_stock=true'), 0)
+
+    def test_async_catalog_reads_go_to_the_replica(self):
+        with CaptureQueriesContext(connections['default']) as primary:
+            self.assertEqual(self.client.get('/api/async/products/').json()['count'], 0)
+            self.assertEqual(self.client.get('/api/async/categories/').json()['count'], 0)
+            self.assertEqual(self.client.get(f'/api/async/products/{self.products[0].id}/').status_code, 404)
+            self.assertEqual(self.client.get('/api/async/products/featured/').json(), [])
+        self.assertEqual(len(primary), 0)
+
+    def test_async_catalog_respects_the_pin(self):
+        response = self.client.post('/api/auth/login/', {'username': 'shopper', 'password': 'pass'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        self.client.post('/api/cart/add/', {'product_id': self.products[0].id, 'size': 'M', 'quantity': 1})
+        self.assertEqual(self.client.get('/api/async/products/').json()['count'], 2)
+        # Other users still read from the replica
+        self.assertEqual(APIClient().get('/api/async/products/?in_stock=true').json()['count'], 0)
+
+    def test_pages_read_during_the_lag_are_not_cached(self):
+        self.product_count()
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.product_count()
+        self.assertGreater(len(replica), 0)
+
+        cache.delete(CATALOG_WRITTEN_KEY)
+        self.product_count()
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.product_count()
+        self.assertEqual(len(replica), 0)
+
+    def test_admin_stats_read_the_replica(self):
+        admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        Order.objects.create(
+            user=admin, total_amount=Decimal('10'), shipping_address='Kochi', phone_number='1'
+        )
+        self.client.force_authenticate(user=admin)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(self.client.get('/api/admin/products/stats/').data['total_products'], 0)
+        self.assertEqual(len(replica), 1)
+        self.assertEqual(self.client.get('/api/admin/orders/stats/').data['total_orders'], 0)
+        self.assertEqual(self.client.get('/api/admin/users/stats/').data['total_users'], 0)
+        dashboard = self.client.get('/api/admin/dashboard/').data
+        self.assertEqual(dashboard['products']['total_products'], 0)
+        # Listing orders is not routed
+        self.assertEqual(len(self.client.get('/api/admin/orders/').data['results']), 1)
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.products = make_catalog(3)
+
+    def metric(self, text, name, view, method='GET'):
+        prefix = f'{name}{{view="{view}",method="{method}"}} '
+        lines = [line for line in text.splitlines() if line.startswith(prefix)]
+        self.assertEqual(len(lines), 1, prefix)
+        return float(lines[0][len(prefix):])
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/products/{self.products[0].id}/')
+        self.assertRegex(
+            response['Server-Timing'],
+            rf'^db;dur=[\d.]+;desc="{len(queries)} queries", total;dur=[\d.]+$'
+        )
+
+    def test_counts_per_view_and_action(self):
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        response = self.client.get('/api/categories/')
+        self.client.get('/api/no-such-endpoint/')
+
+        text = registry.render()
+        self.assertEqual(self.metric(text, 'shop_request_duration_seconds_count', 'ProductViewSet.list'), 2)
+        self.assertIn(
+            'shop_request_duration_seconds_bucket{view="ProductViewSet.list",method="GET",le="+Inf"} 2', text
+        )
+        self.assertIn(
+            f'desc="{self.metric(text, "shop_db_queries_total", "CategoryViewSet.list"):.0f} queries"',
+            response['Server-Timing']
+        )
+        self.assertEqual(self.metric(text, 'shop_request_duration_seconds_count', 'unmatched'), 1)
+
+    def test_unknown_methods_share_one_label(self):
+        for method in ('BREW', 'PROPFIND', 'X-ANYTHING'):
+            self.client.generic(method, '/api/products/')
+        text = registry.render()
+        self.assertEqual(self.metric(text, 'shop_request_duration_seconds_count', 'ProductViewSet', 'other'), 3)
+        self.assertNotIn('BREW', text)
+
+    async def test_async_views_count_queries(self):
+        await self.async_client.get('/api/async/categories/')
+        text = registry.render()
+        self.assertEqual(self.metric(text, 'shop_request_duration_seconds_count', 'category_list'), 1)
+        self.assertGreater(self.metric(text, 'shop_db_queries_total', 'category_list'), 0)
+
+    def test_metrics_endpoint(self):
+        self.assertEqual(self.client.get('/api/admin/metrics/').status_code, 401)
+        admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        self.client.get('/api/admin/dashboard/')
+        response = self.client.get('/api/admin/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE shop_request_duration_seconds histogram', text)
+        self.assertEqual(self.metric(text, 'shop_db_queries_total', 'dashboard'), 3)
+
+
+class ProductImageTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, IMAGE_DERIVATIVES_IN_BACKGROUND=False))
+        self.product = make_catalog(1)[0]
+        self.url = f'/api/admin/products/{self.product.id}/image/'
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+
+    def upload(self, size=(1600, 1200), mode='RGB', file_format='JPEG', name='photo.jpg'):
+        buffer = BytesIO()
+        Image.new(mode, size, 'navy').save(buffer, file_format)
+        upload = SimpleUploadedFile(name, buffer.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {'image': upload}, format='multipart')
+
+    def open_media(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, Image.open(BytesIO(b''.join(response.streaming_content)))
+
+    def test_upload_builds_derivatives(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['image'].startswith('/media/products/originals/'))
+
+        images = self.client.get(f'/api/products/{self.product.id}/').data['images']
+        self.assertEqual(set(images), {'grid', 'detail', 'cart'})
+        expected = {'grid': (480, 480), 'detail': (1200, 900), 'cart': (160, 160)}
+        for variant, size in expected.items():
+            for file_format, pillow_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+                _, image = self.open_media(images[variant][file_format])
+                self.assertEqual((image.format, image.size), (pillow_format, size))
+
+    def test_transparent_png(self):
+        self.assertEqual(self.upload(mode='RGBA', file_format='PNG', name='logo.png').status_code, 201)
+        grid = self.client.get(f'/api/products/{self.product.id}/').data['images']['grid']
+        _, image = self.open_media(grid['jpeg'])
+        self.assertEqual(image.size, (480, 480))
+
+    def test_media_is_served_with_long_cache_headers(self):
+        self.upload()
+        grid = self.client.get(f'/api/products/{self.product.id}/').data['images']['grid']
+        response, _ = self.open_media(grid['webp'])
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(self.client.get('/media/products/derived/missing.webp').status_code, 404)
+
+    def test_sparse_list_renders_images(self):
+        self.upload()
+        row = self.client.get('/api/products/?fields=id,image,images').data['results'][0]
+        self.assertEqual(set(row), {'id', 'image', 'images'})
+        self.assertEqual(row['images']['cart']['webp'][-8:], '160.webp')
+
+    def test_replace_and_remove_delete_old_files(self):
+        self.upload()
+        product = Product.objects.get(pk=self.product.pk)
+        old_files = [product.image.name] + [
+            name for formats in product.image_derivatives.values() for name in formats.values()
+        ]
+        self.upload(size=(800, 800))
+        self.assertFalse(any(default_storage.exists(name) for name in old_files))
+
+        product.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertFalse(default_storage.exists(product.image.name))
+        data = self.client.get(f'/api/products/{self.product.id}/').data
+        self.assertEqual((data['image'], data['images']), (None, None))
+
+    def test_orders_snapshot_the_uploaded_image(self):
+        self.upload()
+        Product.objects.filter(pk=self.product.pk).update(image_url='')
+        add_line(Cart.objects.create(user=self.admin), self.product, 1)
+        response = self.client.post(
+            '/api/orders/', {'shipping_address': 'Kochi', 'phone_number': '1'}
+        )
+        self.assertEqual(response.status_code, 201)
+        image_url = response.data['items'][0]['product']['image_url']
+        self.assertTrue(image_url.endswith('-cart-160x160.jpeg'))
+        self.open_media(image_url)
+
+    def test_rejects_non_images(self):
+        upload = SimpleUploadedFile('notes.jpg', b'not an image')
+        response = self.client.post(self.url, {'image': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.upload().status_code, 401)
+
+    def test_command_builds_missing_derivatives(self):
+        self.upload()
+        Product.objects.filter(pk=self.product.pk).update(image_derivatives={})
+        call_command('build_image_derivatives', stdout=StringIO())
+        derivatives = Product.objects.get(pk=self.product.pk).image_derivatives
+        self.assertTrue(derivatives['detail']['webp'].endswith('-detail-1200x1200.webp'))
+
+
+class AdminExportTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.products = make_catalog(5)
+        buyer = User.objects.create_user('buyer', password='pass')
+        for status, lines in (('pending', 2), ('delivered', 3)):
+            order = Order.objects.create(
+                user=buyer, total_amount=10, status=status, shipping_address='Kochi', phone_number='1'
+            )
+            for product in self.products[:lines]:
+                item = OrderItem(order=order, product=product, quantity=1, price=product.price)
+                item.snapshot(product)
+                item.save()
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_products_csv_with_filters(self):
+        rows = list(csv.DictReader(StringIO(self.export('/api/admin/products/export/'))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[-1]['name'], 'Product 0')
+        self.assertEqual(rows[-1]['category'], 'Trousers')
+
+        category = self.products[1].category_id
+        rows = list(csv.DictReader(StringIO(self.export(f'/api/admin/products/export/?category={category}'))))
+        self.assertEqual({row['category'] for row in rows}, {'Shirts'})
+
+    def test_products_have_a_row_per_size(self):
+        ProductVariant.objects.create(product=self.products[0], size='L', stock=3, price=Decimal('600.00'))
+        rows = list(csv.DictReader(StringIO(self.export('/api/admin/products/export/'))))
+        self.assertEqual(
+            [(row['size'], row['stock'], row['price']) for row in rows if row['name'] == 'Product 0'],
+            [('M', '20', '499.00'), ('L', '3', '600.00')],
+        )
+        records = [json.loads(line) for line in self.export('/api/admin/products/export/?output=jsonl').splitlines()]
+        self.assertEqual(records[-1]['stock'], 23)
+        self.assertEqual([variant['size'] for variant in records[-1]['variants']], ['M', 'L'])
+
+    def test_orders_jsonl_and_csv(self):
+        orders = [json.loads(line) for line in self.export('/api/admin/orders/export/?output=jsonl').splitlines()]
+        self.assertEqual([len(order['items']) for order in orders], [3, 2])
+        self.assertEqual(orders[0]['items'][0]['product_name'], 'Product 0')
+
+        rows = list(csv.DictReader(StringIO(self.export('/api/admin/orders/export/?status=pending'))))
+        self.assertEqual([row['product_name'] for row in rows], ['Product 0', 'Product 1'])
+        self.assertEqual({row['status'] for row in rows}, {'pending'})
+
+    def test_query_count_does_not_grow_with_rows(self):
+        # Orders joined to users, plus one prefetch of their lines
+        with self.assertNumQueries(2):
+            self.export('/api/admin/orders/export/?output=jsonl')
+
+    def test_invalid_output_and_permissions(self):
+        response = self.client.get('/api/admin/orders/export/?output=xml')
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(user=User.objects.create_user('shopper', password='pass'))
+        self.assertEqual(self.client.get('/api/admin/products/export/').status_code, 403)
+
+
+class ProductImportTests(APITestCase):
+    header = 'sku,name,description,price,category,image_url,stock,size,brand,is_featured\n'
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.shirts = Category.objects.create(name='Shirts')
+
+    def upload(self, content, name='products.csv'):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post('/api/admin/products/import/', {'file': upload}, format='multipart')
+
+    def test_creates_then_updates_by_sku(self):
+        rows = ''.join(
+            f'SKU-{i},Shirt {i},Cotton,{500 + i},Shirts,https://example.com/{i}.jpg,5,L,Acme,true\n'
+            for i in range(3)
+        )
+        response = self.upload(self.header + rows)
+        self.assertEqual(response.data, {'created': 3, 'updated': 0, 'error_count': 0, 'errors': []})
+
+        response = self.upload(self.header + f'SKU-1,Renamed,Linen,999,{self.shirts.id},,0,XL,,no\n')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(Product.objects.count(), 3)
+        product = Product.objects.get(sku='SKU-1')
+        self.assertEqual((product.name, product.price, product.stock, product.is_featured),
+                         ('Renamed', Decimal('999.00'), 5, False))
+        self.assertEqual(
+            list(product.variants.order_by('id').values_list('size', 'stock')), [('L', 5), ('XL', 0)]
+        )
+
+    def test_rows_sharing_a_sku_are_sizes(self):
+        response = self.upload(
+            self.header
+            + 'TEE,Tee,,300,Shirts,,4,S,,\n'
+            + 'TEE,Tee,,300,Shirts,,6,M,,\n'
+            + 'TEE,Tee,,350,Shirts,,1,XXL,,\n'
+        )
+        self.assertEqual(response.data['created'], 1)
+        product = Product.objects.get(sku='TEE')
+        self.assertEqual(product.stock, 11)
+        self.assertEqual(
+            list(product.variants.order_by('id').values_list('size', 'stock', 'price')),
+            [('S', 4, Decimal('300.00')), ('M', 6, Decimal('300.00')), ('XXL', 1, None)],
+        )
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        response = self.upload(
+            self.header
+            + 'A,Good,,10,shirts,,1,M,,\n'
+            + 'B,,,ten,Hats,not a url,x,XXXL,,maybe\n'
+        )
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['error_count'], 1)
+        error = response.data['errors'][0]
+        self.assertEqual(error['row'], 2)
+        self.assertEqual(
+            set(error['errors']),
+            {'name', 'price', 'category_id', 'image_url', 'stock', 'size', 'is_featured'},
+        )
+
+    def test_queries_per_batch_do_not_grow_with_rows(self):
+        def count(rows):
+            content = self.header + ''.join(
+                f'S{rows}-{i},Shirt,,10,Shirts,,1,M,,\n' for i in range(rows)
+            )
+            with CaptureQueriesContext(connection) as ctx:
+                self.upload(content)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count(1), count(50))
+
+    def test_command_reads_json_lines(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'products.jsonl')
+        with open(path, 'w') as f:
+            f.write(json.dumps({'sku': 'J1', 'name': 'Jacket', 'price': 1500, 'category': 'Shirts'}) + '\n')
+            f.write('[1, 2]\n')
+        out, err = StringIO(), StringIO()
+        call_command('import_products', path, stdout=out, stderr=err)
+        self.assertIn('1 created, 0 updated, 1 rejected', out.getvalue())
+        self.assertIn('row 2', err.getvalue())
+        self.assertTrue(Product.objects.filter(sku='J1', is_featured=False).exists())
+
+    def test_requires_admin_and_a_known_format(self):
+        self.assertEqual(self.upload(self.header, name='products.xlsx').status_code, 400)
+        self.client.force_authenticate(user=User.objects.create_user('shopper', password='pass'))
+        self.assertEqual(self.upload(self.header).status_code, 403)
+
+
+class AdminBulkUpdateTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.products = make_catalog(6)
+
+    def bulk(self, data):
+        return self.client.post('/api/admin/products/bulk-update/', data, format='json')
+
+    def test_price_percent_by_ids_in_one_update(self):
+        ids = [p.id for p in self.products[:2]]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk({'ids': ids, 'price': {'percent': -10}})
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(sum(q['sql'].startswith('UPDATE "product_product"') for q in ctx.captured_queries), 1)
+        self.assertEqual(
+            list(Product.objects.filter(pk__in=ids).order_by('pk').values_list('price', flat=True)),
+            [Decimal('449.10'), Decimal('450.00')],
+        )
+        self.assertEqual(Product.objects.get(pk=self.products[2].pk).price, Decimal('501.00'))
+
+    def test_price_changes_apply_to_size_prices(self):
+        product = make_product(
+            (('M', 5), ('L', 5)), name='Sized', description='Linen', price=Decimal('100'),
+            category=self.products[0].category,
+        )
+        ProductVariant.objects.filter(product=product, size='L').update(price=Decimal('200'))
+        user = User.objects.create_user('shopper', password='pass')
+        cart = Cart.objects.create(user=user)
+        add_line(cart, product, 1, size='L')
+
+        self.bulk({'ids': [product.id], 'price': {'percent': -50}})
+        self.assertEqual(variant(product, 'L').price, Decimal('100.00'))
+        self.assertIsNone(variant(product, 'M').price)
+        cart.refresh_from_db()
+        self.assertEqual(cart.total_amount, Decimal('100.00'))
+
+        self.bulk({'ids': [product.id], 'price': {'set': '80'}})
+        self.assertIsNone(variant(product, 'L').price)
+        cart.refresh_from_db()
+        self.assertEqual(cart.total_amount, Decimal('80.00'))
+
+    def test_filter_stock_and_featured(self):
+        shirts = self.products[1].category_id
+        response = self.bulk({
+            'filter': {'category': shirts}, 'stock': {'adjust': -25}, 'is_featured': True,
+        })
+        self.assertEqual(response.data, {'updated': 3})
+        self.assertEqual(
+            set(Product.objects.filter(category_id=shirts).values_list('stock', 'is_featured')),
+            {(0, True)},
+        )
+        self.assertEqual(Product.objects.exclude(category_id=shirts).filter(stock=20).count(), 3)
+
+    def test_caches_and_cart_summaries_are_refreshed(self):
+        product = self.products[0]
+        before = self.client.get(f'/api/products/{product.id}/').data['price']
+        stats = self.client.get('/api/admin/dashboard/').data['products']
+        user = User.objects.create_user('shopper', password='pass')
+        cart = Cart.objects.create(user=user)
+        add_line(cart, product, 2)
+
+        self.bulk({'ids': [product.id], 'price': {'set': '100'}, 'stock': {'set': 0}})
+        self.assertNotEqual(self.client.get(f'/api/products/{product.id}/').data['price'], before)
+        self.assertEqual(
+            self.client.get('/api/admin/dashboard/').data['products']['out_of_stock'],
+            stats['out_of_stock'] + 1,
+        )
+        cart.refresh_from_db()
+        self.assertEqual(cart.total_amount, Decimal('200.00'))
+
+    def test_validation(self):
+        for data in (
+            {'price': {'set': 1}},
+            {'ids': [1], 'filter': {}, 'price': {'set': 1}},
+            {'ids': ['x'], 'price': {'set': 1}},
+            {'ids': [1]},
+            {'ids': [1], 'price': {'percent': -100}},
+            {'ids': [1], 'stock': {'set': -1}},
+            {'ids': [1], 'price': {'set': 'cheap'}},
+            {'ids': [1], 'is_featured': 'yes'},
+        ):
+            self.assertEqual(self.bulk(data).status_code, 400, data)
+        self.client.force_authenticate(user=User.objects.create_user('shopper', password='pass'))
+        self.assertEqual(self.bulk({'ids': [1], 'is_featured': True}).status_code, 403)
+
+
+class AdminProductVariantTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.shirts = Category.objects.create(name='Shirts')
+
+    def test_create_and_replace_sizes(self):
+        response = self.client.post('/api/admin/products/', {
+            'name': 'Tee', 'description': 'Cotton tee', 'price': '300.00', 'category_id': self.shirts.id,
+            'variants': [{'size': 'S', 'stock': 4}, {'size': 'XXL', 'stock': 1, 'price': '350.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['stock'], 5)
+        product_id = response.data['id']
+
+        user = User.objects.create_user('shopper', password='pass')
+        cart = Cart.objects.create(user=user)
+        add_line(cart, Product.objects.get(pk=product_id), 2, size='XXL')
+
+        response = self.client.patch(f'/api/admin/products/{product_id}/', {
+            'variants': [{'size': 'S', 'stock': 10}, {'size': 'M', 'stock': 3}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 13)
+        self.assertEqual([v['size'] for v in response.data['variants']], ['S', 'M'])
+        # The removed size took its cart line with it
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.total_amount), (0, 0))
+
+    def test_new_product_gets_one_size_and_sizes_are_unique(self):
+        response = self.client.post('/api/admin/products/', {
+            'name': 'Cap', 'description': 'Cotton cap', 'price': '99.00', 'category_id': self.shirts.id,
+        }, format='json')
+        self.assertEqual([(v['size'], v['stock']) for v in response.data['variants']], [('M', 0)])
+        response = self.client.patch(f"/api/admin/products/{response.data['id']}/", {
+            'variants': [{'size': 'S'}, {'size': 'S'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SalesAnalyticsTests(APITestCase):
+    payload = {'shipping_address': '12 MG Road, Kochi', 'phone_number': '9876543210'}
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+        self.buyer = User.objects.create_user('buyer', password='pass')
+        self.products = make_catalog(3)
+
+    def buy(self, quantities):
+        cart, _ = Cart.objects.get_or_create(user=self.buyer)
+        for product, quantity in zip(self.products, quantities):
+            if quantity:
+                add_line(cart, product, quantity)
+        self.client.force_authenticate(user=self.buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            order_id = self.client.post('/api/orders/', self.payload).data['id']
+        self.client.force_authenticate(user=self.admin)
+        return order_id
+
+    def snapshot(self):
+        return (
+            list(DailySales.objects.values_list('date', 'orders', 'items', 'revenue')),
+            sorted(DailyProductSales.objects.values_list('date', 'product_id', 'category_id', 'quantity', 'revenue')),
+        )
+
+    def test_checkout_and_status_changes_maintain_rollups(self):
+        first = self.buy([2, 1, 0])
+        self.buy([1, 0, 3])
+        day = DailySales.objects.get()
+        self.assertEqual((day.orders, day.items), (2, 7))
+        self.assertEqual(day.revenue, Order.objects.aggregate(total=Sum('total_amount'))['total'])
+
+        self.client.patch(f'/api/admin/orders/{first}/update_status/', {'status': 'cancelled'})
+        self.assertEqual(DailySales.objects.get().orders, 1)
+        self.assertEqual(DailyProductSales.objects.get(product=self.products[0]).quantity, 1)
+        self.assertEqual(DailyProductSales.objects.get(product=self.products[1]).quantity, 0)
+
+        # Moving between two counted states changes nothing; un-cancelling adds it back
+        self.client.patch(f'/api/admin/orders/{first}/', {'status': 'pending'})
+        self.client.patch(f'/api/admin/orders/{first}/update_status/', {'status': 'shipped'})
+        self.assertEqual(DailySales.objects.get().orders, 2)
+        self.assertEqual(DailyProductSales.objects.get(product=self.products[0]).quantity, 3)
+
+    def test_checkout_updates_rollups_after_commit(self):
+        add_line(Cart.objects.create(user=self.buyer), self.products[0], 1)
+        self.client.force_authenticate(user=self.buyer)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post('/api/orders/', self.payload)
+        self.assertFalse(DailySales.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(DailySales.objects.get().orders, 1)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        cancelled = self.buy([1, 2, 3])
+        self.buy([4, 0, 1])
+        self.client.patch(f'/api/admin/orders/{cancelled}/update_status/', {'status': 'cancelled'})
+        Order.objects.filter(pk=cancelled).update(created_at=timezone.now() - timedelta(days=3))
+        expected = self.snapshot()
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(
+            self.snapshot(),
+            (expected[0], sorted(row for row in expected[1] if row[3])),
+        )
+
+    def test_endpoints_read_only_the_rollups(self):
+        self.buy([2, 1, 0])
+        self.buy([0, 1, 5])
+        for url in ('/api/admin/analytics/daily/', '/api/admin/analytics/categories/',
+                    '/api/admin/analytics/products/', '/api/admin/analytics/top-sellers/?limit=1'):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('product_order' in q['sql'] for q in ctx.captured_queries), url)
+
+        top = self.client.get('/api/admin/analytics/top-sellers/?limit=1').data['results']
+        self.assertEqual([(row['product_id'], row['quantity']) for row in top], [(self.products[2].id, 5)])
+        categories = self.client.get('/api/admin/analytics/categories/').data['results']
+        self.assertEqual(
+            {row['category']: row['quantity'] for row in categories}, {'Trousers': 7, 'Shirts': 2}
+        )
+        daily = self.client.get('/api/admin/analytics/daily/').data['results']
+        self.assertEqual([(row['orders'], row['items']) for row in daily], [(2, 9)])
+
+    def test_date_range_and_permissions(self):
+        self.buy([1, 0, 0])
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/admin/analytics/daily/?start=2000-01-01&end=2000-01-31')
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(self.client.get('/api/admin/analytics/daily/?start=soon').status_code, 400)
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.client.get('/api/admin/analytics/daily/').status_code, 403)
+
+
+class SeedShopTests(TestCase):
+    def test_seed_shop(self):
+        call_command(
+            'seed_shop', products=40, users=10, carts=5, orders=20, batch_size=16, stdout=StringIO()
+        )
+        self.assertEqual(Product.objects.count(), 40)
+        self.assertEqual(Cart.objects.count(), 5)
+        self.assertEqual(Order.objects.count(), 20)
+        for order in Order.objects.prefetch_related('items'):
+            self.assertTrue(order.items.all())
+            self.assertEqual(order.total_amount, sum(item.subtotal for item in order.items.all()))
+            self.assertTrue(all(item.product_name for item in order.items.all()))
+        for cart in Cart.objects.prefetch_related('items__product'):
+            self.assertEqual(cart.item_count, sum(item.quantity for item in cart.items.all()))
+        sold = Order.objects.exclude(status='cancelled').aggregate(total=Sum('total_amount'))['total']
+        self.assertEqual(DailySales.objects.aggregate(total=Sum('revenue'))['total'], sold)
+        self.assertTrue(self.client.login(username='shopper-0', password='shop-password'))
+
+    def test_same_seed_same_data(self):
+        call_command('seed_shop', products=20, users=5, carts=2, orders=5, seed=7, stdout=StringIO())
+        first = list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'category__name'))
+        Product.objects.all().delete()
+        call_command('seed_shop', products=20, users=5, carts=0, orders=0, seed=7, stdout=StringIO())
+        second = list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'category__name'))
+        self.assertEqual(first, second)
+
+    def test_bench_shop_report(self):
+        call_command('seed_shop', products=60, users=5, carts=0, orders=10, stdout=StringIO())
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'report.json')
+        call_command('bench_shop', requests=60, warmup=10, shoppers=3, output=path, stdout=StringIO())
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(report['overall']['requests'], 60)
+        self.assertEqual(report['overall']['errors'], 0)
+        self.assertEqual(report['meta']['products'], 60)
+        for stats in report['endpoints'].values():
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+            self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+        self.assertTrue(Order.objects.filter(user__username__startswith='bench-shopper-').exists())
+
+    def test_bench_shop_starts_from_empty_carts(self):
+        shopper = User.objects.create_user('bench-shopper-0')
+        cart = Cart.objects.create(user=shopper)
+        add_line(cart, make_catalog(1)[0], 2)
+        refresh_cart_summaries(Cart.objects.filter(pk=cart.pk))
+
+        BenchShop().accounts(1)
+        cart.refresh_from_db()
+        self.assertFalse(cart.items.exists())
+        self.assertEqual((cart.item_count, cart.total_amount), (0, 0))
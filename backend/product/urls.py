@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 from .views import CartViewSet
 
 router = DefaultRouter()
@@ -16,9 +16,15 @@ urlpatterns = [
     path('auth/logout/', views.logout, name='logout'),
     path('auth/user/', views.current_user, name='current-user'),
     path('cart/', views.CartViewSet.as_view({'get': 'list'}), name='cart'),
+    path('cart/summary/', views.CartViewSet.as_view({'get': 'summary'}), name='cart-summary'),
     path('cart/add/', views.CartViewSet.as_view({'post': 'add_item'}), name='cart-add'),
     path('cart/update/', views.CartViewSet.as_view({'patch': 'update_item'}), name='cart-update'),
     path('cart/remove/', views.CartViewSet.as_view({'delete': 'remove_item'}), name='cart-remove'),
     path('cart/clear/', views.CartViewSet.as_view({'delete': 'clear'}), name='cart-clear'),
+    path('cart/batch/', views.CartViewSet.as_view({'post': 'batch'}), name='cart-batch'),
+    path('async/products/', async_views.product_list, name='async-product-list'),
+    path('async/products/featured/', async_views.featured_products, name='async-product-featured'),
+    path('async/products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('async/categories/', async_views.category_list, name='async-category-list'),
     
 ]
\ No newline at end of file
@@ -1,17 +1,30 @@
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from rest_framework.authtoken.models import Token
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from django.views import static
+from .models import Category, Product, Cart, CartItem, Order
 from .serializers import (
-    CategorySerializer, ProductSerializer, CartSerializer, CartItemSerializer,
-    OrderSerializer, CreateOrderSerializer, UserSerializer, RegisterSerializer
+    CategorySerializer, ProductSerializer, CartSerializer, CartItemSerializer, CartSummarySerializer,
+    OrderSerializer, CreateOrderSerializer, UserSerializer, RegisterSerializer,
+    ProductRowSerializer, parse_fields
+)
+from .authentication import issue_token
+from .cache import CatalogCacheMixin, cached_catalog_response
+from .facets import apply_facet_filters, facet_counts
+from .pagination import KeysetPagination
+from .replicas import ReplicaReadMixin
+from .search import search_products
+from .services import (
+    CartError, CheckoutError, add_to_cart, apply_cart_operations, clear_cart,
+    place_order, remove_cart_item, resolve_variant, set_cart_quantity
 )
 
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
 def register(request):
     """
@@ -28,7 +41,7 @@ def register(request):
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        token, _ = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
         return Response({
             'token': token.key,
             'user': UserSerializer(user).data
@@ -36,6 +49,7 @@ def register(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
 def login(request):
     """
@@ -51,7 +65,7 @@ def login(request):
     user = authenticate(username=username, password=password)
     
     if user:
-        token, _ = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
         return Response({
             'token': token.key,
             'user': UserSerializer(user).data
@@ -82,7 +96,7 @@ def current_user(request):
     """
     return Response(UserSerializer(request.user).data)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, CatalogCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for Category CRUD operations
     
@@ -92,12 +106,15 @@ class CategoryViewSet(viewsets.ModelViewSet):
     update: PUT /api/categories/{id}/
     partial_update: PATCH /api/categories/{id}/
     destroy: DELETE /api/categories/{id}/
+
+    list and retrieve are served from the catalog cache, and read from the
+    replica on a miss.
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ReplicaReadMixin, CatalogCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for Product CRUD operations
     
@@ -110,27 +127,73 @@ class ProductViewSet(viewsets.ModelViewSet):
     featured: GET /api/products/featured/
     
     Query Parameters for list:
-    - category: Filter by category ID
+    - category: Filter by category ID (comma-separated for several)
+    - size, brand: Filter by size / brand (comma-separated for several)
+    - min_price, max_price: Inclusive price bounds
+    - in_stock: Only products with stock left (true)
     - featured: Filter featured products (true/false)
+    - search: Full-text search over name, brand, description and category,
+      ranked by relevance and tolerant of typos
+    - facets: Add counts per category, size, brand, price range and
+      stock availability to the response (true)
+    - fields: Comma-separated fields to return, e.g. id,name,price,image_url;
+      the list is then rendered straight from .values() rows
+    - expand: With fields, embed the full category instead of its id (category)
+
+    list, retrieve and featured are served from the catalog cache, and
+    read from the replica on a miss.
     """
-    queryset = Product.objects.all()
+    queryset = Product.objects.catalog()
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
+    replica_actions = ('list', 'retrieve', 'featured')
+
+    def list(self, request, *args, **kwargs):
+        fields = request.query_params.get('fields')
+        if not fields:
+            return super().list(request, *args, **kwargs)
+        return cached_catalog_response(request, lambda: self.list_rows(request, fields))
+
+    def list_rows(self, request, fields):
+        """
+        Sparse product list rendered from .values() rows
+        """
+        serializer = ProductRowSerializer(
+            parse_fields(fields), parse_fields(request.query_params.get('expand', ''))
+        )
+        rows = self.filter_queryset(self.get_queryset()).values(*serializer.columns())
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(serializer.render(page))
 
     def get_queryset(self):
         """
         Filter products based on query parameters
         """
-        queryset = Product.objects.all()
-        category = self.request.query_params.get('category', None)
+        queryset = self.filter_catalog(Product.objects.catalog().order_by('-created_at'))
+        return apply_facet_filters(queryset, self.request.query_params)
+
+    def filter_catalog(self, queryset):
+        """
+        Apply the non-facet filters (featured, search)
+        """
         featured = self.request.query_params.get('featured', None)
+        search = self.request.query_params.get('search', None)
         
-        if category:
-            queryset = queryset.filter(category_id=category)
         if featured:
             queryset = queryset.filter(is_featured=True)
+        if search:
+            queryset = search_products(queryset, search)
         
-        return queryset.order_by('-created_at')
+        return queryset
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.request.query_params.get('facets') == 'true':
+            response.data['facets'] = facet_counts(
+                self.filter_catalog(Product.objects.all()), self.request.query_params
+            )
+        return response
 
     @action(detail=False, methods=['get'])
     def featured(self, request):
@@ -138,9 +201,14 @@ class ProductViewSet(viewsets.ModelViewSet):
         Get featured products
         GET /api/products/featured/
         """
-        featured_products = Product.objects.filter(is_featured=True)
-        serializer = self.get_serializer(featured_products, many=True)
-        return Response(serializer.data)
+        def build():
+            featured_products = Product.objects.catalog().filter(
+                is_featured=True
+            ).order_by('-created_at')
+            serializer = self.get_serializer(featured_products, many=True)
+            return Response(serializer.data)
+
+        return cached_catalog_response(request, build)
 
 class CartViewSet(viewsets.ViewSet):
     """
@@ -154,10 +222,20 @@ class CartViewSet(viewsets.ViewSet):
         GET /api/cart/
         Headers: Authorization: Token <token>
         """
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
+        cart, created = Cart.objects.with_items().get_or_create(user=request.user)
+        serializer = CartSerializer(cart, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Get the item count and total of the user's cart, for the header badge
+        GET /api/cart/summary/
+        Headers: Authorization: Token <token>
+        """
+        cart = Cart.objects.only('item_count', 'total_amount').filter(user=request.user).first()
+        return Response(CartSummarySerializer(cart or Cart()).data)
+
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         """
@@ -165,17 +243,20 @@ class CartViewSet(viewsets.ViewSet):
         POST /api/cart/add/
         Headers: Authorization: Token <token>
         Body: {
-            "product_id": integer,
+            "variant_id": integer,
+            (or "product_id": integer, "size": string; size may be left
+             out for products sold in one size)
             "quantity": integer (default: 1)
         }
         """
         cart, created = Cart.objects.get_or_create(user=request.user)
+        variant_id = request.data.get('variant_id')
         product_id = request.data.get('product_id')
         quantity = request.data.get('quantity', 1)
 
-        if not product_id:
+        if not variant_id and not product_id:
             return Response(
-                {'error': 'product_id is required'}, 
+                {'error': 'variant_id or product_id is required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
@@ -186,41 +267,31 @@ class CartViewSet(viewsets.ViewSet):
                     {'error': 'Quantity must be greater than 0'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
-        except ValueError:
+        except (TypeError, ValueError):
             return Response(
                 {'error': 'Invalid quantity'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        name = 'variant_id' if variant_id else 'product_id'
         try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
+            variant_id = int(variant_id) if variant_id else None
+            product_id = None if variant_id else int(product_id)
+        except (TypeError, ValueError):
             return Response(
-                {'error': 'Product not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        if product.stock < quantity:
-            return Response(
-                {'error': f'Insufficient stock. Only {product.stock} items available'}, 
+                {'error': f'Invalid {name}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        cart_item, item_created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
-        )
-
-        if not item_created:
-            new_quantity = cart_item.quantity + quantity
-            if product.stock < new_quantity:
-                return Response(
-                    {'error': f'Cannot add {quantity} more. Only {product.stock - cart_item.quantity} items available'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            cart_item.quantity = new_quantity
-            cart_item.save()
+        try:
+            variant = resolve_variant(
+                variant_id=variant_id,
+                product_id=product_id,
+                size=request.data.get('size') or None,
+            )
+            cart_item = add_to_cart(cart, variant, quantity)
+        except CartError as e:
+            return Response({'error': e.message}, status=e.status_code)
 
         return Response(
             CartItemSerializer(cart_item).data, 
@@ -256,28 +327,25 @@ class CartViewSet(viewsets.ViewSet):
             )
 
         try:
-            cart_item = CartItem.objects.get(id=cart_item_id, cart__user=request.user)
+            cart_item = CartItem.objects.select_related('product__category', 'variant').get(
+                id=cart_item_id, cart__user=request.user
+            )
         except CartItem.DoesNotExist:
             return Response(
                 {'error': 'Cart item not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if quantity <= 0:
-            cart_item.delete()
+        try:
+            cart_item = set_cart_quantity(cart_item, quantity)
+        except CartError as e:
+            return Response({'error': e.message}, status=e.status_code)
+
+        if cart_item is None:
             return Response(
                 {'message': 'Item removed from cart'}, 
                 status=status.HTTP_200_OK
             )
-
-        if cart_item.product.stock < quantity:
-            return Response(
-                {'error': f'Insufficient stock. Only {cart_item.product.stock} items available'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        cart_item.quantity = quantity
-        cart_item.save()
         return Response(CartItemSerializer(cart_item).data)
 
     @action(detail=False, methods=['delete'])
@@ -300,7 +368,7 @@ class CartViewSet(viewsets.ViewSet):
 
         try:
             cart_item = CartItem.objects.get(id=cart_item_id, cart__user=request.user)
-            cart_item.delete()
+            remove_cart_item(cart_item)
             return Response(
                 {'message': 'Item removed from cart'}, 
                 status=status.HTTP_200_OK
@@ -311,6 +379,32 @@ class CartViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply several cart changes in one transaction
+        POST /api/cart/batch/
+        Headers: Authorization: Token <token>
+        Body: {
+            "operations": [
+                {"op": "add", "variant_id": integer, "quantity": integer (default: 1)},
+                {"op": "update", "cart_item_id" or "variant_id": integer, "quantity": integer},
+                {"op": "remove", "cart_item_id" or "variant_id": integer}
+            ]
+        }
+        Instead of variant_id, an operation may give "product_id" and "size"
+        (size may be left out for products sold in one size).
+        Returns the updated cart. No change is applied if any operation fails.
+        """
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        try:
+            apply_cart_operations(cart, request.data.get('operations'))
+        except CartError as e:
+            return Response({'error': e.message}, status=e.status_code)
+
+        cart = Cart.objects.with_items().get(pk=cart.pk)
+        return Response(CartSerializer(cart, context={'request': request}).data)
+
     @action(detail=False, methods=['delete'])
     def clear(self, request):
         """
@@ -319,7 +413,7 @@ class CartViewSet(viewsets.ViewSet):
         Headers: Authorization: Token <token>
         """
         cart, created = Cart.objects.get_or_create(user=request.user)
-        cart.items.all().delete()
+        clear_cart(cart)
         return Response(
             {'message': 'Cart cleared successfully'}, 
             status=status.HTTP_200_OK
@@ -335,12 +429,13 @@ class OrderViewSet(viewsets.ModelViewSet):
     """
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """
         Get orders for the current user
         """
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+        return Order.objects.with_items().filter(user=self.request.user).order_by('-created_at')
 
     def create(self, request):
         """
@@ -356,54 +451,12 @@ class OrderViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get user's cart
         try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            return Response(
-                {'error': 'Cart not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        if not cart.items.exists():
-            return Response(
-                {'error': 'Cart is empty'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Check stock availability for all items
-        for cart_item in cart.items.all():
-            if cart_item.product.stock < cart_item.quantity:
-                return Response(
-                    {'error': f'Insufficient stock for {cart_item.product.name}. Only {cart_item.product.stock} available'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            total_amount=cart.total_price,
-            shipping_address=serializer.validated_data['shipping_address'],
-            phone_number=serializer.validated_data['phone_number']
-        )
-
-        # Create order items and update stock
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-            
-            # Update product stock
-            product = cart_item.product
-            product.stock -= cart_item.quantity
-            product.save()
-
-        # Clear cart after successful order
-        cart.items.all().delete()
+            order = place_order(request.user, **serializer.validated_data)
+        except CheckoutError as e:
+            return Response({'error': e.message}, status=e.status_code)
 
+        order = Order.objects.with_items().get(pk=order.pk)
         return Response(
             OrderSerializer(order).data, 
             status=status.HTTP_201_CREATED
@@ -425,4 +478,16 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response(
             {'error': 'Orders cannot be deleted'}, 
             status=status.HTTP_405_METHOD_NOT_ALLOWED
-        )
\ No newline at end of file
+        )
+
+def media(request, path):
+    """
+    Uploaded product images and their derivatives, from MEDIA_ROOT
+    GET /media/<path>
+
+    Every upload and derivative gets a new file name, so the files can be
+    cached as immutable.
+    """
+    response = static.serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+    return response
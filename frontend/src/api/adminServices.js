@@ -9,6 +9,13 @@ export const adminProductService = {
   partialUpdate: (id, data) => api.patch(`/admin/products/${id}/`, data),
   delete: (id) => api.delete(`/admin/products/${id}/`),
   getStats: () => api.get('/admin/products/stats/'),
+  uploadImage: (id, file) => {
+    const form = new FormData();
+    form.append('image', file);
+    return api.post(`/admin/products/${id}/image/`, form, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+  },
 };
 
 // Admin Category Services
@@ -2,6 +2,10 @@ import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:8000/api';
 
+// Uploaded images are returned as paths under the API server's /media/
+export const mediaUrl = (path) =>
+  path && path.startsWith('/') ? API_BASE_URL.replace(/\/api$/, '') + path : path;
+
 // Create axios instance
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -4,12 +4,14 @@ import { useCart } from '../context/CartContext';
 import { useAuth } from '../context/AuthContext';
 import { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
+import ProductImage from './ProductImage';
 
 const ProductCard = ({ product }) => {
   const { addToCart } = useCart();
   const { isAuthenticated } = useAuth();
   const navigate = useNavigate();
   const [isAdding, setIsAdding] = useState(false);
+  const variants = product.variants || [];
 
   const handleAddToCart = async (e) => {
     e.preventDefault();
@@ -19,8 +21,14 @@ const ProductCard = ({ product }) => {
       return;
     }
 
+    // Products sold in several sizes are added from their page
+    if (variants.length !== 1) {
+      navigate(`/products/${product.id}`);
+      return;
+    }
+
     setIsAdding(true);
-    const result = await addToCart(product.id, 1);
+    const result = await addToCart(variants[0].id, 1);
     
     if (result.success) {
       // Show success feedback
@@ -34,9 +42,9 @@ const ProductCard = ({ product }) => {
   return (
     <Link to={`/products/${product.id}`} className="card overflow-hidden group">
       <div className="relative overflow-hidden bg-dark-50">
-        <img
-          src={product.image_url}
-          alt={product.name}
+        <ProductImage
+          product={product}
+          variant="grid"
           className="w-full h-64 object-cover group-hover:scale-110 transition-transform duration-500"
         />
         {product.is_featured && (
@@ -68,7 +76,9 @@ const ProductCard = ({ product }) => {
           <span className="text-2xl font-bold text-dark-900">
             ₹{product.price}
           </span>
-          <span className="text-sm text-dark-500">Size: {product.size}</span>
+          <span className="text-sm text-dark-500">
+            {variants.length === 1 ? `Size: ${variants[0].size}` : `${variants.length} sizes`}
+          </span>
         </div>
 
         <button
@@ -77,7 +87,7 @@ const ProductCard = ({ product }) => {
           className="w-full btn-primary flex items-center justify-center space-x-2 disabled:opacity-50"
         >
           <ShoppingCart className="w-5 h-5" />
-          <span>{isAdding ? 'Adding...' : 'Add to Cart'}</span>
+          <span>{isAdding ? 'Adding...' : variants.length === 1 ? 'Add to Cart' : 'Choose Size'}</span>
         </button>
       </div>
     </Link>
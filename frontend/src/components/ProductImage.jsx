@@ -0,0 +1,34 @@
+import { mediaUrl } from '../api/config';
+
+// Renders the product's pre-built thumbnail for `variant` (grid, detail or
+// cart) as WebP with a JPEG fallback; falls back to the uploaded original or
+// image_url while the thumbnails are being built. Order lines only carry
+// image_url, which may be a snapshot of an uploaded thumbnail under /media/.
+const ProductImage = ({ product, variant, className }) => {
+  const derivative = product.images?.[variant];
+
+  if (!derivative) {
+    return (
+      <img
+        src={mediaUrl(product.image || product.image_url)}
+        alt={product.name}
+        className={className}
+        loading="lazy"
+      />
+    );
+  }
+
+  return (
+    <picture>
+      <source srcSet={mediaUrl(derivative.webp)} type="image/webp" />
+      <img
+        src={mediaUrl(derivative.jpeg)}
+        alt={product.name}
+        className={className}
+        loading="lazy"
+      />
+    </picture>
+  );
+};
+
+export default ProductImage;
@@ -31,9 +31,9 @@ export const CartProvider = ({ children }) => {
     }
   }, [isAuthenticated]);
 
-  const addToCart = async (productId, quantity = 1) => {
+  const addToCart = async (variantId, quantity = 1) => {
     try {
-      await cartService.addItem({ product_id: productId, quantity });
+      await cartService.addItem({ variant_id: variantId, quantity });
       await fetchCart();
       return { success: true };
     } catch (error) {
@@ -2,6 +2,7 @@ import { useNavigate } from 'react-router-dom';
 import { Trash2, Plus, Minus, ShoppingBag } from 'lucide-react';
 import { useCart } from '../context/CartContext';
 import { useAuth } from '../context/AuthContext';
+import ProductImage from '../components/ProductImage';
 
 const Cart = () => {
   const { cart, updateCartItem, removeFromCart, clearCart, loading } = useCart();
@@ -83,9 +84,9 @@ const Cart = () => {
             {cart.items.map((item) => (
               <div key={item.id} className="card p-4">
                 <div className="flex gap-4">
-                  <img
-                    src={item.product.image_url}
-                    alt={item.product.name}
+                  <ProductImage
+                    product={item.product}
+                    variant="cart"
                     className="w-24 h-24 object-cover rounded-lg"
                   />
                   
@@ -94,10 +95,10 @@ const Cart = () => {
                       {item.product.name}
                     </h3>
                     <p className="text-sm text-dark-500 mb-2">
-                      {item.product.brand} • Size: {item.product.size}
+                      {item.product.brand} • Size: {item.variant.size}
                     </p>
                     <p className="text-lg font-bold text-dark-900">
-                      ₹ {item.product.price}
+                      ₹ {item.unit_price}
                     </p>
                   </div>
 
@@ -123,7 +124,7 @@ const Cart = () => {
                       <button
                         onClick={() => handleUpdateQuantity(item.id, item.quantity + 1)}
                         className="w-8 h-8 border border-dark-300 rounded hover:bg-dark-50"
-                        disabled={item.quantity >= item.product.stock}
+                        disabled={item.quantity >= item.variant.stock}
                       >
                         <Plus className="w-4 h-4 mx-auto" />
                       </button>
@@ -2,6 +2,7 @@ import { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useCart } from '../context/CartContext';
 import { orderService } from '../api/services';
+import ProductImage from '../components/ProductImage';
 
 const Checkout = () => {
   const { cart, clearCart } = useCart();
@@ -133,9 +134,9 @@ const Checkout = () => {
               <div className="space-y-4 mb-6 max-h-96 overflow-y-auto">
                 {cart.items.map((item) => (
                   <div key={item.id} className="flex gap-4 pb-4 border-b border-dark-100">
-                    <img
-                      src={item.product.image_url}
-                      alt={item.product.name}
+                    <ProductImage
+                      product={item.product}
+                      variant="cart"
                       className="w-16 h-16 object-cover rounded"
                     />
                     <div className="flex-1">
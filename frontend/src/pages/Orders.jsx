@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react';
 import { Package, Clock, Truck, CheckCircle, XCircle } from 'lucide-react';
 import { orderService } from '../api/services';
+import ProductImage from '../components/ProductImage';
 
 const Orders = () => {
   const [orders, setOrders] = useState([]);
@@ -112,9 +113,9 @@ const Orders = () => {
                   <div className="space-y-3">
                     {order.items.map((item) => (
                       <div key={item.id} className="flex gap-4">
-                        <img
-                          src={item.product.image_url}
-                          alt={item.product.name}
+                        <ProductImage
+                          product={item.product}
+                          variant="cart"
                           className="w-16 h-16 object-cover rounded"
                         />
                         <div className="flex-1">
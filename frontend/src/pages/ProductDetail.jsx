@@ -4,6 +4,7 @@ import { ShoppingCart, Star, Truck, Shield, ArrowLeft } from 'lucide-react';
 import { productService } from '../api/services';
 import { useCart } from '../context/CartContext';
 import { useAuth } from '../context/AuthContext';
+import ProductImage from '../components/ProductImage';
 
 const ProductDetail = () => {
   const { id } = useParams();
@@ -12,6 +13,7 @@ const ProductDetail = () => {
   const [loading, setLoading] = useState(true);
   const [quantity, setQuantity] = useState(1);
   const [isAdding, setIsAdding] = useState(false);
+  const [variantId, setVariantId] = useState(null);
   const { addToCart } = useCart();
   const { isAuthenticated } = useAuth();
 
@@ -20,6 +22,9 @@ const ProductDetail = () => {
       try {
         const response = await productService.getById(id);
         setProduct(response.data);
+        const variants = response.data.variants || [];
+        const firstInStock = variants.find((variant) => variant.stock > 0) || variants[0];
+        setVariantId(firstInStock?.id ?? null);
       } catch (error) {
         console.error('Error fetching product:', error);
       } finally {
@@ -37,7 +42,7 @@ const ProductDetail = () => {
     }
 
     setIsAdding(true);
-    const result = await addToCart(product.id, quantity);
+    const result = await addToCart(variantId, quantity);
     
     if (result.success) {
       alert('Product added to cart!');
@@ -64,6 +69,10 @@ const ProductDetail = () => {
     );
   }
 
+  const selected = product.variants?.find((variant) => variant.id === variantId);
+  const stock = selected?.stock ?? 0;
+  const price = selected?.price ?? product.price;
+
   return (
     <div className="min-h-screen bg-white">
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">
@@ -80,9 +89,9 @@ const ProductDetail = () => {
           {/* Product Image */}
           <div className="space-y-4">
             <div className="relative bg-dark-50 rounded-2xl overflow-hidden">
-              <img
-                src={product.image_url}
-                alt={product.name}
+              <ProductImage
+                product={product}
+                variant="detail"
                 className="w-full h-[600px] object-cover"
               />
               {product.is_featured && (
@@ -106,7 +115,7 @@ const ProductDetail = () => {
                 </div>
                 <span className="text-dark-600">(4.5) 120 reviews</span>
               </div>
-              <p className="text-5xl font-bold text-dark-900">₹ {product.price}</p>
+              <p className="text-5xl font-bold text-dark-900">₹ {price}</p>
             </div>
 
             <div className="border-t border-b border-dark-200 py-6 space-y-4">
@@ -118,12 +127,29 @@ const ProductDetail = () => {
               <div className="grid grid-cols-2 gap-4">
                 <div>
                   <p className="text-sm text-dark-500 mb-1">Size</p>
-                  <p className="font-semibold text-dark-900">{product.size}</p>
+                  <div className="flex flex-wrap gap-2">
+                    {product.variants?.map((variant) => (
+                      <button
+                        key={variant.id}
+                        onClick={() => {
+                          setVariantId(variant.id);
+                          setQuantity(1);
+                        }}
+                        className={`px-3 py-1 border rounded-lg font-semibold ${
+                          variant.id === variantId
+                            ? 'bg-dark-900 text-white border-dark-900'
+                            : 'border-dark-300 text-dark-900 hover:bg-dark-50'
+                        } ${variant.stock === 0 ? 'opacity-50 line-through' : ''}`}
+                      >
+                        {variant.size}
+                      </button>
+                    ))}
+                  </div>
                 </div>
                 <div>
                   <p className="text-sm text-dark-500 mb-1">Stock</p>
                   <p className="font-semibold text-dark-900">
-                    {product.stock > 0 ? `${product.stock} available` : 'Out of stock'}
+                    {stock > 0 ? `${stock} available` : 'Out of stock'}
                   </p>
                 </div>
               </div>
@@ -143,9 +169,9 @@ const ProductDetail = () => {
                 </button>
                 <span className="text-xl font-semibold w-12 text-center">{quantity}</span>
                 <button
-                  onClick={() => setQuantity(Math.min(product.stock, quantity + 1))}
+                  onClick={() => setQuantity(Math.min(stock, quantity + 1))}
                   className="w-10 h-10 border border-dark-300 rounded-lg hover:bg-dark-50 font-semibold"
-                  disabled={quantity >= product.stock}
+                  disabled={quantity >= stock}
                 >
                   +
                 </button>
@@ -155,7 +181,7 @@ const ProductDetail = () => {
             {/* Add to Cart Button */}
             <button
               onClick={handleAddToCart}
-              disabled={product.stock === 0 || isAdding}
+              disabled={stock === 0 || isAdding}
               className="w-full btn-primary flex items-center justify-center space-x-2 py-4 text-lg"
             >
               <ShoppingCart className="w-6 h-6" />
@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react';
 import { adminOrderService } from '../../api/adminServices';
+import ProductImage from '../../components/ProductImage';
 
 const AdminOrders = () => {
   const [orders, setOrders] = useState([]);
@@ -121,9 +122,9 @@ const AdminOrders = () => {
                     {order.items.map((item) => (
                       <div key={item.id} className="flex items-center justify-between">
                         <div className="flex items-center space-x-3">
-                          <img
-                            src={item.product.image_url}
-                            alt={item.product.name}
+                          <ProductImage
+                            product={item.product}
+                            variant="cart"
                             className="w-12 h-12 object-cover rounded"
                           />
                           <div>
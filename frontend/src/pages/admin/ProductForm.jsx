@@ -3,6 +3,8 @@ import { useNavigate, useParams } from 'react-router-dom';
 import { ArrowLeft } from 'lucide-react';
 import { adminProductService, adminCategoryService } from '../../api/adminServices';
 
+const SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL'];
+
 const ProductForm = () => {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -10,14 +12,15 @@ const ProductForm = () => {
 
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [imageFile, setImageFile] = useState(null);
   const [formData, setFormData] = useState({
     name: '',
     description: '',
     price: '',
     category: '',
     image_url: '',
-    stock: '',
-    size: 'M',
+    // Stock per size; sizes left blank are not sold
+    stock: { M: '' },
     brand: '',
     is_featured: false,
   });
@@ -52,8 +55,7 @@ const ProductForm = () => {
             price: product.price,
             category: product.category.id,
             image_url: product.image_url,
-            stock: product.stock,
-            size: product.size,
+            stock: Object.fromEntries(product.variants.map((variant) => [variant.size, variant.stock])),
             brand: product.brand,
             is_featured: product.is_featured,
           });
@@ -75,6 +77,10 @@ const ProductForm = () => {
       [name]: type === 'checkbox' ? checked : value,
     });
   };
+
+  const handleStockChange = (size, value) => {
+    setFormData({ ...formData, stock: { ...formData.stock, [size]: value } });
+  };
 const handleSubmit = async (e) => {
   e.preventDefault();
   
@@ -82,6 +88,13 @@ const handleSubmit = async (e) => {
     alert('Please select a category');
     return;
   }
+
+  const variants = SIZES.filter((size) => formData.stock[size] !== undefined && formData.stock[size] !== '')
+    .map((size) => ({ size, stock: parseInt(formData.stock[size]) }));
+  if (variants.length === 0) {
+    alert('Please enter the stock of at least one size');
+    return;
+  }
   
   setLoading(true);
 
@@ -90,23 +103,27 @@ const handleSubmit = async (e) => {
       name: formData.name,
       description: formData.description,
       price: parseFloat(formData.price),
-      stock: parseInt(formData.stock),
       category_id: parseInt(formData.category), // Changed from 'category' to 'category_id'
       image_url: formData.image_url,
-      size: formData.size,
+      variants,
       brand: formData.brand,
       is_featured: formData.is_featured,
     };
 
     console.log('Submitting data:', data); // Debug log
 
+    let productId = id;
     if (isEditMode) {
       await adminProductService.update(id, data);
-      alert('Product updated successfully');
     } else {
-      await adminProductService.create(data);
-      alert('Product created successfully');
+      const response = await adminProductService.create(data);
+      productId = response.data.id;
+    }
+    if (imageFile) {
+      // Thumbnails are built in the background after the upload
+      await adminProductService.uploadImage(productId, imageFile);
     }
+    alert(isEditMode ? 'Product updated successfully' : 'Product created successfully');
     navigate('/admin/products');
   } catch (error) {
     console.error('Error saving product:', error);
@@ -202,41 +219,26 @@ const handleSubmit = async (e) => {
                   placeholder="499.99"
                 />
               </div>
+            </div>
 
-              <div>
-                <label className="block text-sm font-medium text-dark-700 mb-2">
-                  Stock *
-                </label>
-                <input
-                  type="number"
-                  name="stock"
-                  value={formData.stock}
-                  onChange={handleChange}
-                  required
-                  min="0"
-                  className="input-field"
-                  placeholder="100"
-                />
-              </div>
-
-              <div>
-                <label className="block text-sm font-medium text-dark-700 mb-2">
-                  Size *
-                </label>
-                <select
-                  name="size"
-                  value={formData.size}
-                  onChange={handleChange}
-                  required
-                  className="input-field"
-                >
-                  <option value="XS">XS</option>
-                  <option value="S">S</option>
-                  <option value="M">M</option>
-                  <option value="L">L</option>
-                  <option value="XL">XL</option>
-                  <option value="XXL">XXL</option>
-                </select>
+            <div>
+              <label className="block text-sm font-medium text-dark-700 mb-2">
+                Stock per size * <span className="text-dark-500">(leave blank for sizes not sold)</span>
+              </label>
+              <div className="grid grid-cols-3 md:grid-cols-6 gap-4">
+                {SIZES.map((size) => (
+                  <div key={size}>
+                    <span className="block text-xs font-semibold text-dark-600 mb-1">{size}</span>
+                    <input
+                      type="number"
+                      value={formData.stock[size] ?? ''}
+                      onChange={(e) => handleStockChange(size, e.target.value)}
+                      min="0"
+                      className="input-field"
+                      placeholder="-"
+                    />
+                  </div>
+                ))}
               </div>
             </div>
 
@@ -262,19 +264,24 @@ const handleSubmit = async (e) => {
 
             <div>
               <label className="block text-sm font-medium text-dark-700 mb-2">
-                Image URL *
+                Image
               </label>
+              <input
+                type="file"
+                accept="image/jpeg,image/png,image/webp"
+                onChange={(e) => setImageFile(e.target.files[0] || null)}
+                className="input-field mb-3"
+              />
               <input
                 type="url"
                 name="image_url"
                 value={formData.image_url}
                 onChange={handleChange}
-                required
                 className="input-field"
                 placeholder="https://images.unsplash.com/photo-example"
               />
               <p className="text-xs text-dark-500 mt-1">
-                Tip: Use Unsplash for free images - https://source.unsplash.com/800x800/?shirt,menswear
+                Upload a file, or link an external image. Tip: Use Unsplash for free images - https://source.unsplash.com/800x800/?shirt,menswear
               </p>
               {formData.image_url && (
                 <div className="mt-4">
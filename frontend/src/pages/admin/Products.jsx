@@ -2,6 +2,7 @@ import { useEffect, useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { Plus, Edit, Trash2, Search } from 'lucide-react';
 import { adminProductService } from '../../api/adminServices';
+import ProductImage from '../../components/ProductImage';
 
 const AdminProducts = () => {
   const [products, setProducts] = useState([]);
@@ -124,9 +125,9 @@ const AdminProducts = () => {
                     <tr key={product.id} className="hover:bg-dark-50">
                       <td className="px-6 py-4">
                         <div className="flex items-center space-x-4">
-                          <img
-                            src={product.image_url}
-                            alt={product.name}
+                          <ProductImage
+                            product={product}
+                            variant="cart"
                             className="w-16 h-16 object-cover rounded"
                           />
                           <div>